@@ -1 +1,2 @@
-from .db_token import Toker
\ No newline at end of file
+from .db_token import Toker
+from .db_chat import ChatStore
@@ -0,0 +1,206 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import List, Optional, Tuple
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("ChatDB")
+LOGGER.setLevel(logging.INFO)
+
+RUTA_POR_DEFECTO = os.path.join(os.path.dirname(__file__), 'data', 'chat_twitch.db')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensajes(
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    canal TEXT,
+    msg_id TEXT,
+    user_id TEXT,
+    usuario TEXT NOT NULL,
+    texto TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mensajes_usuario ON mensajes(usuario, ts);
+"""
+
+# Indice de texto completo sobre la tabla (contenido externo: no duplica el texto)
+ESQUEMA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS mensajes_fts USING fts5(
+    texto, content='mensajes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS mensajes_ai AFTER INSERT ON mensajes BEGIN
+    INSERT INTO mensajes_fts(rowid, texto) VALUES (new.id, new.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS mensajes_ad AFTER DELETE ON mensajes BEGIN
+    INSERT INTO mensajes_fts(mensajes_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+END;
+"""
+
+INSERTAR = "INSERT INTO mensajes (ts, canal, msg_id, user_id, usuario, texto) VALUES (?, ?, ?, ?, ?, ?)"
+
+#* Almacen persistente de los mensajes del chat en SQLite (modo WAL).
+#* `agregar` solo deja la fila en una cola en memoria; un hilo escritor la vacia
+#* por lotes con executemany en una unica transaccion (group commit), asi el
+#* bucle de eventos nunca espera al disco. Las busquedas usan FTS5.
+class ChatStore:
+    def __init__(self, db_path: Optional[str] = None, max_lote=500, intervalo=1.0):
+        """
+        Args:
+            db_path: Ruta de la base de datos (por defecto CHAT_DB o bd/data/chat_twitch.db)
+            max_lote: Filas maximas por transaccion
+            intervalo: Segundos maximos que una fila espera en memoria antes de escribirse
+        """
+        self.db_path = db_path or os.getenv("CHAT_DB") or RUTA_POR_DEFECTO
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self.fts = True
+        self._cola: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._listo = threading.Event()
+
+        # Estadisticas
+        self.encolados = 0
+        self.escritos = 0
+        self.lotes = 0
+        self.errores = 0
+        self.escritura_total = 0.0
+        metricas.registrar("chat_store", self.estadisticas)
+
+    def iniciar(self) -> None:
+        """Crea el esquema y arranca el hilo escritor; no hace nada si ya corre"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._listo.clear()
+        self._hilo = threading.Thread(target=self._escritor, name="chat_store", daemon=True)
+        self._hilo.start()
+        self._listo.wait(timeout=5)
+
+    def detener(self, timeout=5.0) -> None:
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join(timeout)
+        self._hilo = None
+
+    def agregar(self, usuario: str, texto: str, canal: Optional[str] = None, user_id=None, msg_id=None, ts: Optional[float] = None) -> None:
+        """Encola un mensaje para escribirlo en el siguiente lote (no toca el disco)"""
+        self._cola.put((ts or time.time(), canal, msg_id, str(user_id) if user_id else None, usuario, texto))
+        self.encolados += 1
+
+    def _conectar(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # En WAL basta para no corromper; se pierde a lo sumo el ultimo lote
+        return conn
+
+    def _crear_esquema(self, conn: sqlite3.Connection) -> None:
+        conn.executescript(ESQUEMA)
+        try:
+            conn.executescript(ESQUEMA_FTS)
+        except sqlite3.OperationalError as e:
+            # SQLite compilado sin FTS5: se busca con LIKE
+            self.fts = False
+            LOGGER.warning(f"FTS5 no disponible ({e}); la busqueda de chat sera por LIKE")
+        conn.commit()
+
+    def _escritor(self) -> None:
+        try:
+            conn = self._conectar()
+            self._crear_esquema(conn)
+        except Exception as e:
+            LOGGER.error(f"No se pudo abrir la base de datos de chat {self.db_path}: {e}")
+            self._listo.set()
+            return
+        self._listo.set()
+
+        activo = True
+        while activo:
+            try:
+                fila = self._cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                continue
+            lote = []
+            # Juntar lo que ya este en cola, hasta max_lote
+            while fila is not None:
+                lote.append(fila)
+                if len(lote) >= self.max_lote:
+                    break
+                try:
+                    fila = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+            if fila is None:
+                activo = False
+            if lote:
+                self._escribir(conn, lote)
+        conn.close()
+
+    def _escribir(self, conn: sqlite3.Connection, lote: List[tuple]) -> None:
+        inicio = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(INSERTAR, lote)
+        except Exception as e:
+            self.errores += 1
+            LOGGER.error(f"Error al guardar {len(lote)} mensajes de chat: {e}")
+            return
+        self.escritura_total += time.perf_counter() - inicio
+        self.escritos += len(lote)
+        self.lotes += 1
+
+    @staticmethod
+    def _consulta_fts(termino: str) -> str:
+        """Cada palabra como prefijo entre comillas (sin operadores FTS5 del usuario)"""
+        palabras = termino.split()
+        return " ".join('"' + palabra.replace('"', '""') + '"*' for palabra in palabras)
+
+    def buscar(self, termino: str, usuario: Optional[str] = None, limite=50) -> List[Tuple[float, str, str, str]]:
+        """Mensajes que contienen todas las palabras de `termino` (mas recientes primero).
+
+        Devuelve tuplas (ts, canal, usuario, texto). Abre su propia conexion de
+        lectura: en WAL no bloquea al hilo escritor.
+        """
+        if not termino.strip() and not usuario:
+            return []
+        if not os.path.exists(self.db_path):
+            return []
+        filtros, parametros = [], []
+        if termino.strip():
+            if self.fts:
+                filtros.append("m.id IN (SELECT rowid FROM mensajes_fts WHERE mensajes_fts MATCH ?)")
+                parametros.append(self._consulta_fts(termino))
+            else:
+                for palabra in termino.split():
+                    filtros.append("m.texto LIKE ?")
+                    parametros.append(f"%{palabra}%")
+        if usuario:
+            filtros.append("m.usuario = ?")
+            parametros.append(usuario.lower())
+        consulta = f"SELECT m.ts, m.canal, m.usuario, m.texto FROM mensajes m WHERE {' AND '.join(filtros)} ORDER BY m.id DESC LIMIT ?"
+        parametros.append(limite)
+
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            return conn.execute(consulta, parametros).fetchall()
+        finally:
+            conn.close()
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def estadisticas(self):
+        """Mensajes encolados/escritos, tamaño medio de lote y costo de escritura"""
+        return {
+            "encolados": self.encolados,
+            "escritos": self.escritos,
+            "pendientes": self.pendientes(),
+            "lotes": self.lotes,
+            "lote_medio": (self.escritos / self.lotes) if self.lotes else 0.0,
+            "escritura_ms_por_lote": (self.escritura_total / self.lotes * 1000) if self.lotes else 0.0,
+            "errores": self.errores,
+            "fts": self.fts
+        }
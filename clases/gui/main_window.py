@@ -1,17 +1,21 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QPushButton, 
                             QTextEdit, QLabel, QSplitter, QHBoxLayout, QSizePolicy, QFrame,
                             QDialog, QDialogButtonBox, QListWidget, QLineEdit)
-from PyQt5.QtCore import pyqtSlot, pyqtSignal, QObject, Qt
+from PyQt5.QtCore import pyqtSlot, pyqtSignal, QObject, Qt, QTimer
 from PyQt5.QtGui import QCloseEvent
 import asyncio
 import asqlite
 import os
 from typing import Optional
+from datetime import datetime
+from bd import ChatStore
 from dotenv import load_dotenv
 from clases.twitch_zk import Bot
 from clases.twitch_zk import Gemi
 from recurso.twitch_zk import utils
 from clases.twitch_zk import WebSocketClient
+from clases.twitch_zk import FollowerIndex
+from clases.twitch_zk import ChatAnalytics
 from twitchio import PartialUser
 from recurso.gui.style_manager import StyleManager
 
@@ -29,6 +33,8 @@ class BotController(QObject):
         self.bot: Optional[Bot] = None
         self.ws_client: Optional[WebSocketClient] = None
         self.tdb: Optional[asqlite.Pool] = None
+        self.chat_store: Optional[ChatStore] = None
+        self.analytics = ChatAnalytics()  # Actividad del chat que muestra la barra superior
         self.running = False
         
         # Configuracion desde el .env
@@ -45,13 +51,24 @@ class BotController(QObject):
         db_path_twitch = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                                      'bd/data', 'tokens_twitch.db')
         
+        # Indice de seguidores compartido entre EventSub y el websocket
+        follower_index = FollowerIndex()
+        follower_index.cargar_ultimo_snapshot()
+        
+        # Historial del chat en SQLite (escrito por lotes en su propio hilo)
+        self.chat_store = ChatStore()
+        self.chat_store.iniciar()
+        
         self.tdb = await asqlite.create_pool(db_path_twitch)
         self.bot = Bot(
             token_database=self.tdb,
             userbots=self.userbots,
             user_data_twitch=self.user_data_twitch,
             msg_type="chat",
-            message_callback=lambda msg, msg_type="websocket": self.message_received.emit(msg, msg_type)
+            message_callback=lambda msg, msg_type="websocket": self.message_received.emit(msg, msg_type),
+            follower_index=follower_index,
+            chat_store=self.chat_store,
+            analytics=self.analytics
         )
         
         # Inicializar el bot
@@ -65,7 +82,9 @@ class BotController(QObject):
             self.userbots,
             self.user_data_twitch,
             msg_type="websocket",
-            message_callback=lambda msg, msg_type="websocket": self.message_received.emit(msg, msg_type)
+            message_callback=lambda msg, msg_type="websocket": self.message_received.emit(msg, msg_type),
+            follower_index=follower_index,
+            analytics=self.analytics
         )
         
         # Iniciar la conexion
@@ -101,6 +120,10 @@ class BotController(QObject):
         
         # Guardar datos de usuario
         utils.save_user_data_twitch(file_path_user_data_twitch, self.user_data_twitch)
+        
+        # Escribir los mensajes de chat pendientes
+        if self.chat_store is not None:
+            self.chat_store.detener()
 
         # Si hay alguna otra limpieza necesaria para el bot o websocket
         if self.bot is not None:
@@ -120,11 +143,13 @@ class MainWindow(QMainWindow):
         self.title_label: QLabel
         self.category_label: QLabel
         self.viewers_label: QLabel
+        self.activity_label: QLabel
         self.chat_area: QTextEdit
         self.users_area: QTextEdit
         self.start_button_gemi: QPushButton
         self.stop_button_gemi: QPushButton
         self.view_users_button: QPushButton
+        self.search_chat_button: QPushButton
         # Atributos adicionales para métodos async
         self.BROADCASTER_ID: Optional[str] = None
         self.BOT_ID: Optional[str] = None
@@ -179,6 +204,11 @@ class MainWindow(QMainWindow):
         # Configurar la interfaz
         self.setup_ui()
         
+        # Refrescar la actividad del chat cada segundo (solo lee sumas ya calculadas)
+        self.activity_timer = QTimer(self)
+        self.activity_timer.timeout.connect(self.update_chat_activity)
+        self.activity_timer.start(1000)
+        
         asyncio.create_task(self.bot_controller.start_bot())
         
     def setup_ui(self):
@@ -222,6 +252,15 @@ class MainWindow(QMainWindow):
         # Espacio flexible para empujar el contador de espectadores a la derecha
         info_layout.addStretch(1)
         
+        # Actividad del chat (mensajes por minuto, chatters y JOIN/PART)
+        self.activity_label = QLabel()
+        self.activity_label.setTextFormat(Qt.RichText)
+        self.activity_label.setText(StyleManager.format_label_value("Chat", "-", 'white', 'blue'))
+        info_layout.addWidget(self.activity_label)
+        
+        # Espaciador
+        info_layout.addSpacing(15)
+        
         # Contador de espectadores
         self.viewers_label = QLabel()
         self.viewers_label.setAlignment(Qt.AlignmentFlag.AlignRight)
@@ -302,6 +341,12 @@ class MainWindow(QMainWindow):
         
         buttons_layout.addStretch()
         
+        # Boton para buscar en el historial del chat
+        self.search_chat_button = QPushButton("Buscar en Chat")
+        self.search_chat_button.setMaximumHeight(40)
+        self.search_chat_button.clicked.connect(self.show_chat_search)
+        buttons_layout.addWidget(self.search_chat_button)
+        
         # Boton para ver usuarios - en el extremo derecho
         self.view_users_button = QPushButton("Ver Usuarios")
         self.view_users_button.setMaximumHeight(40)
@@ -375,12 +420,12 @@ class MainWindow(QMainWindow):
                     charla.terminate(False)
                     setattr(sys.modules['clases.twitch_zk.component_class'], 'charla', None)
 
-            # Usar el bot desde bot_controller
-            channel_info = await self.bot_controller.bot.fetch_channels([str(self.BROADCASTER_ID)])
+            # Usar el bot desde bot_controller (la informacion del canal sale de su cache)
+            channel_info = await self.bot_controller.bot.channel_info.obtener()
             # Iniciar Gemini con la informacion del canal
-            model = await utils.iniciar_gemi(channel_info[0])
+            model = await utils.iniciar_gemi(channel_info)
 
-            self.charla = Gemi(model, max_messages=20, bot=self.bot_controller.bot)
+            self.charla = Gemi(model, max_messages=20, bot=self.bot_controller.bot, channel_info=self.bot_controller.bot.channel_info)
 
             setattr(sys.modules['clases.twitch_zk.component_class'], 'charla', self.charla)
             
@@ -496,6 +541,14 @@ class MainWindow(QMainWindow):
             self.chat_area.setTextCursor(cursor)
             self.chat_area.ensureCursorVisible()
             
+    def update_chat_activity(self):
+        """Actualiza la etiqueta de actividad del chat"""
+        resumen = self.bot_controller.analytics.resumen()
+        actividad = (f"{resumen['1m']['mensajes_min']:.0f} msg/min | "
+                     f"{resumen['5m']['chatters']} chatters (5 min) | "
+                     f"+{resumen['1m']['joins_min']:.0f}/-{resumen['1m']['parts_min']:.0f} por min")
+        self.activity_label.setText(StyleManager.format_label_value("Chat", actividad, 'white', 'blue'))
+    
     def update_stream_info(self, title, category):
         """Actualiza la informacion del stream en la interfaz"""
         # Usar el nuevo metodo del StyleManager
@@ -596,6 +649,74 @@ class MainWindow(QMainWindow):
         # Mostrar dialogo
         dialog.exec_()
     
+    @pyqtSlot()
+    def show_chat_search(self):
+        """Muestra un dialogo para buscar mensajes en el historial del chat"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Buscar en Chat")
+        dialog.setMinimumWidth(600)
+        dialog.setMinimumHeight(400)
+        dialog.setStyleSheet(StyleManager.get_dialog_stylesheet())
+        
+        layout = QVBoxLayout(dialog)
+        
+        search_layout = QHBoxLayout()
+        search_label = QLabel("Buscar:")
+        search_label.setStyleSheet(f"color: {StyleManager.COLORS['blue']};")
+        search_layout.addWidget(search_label)
+        
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("Palabras del mensaje y Enter...")
+        search_layout.addWidget(search_input)
+        layout.addLayout(search_layout)
+        
+        # Lista de mensajes encontrados
+        result_list = QListWidget()
+        layout.addWidget(result_list)
+        
+        # Se busca al pulsar Enter (no en cada tecla): cada busqueda es una consulta FTS5
+        # que corre en un hilo para no congelar el bucle (chat, bot, GUI) mientras dura
+        busqueda = {"actual": 0, "abierto": True}
+        dialog.finished.connect(lambda _: busqueda.update(abierto=False))
+
+        async def search_messages_async(numero, chat_store, termino):
+            try:
+                resultados = await asyncio.to_thread(chat_store.buscar, termino, limite=200)
+                error = None
+            except Exception as e:
+                resultados, error = [], e
+            # Dialogo cerrado o ya se pidio otra busqueda: descartar
+            if not busqueda["abierto"] or numero != busqueda["actual"]:
+                return
+            result_list.clear()
+            if error is not None:
+                result_list.addItem(f"Error al buscar: {error}")
+                return
+            for ts, canal, usuario, mensaje in resultados:
+                result_list.addItem(f"[{datetime.fromtimestamp(ts).strftime('%d-%m-%Y %H:%M')}] {usuario}: {mensaje}")
+            if result_list.count() == 0:
+                result_list.addItem("No se encontraron coincidencias.")
+
+        def search_messages():
+            result_list.clear()
+            chat_store = self.bot_controller.chat_store
+            if chat_store is None:
+                result_list.addItem("El historial del chat no esta activo.")
+                return
+            busqueda["actual"] += 1
+            result_list.addItem("Buscando...")
+            asyncio.create_task(search_messages_async(busqueda["actual"], chat_store, search_input.text()))
+
+        search_input.returnPressed.connect(search_messages)
+        
+        # Botones (Ok no es el boton por defecto para que Enter busque en lugar de cerrar)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok)
+        buttons.button(QDialogButtonBox.Ok).setAutoDefault(False)
+        buttons.accepted.connect(dialog.accept)
+        layout.addWidget(buttons)
+        
+        dialog.exec_()
+    
     def edit_user_nickname(self, parent_dialog, all_users, current_row):
         """Abre un dialogo para editar el nickname del usuario seleccionado"""
         if current_row < 0 or current_row >= len(all_users):
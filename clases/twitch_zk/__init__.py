@@ -2,5 +2,10 @@ from .gemi_class import Gemi
 from .bot_class import Bot
 from .wss_class import WebSocketClient
 from .irc_class import TwitchIRCClient
+from .pool_class import IRCConnectionPool
+from .protocol_class import TwitchChatProtocol
+from .follower_class import FollowerIndex
+from .analytics_class import ChatAnalytics
 from .marker_class import TwitchMarkerManager
+from .watchdog_class import LoopWatchdog, watchdog_desde_config
 from .component_class import save_active_chat_history
\ No newline at end of file
@@ -0,0 +1,152 @@
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict
+import recurso.twitch_zk.metricas as metricas
+
+# Ventanas en segundos; el anillo cubre la mas larga
+VENTANAS = {"1m": 60, "5m": 300, "1h": 3600}
+
+class ChatAnalytics:
+    """Metricas en vivo del chat con memoria constante.
+
+    Cada serie (mensajes, JOIN, PART y chatters nuevos) es un anillo
+    preasignado de 3600 contadores por segundo (array 'I'). Para cada ventana
+    se mantiene una suma corriente: al registrar un evento se suma al segundo
+    actual y a las sumas, y al avanzar el reloj se resta el segundo que sale
+    de cada ventana. Registrar es O(1) y consultar es leer las sumas, sin
+    recorrer el historial.
+
+    Para los chatters unicos se guarda el ultimo segundo en que se vio a cada
+    usuario (como mucho `max_usuarios`, los vistos en la ultima hora): cuando
+    vuelve a escribir se mueve su marca del segundo anterior al actual, asi
+    cada usuario cuenta una sola vez por ventana.
+    """
+
+    def __init__(self, max_usuarios=50000, reloj=time.monotonic, nombre="chat_stats"):
+        """
+        Args:
+            max_usuarios: Usuarios recordados para contar unicos (si se supera, los mas antiguos se olvidan)
+            reloj: Funcion que devuelve los segundos actuales (inyectable para pruebas)
+        """
+        self.segundos = max(VENTANAS.values())
+        self.reloj = reloj
+        self.max_usuarios = max_usuarios
+        self.series = ("mensajes", "joins", "parts", "unicos")
+        self._anillos: Dict[str, array] = {serie: array('I', bytes(4 * self.segundos)) for serie in self.series}
+        self._sumas: Dict[str, Dict[str, int]] = {serie: dict.fromkeys(VENTANAS, 0) for serie in self.series}
+        self._visto: "OrderedDict[str, int]" = OrderedDict()  # user_id -> ultimo segundo visto
+        self._segundo = int(self.reloj())
+        self.total_mensajes = 0
+        metricas.registrar(nombre, self.estadisticas)
+
+    def _avanzar(self) -> int:
+        """Lleva el anillo hasta el segundo actual restando lo que sale de cada ventana"""
+        ahora = int(self.reloj())
+        if ahora <= self._segundo:
+            return self._segundo
+        if ahora - self._segundo >= self.segundos:
+            # Mas de una hora sin eventos: todo quedo fuera de las ventanas
+            for serie in self.series:
+                anillo = self._anillos[serie]
+                for i in range(self.segundos):
+                    anillo[i] = 0
+                self._sumas[serie] = dict.fromkeys(VENTANAS, 0)
+            self._visto.clear()
+        else:
+            for s in range(self._segundo + 1, ahora + 1):
+                for serie in self.series:
+                    anillo = self._anillos[serie]
+                    sumas = self._sumas[serie]
+                    for ventana, largo in VENTANAS.items():
+                        sumas[ventana] -= anillo[(s - largo) % self.segundos]
+                    anillo[s % self.segundos] = 0  # Mismo casillero que s - 3600, ya restado
+        self._segundo = ahora
+        return ahora
+
+    def _sumar(self, serie, segundo, cantidad=1):
+        self._anillos[serie][segundo % self.segundos] += cantidad
+        sumas = self._sumas[serie]
+        for ventana in VENTANAS:
+            sumas[ventana] += cantidad
+
+    def mensaje(self, user_id=None) -> None:
+        """Registra un mensaje de chat (y a su autor para los unicos)"""
+        ahora = self._avanzar()
+        self._sumar("mensajes", ahora)
+        self.total_mensajes += 1
+        if not user_id:
+            return
+
+        clave = str(user_id)
+        anterior = self._visto.get(clave)
+        if anterior == ahora:
+            return
+        if anterior is not None:
+            # Quitar su marca anterior de las ventanas que todavia la contienen
+            edad = ahora - anterior
+            if edad < self.segundos:
+                self._anillos["unicos"][anterior % self.segundos] -= 1
+                sumas = self._sumas["unicos"]
+                for ventana, largo in VENTANAS.items():
+                    if edad < largo:
+                        sumas[ventana] -= 1
+            self._visto.move_to_end(clave)
+        self._visto[clave] = ahora
+        self._sumar("unicos", ahora)
+
+        # Olvidar a quien no escribe hace mas de una hora (o a los mas antiguos si hay demasiados)
+        while self._visto:
+            primero, visto = next(iter(self._visto.items()))
+            if ahora - visto < self.segundos and len(self._visto) <= self.max_usuarios:
+                break
+            del self._visto[primero]
+
+    def join(self) -> None:
+        self._sumar("joins", self._avanzar())
+
+    def part(self) -> None:
+        self._sumar("parts", self._avanzar())
+
+    def ventana(self, serie: str, ventana: str = "1m") -> int:
+        """Total de la serie en la ventana ('1m', '5m' o '1h')"""
+        self._avanzar()
+        return self._sumas[serie][ventana]
+
+    def por_minuto(self, serie: str, ventana: str = "1m") -> float:
+        """Tasa por minuto de la serie promediada sobre la ventana"""
+        return self.ventana(serie, ventana) * 60 / VENTANAS[ventana]
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """Mensajes/min, chatters unicos y JOIN/PART por minuto en cada ventana"""
+        self._avanzar()
+        return {
+            ventana: {
+                "mensajes_min": self._sumas["mensajes"][ventana] * 60 / largo,
+                "chatters": self._sumas["unicos"][ventana],
+                "joins_min": self._sumas["joins"][ventana] * 60 / largo,
+                "parts_min": self._sumas["parts"][ventana] * 60 / largo,
+            }
+            for ventana, largo in VENTANAS.items()
+        }
+
+    def formatear(self) -> str:
+        """Resumen en texto plano para la consola"""
+        lineas = []
+        for ventana, datos in self.resumen().items():
+            lineas.append(f"  {ventana:>3}: {datos['mensajes_min']:.1f} msg/min, {datos['chatters']} chatters, "
+                          f"{datos['joins_min']:.1f} JOIN/min, {datos['parts_min']:.1f} PART/min")
+        return "\n".join(lineas)
+
+    def estadisticas(self):
+        """Metricas para el registro central (ventana de 1 minuto y 5 minutos)"""
+        resumen = self.resumen()
+        return {
+            "mensajes_min": resumen["1m"]["mensajes_min"],
+            "chatters_5m": resumen["5m"]["chatters"],
+            "chatters_1h": resumen["1h"]["chatters"],
+            "joins_min": resumen["1m"]["joins_min"],
+            "parts_min": resumen["1m"]["parts_min"],
+            "usuarios_recordados": len(self._visto),
+            "total_mensajes": self.total_mensajes
+        }
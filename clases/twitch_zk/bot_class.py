@@ -4,6 +4,10 @@ import logging
 import twitchio
 import recurso.gui.utils_gui as utils_gui
 from bd import Toker
+from clases.twitch_zk.followcache_class import FollowCache
+from clases.twitch_zk.channelinfo_class import ChannelInfoCache
+from clases.twitch_zk.scheduler_class import ChatScheduler, MODERACION
+from clases.twitch_zk.responsecache_class import ResponseCache
 from twitchio import eventsub
 from dotenv import load_dotenv
 from twitchio.ext import commands
@@ -15,7 +19,7 @@ BOT_ID = os.getenv("BOT_ID")
 BROADCASTER_ID = os.getenv("BROADCASTER_ID")
 
 class Bot(commands.Bot):
-    def __init__(self, *, token_database, userbots, user_data_twitch, msg_type, message_callback=None) -> None:
+    def __init__(self, *, token_database, userbots, user_data_twitch, msg_type, message_callback=None, follower_index=None, chat_store=None, analytics=None) -> None:
         self.token_manager = Toker(token_database)
         super().__init__(
             client_id=str(CLIENT_ID_APP),
@@ -27,6 +31,13 @@ class Bot(commands.Bot):
         self.user_data_twitch = user_data_twitch
         self.msg_type = msg_type
         self.message_callback = message_callback
+        self.follower_index = follower_index  # Indice local de seguidores compartido con IRC
+        self.follow_cache = FollowCache()     # Estado de follow por user_id para event_message
+        self.channel_info = ChannelInfoCache(self._consultar_canal)  # Titulo/categoria al dia por event_channel_update
+        self.chat_salida = ChatScheduler()    # Cola de salida al chat con prioridad y limite de Twitch
+        self.respuestas_ia = ResponseCache()  # Respuestas de Gemi a preguntas repetidas (sobrevive a ?on/?off)
+        self.chat_store = chat_store          # Almacen persistente de mensajes (opcional)
+        self.analytics = analytics            # Metricas en vivo del chat (opcional)
         self.LOGGER = logging.getLogger("BOT")
         self.LOGGER.setLevel(logging.INFO)
 
@@ -34,6 +45,7 @@ class Bot(commands.Bot):
         # Importacion local para evitar referencias circulares
         from clases.twitch_zk.component_class import MyComponent
         
+        self.chat_salida.iniciar()
         # Agregar nuestro componente que contiene nuestros comandos...
         await self.add_component(MyComponent(self))
 
@@ -115,35 +127,51 @@ class Bot(commands.Bot):
             
             await asyncio.sleep(180)
     
+    async def _consultar_canal(self):
+        """Informacion del canal desde Helix (solo para sembrar o refrescar la cache)"""
+        canales = await self.fetch_channels([str(BROADCASTER_ID)])
+        return canales[0]
+
     async def event_ready(self) -> None:
         utils_gui.log_and_callback(self, f"\033[1m\033[42m\033[30m   BOT Conectado   \033[0m", self.msg_type)
-        channel_info = await self.fetch_channels([str(BROADCASTER_ID)])
+        # Siembra la cache; desde aqui la mantiene event_channel_update
+        channel_info = await self.channel_info.obtener()
         if self.message_callback:
-            self.message_callback(f"{channel_info[0].title}|{channel_info[0].game_name}", "stream_info")
+            self.message_callback(f"{channel_info.title}|{channel_info.game_name}", "stream_info")
         else:
-            self.LOGGER.info(f"\033[32m{channel_info[0].title}\033[0m | \033[32m{channel_info[0].game_name}\033[0m")
+            self.LOGGER.info(f"\033[32m{channel_info.title}\033[0m | \033[32m{channel_info.game_name}\033[0m")
 
         asyncio.create_task(self.get_viewer_count())
     
+    async def close(self, **options) -> None:
+        # Dejar salir lo que quedo en cola antes de cerrar la conexion
+        await self.chat_salida.detener()
+        await super().close(**options)
+    
     async def event_command_error(self, payload):
         """Maneja errores en la ejecucion de comandos"""
         context = payload.context
         error = payload.exception
         
+        # Importar excepciones correctas
+        from twitchio.ext.commands.exceptions import CommandNotFound, MissingRequiredArgument, GuardFailure, CommandOnCooldown
+        
+        if isinstance(error, CommandOnCooldown):
+            # @commands.cooldown: se ignora en silencio (responder tambien gastaria mensajes del limite del bot)
+            self.LOGGER.debug(f"?{context.command.name} de {context.chatter.name} ignorado por cooldown ({error.remaining:.0f} s)")
+            return
+        
         # Registra el error en los logs
         self.LOGGER.error(f"Error en comando {context.command.name if context.command else 'desconocido'}: {error}")
         
-        # Importar excepciones correctas
-        from twitchio.ext.commands.exceptions import CommandNotFound, MissingRequiredArgument, GuardFailure
-        
         if isinstance(error, CommandNotFound):
             # Ignorar silenciosamente comandos no encontrados
             return
         elif isinstance(error, MissingRequiredArgument):
-            await context.send(f"@{context.author.name} Faltan argumentos para el comando.")
+            self.chat_salida.enviar(context.send, f"@{context.author.name} Faltan argumentos para el comando.", MODERACION, context.channel.id)
         elif isinstance(error, GuardFailure):
             # Se dispara cuando fallan los decoradores como @commands.is_broadcaster()
-            await context.send(f"@{context.author.name} No tienes permiso para usar este comando.")
+            self.chat_salida.enviar(context.send, f"@{context.author.name} No tienes permiso para usar este comando.", MODERACION, context.channel.id)
         else:
             # Otros errores inesperados
             self.LOGGER.error(f"Error no manejado: {error}")
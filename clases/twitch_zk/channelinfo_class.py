@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("CANAL_INFO")
+LOGGER.setLevel(logging.INFO)
+
+class InfoCanal:
+    """Titulo y categoria del canal (lo que usan ?title, Gemi y la GUI)"""
+    __slots__ = ("broadcaster", "title", "game_name", "game_id")
+
+    def __init__(self, broadcaster, title, game_name, game_id=None):
+        self.broadcaster = broadcaster
+        self.title = title
+        self.game_name = game_name
+        self.game_id = game_id
+
+    def __repr__(self):
+        return f"InfoCanal({self.broadcaster!r}, title={self.title!r}, game_name={self.game_name!r})"
+
+class ChannelInfoCache:
+    """Cache de la informacion del canal actualizada por eventos.
+
+    Se siembra con una consulta a Helix la primera vez que se pide y despues
+    la mantiene al dia event_channel_update, asi leerla no cuesta llamadas a
+    la API. Solo si pasa `ttl` sin eventos ni consultas se vuelve a consultar
+    (una sola consulta en vuelo aunque la pidan varios a la vez). Cada cambio
+    sube `version`, que permite a Gemi saber si su contexto quedo viejo.
+    """
+
+    def __init__(self, consulta: Callable[[], Awaitable[Any]], ttl=None):
+        """
+        Args:
+            consulta: Corrutina que devuelve el ChannelInfo del canal (p. ej. fetch_channels)
+            ttl: Segundos sin novedades tras los que se vuelve a consultar (por defecto CANAL_INFO_TTL o 1800)
+        """
+        self.consulta = consulta
+        self.ttl = ttl if ttl is not None else float(os.getenv("CANAL_INFO_TTL", "1800"))
+        self.actual: Optional[InfoCanal] = None
+        self.version = 0
+        self._vence = 0.0
+        self._en_vuelo: Optional[asyncio.Future] = None
+
+        # Estadisticas
+        self.aciertos = 0
+        self.compartidas = 0
+        self.consultas = 0
+        self.eventos = 0
+        self.errores = 0
+        metricas.registrar("canal_info", self.estadisticas)
+
+    async def obtener(self) -> InfoCanal:
+        """Informacion vigente del canal; solo consulta Helix si no hay o esta vencida"""
+        if self.actual is not None and self._vence > time.monotonic():
+            self.aciertos += 1
+            return self.actual
+
+        if self._en_vuelo is not None:
+            self.compartidas += 1
+            return await asyncio.shield(self._en_vuelo)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo = futuro
+        version = self.version
+        try:
+            self.consultas += 1
+            info = await self.consulta()
+        except Exception as e:
+            self.errores += 1
+            if self.actual is not None:
+                # Mejor un dato viejo que ninguno; se reintenta en la proxima lectura
+                LOGGER.warning(f"No se pudo refrescar la informacion del canal: {e}")
+                futuro.set_result(self.actual)
+                return self.actual
+            futuro.set_exception(e)
+            futuro.exception()  # Marcar como recuperada si nadie mas la esperaba
+            raise
+        else:
+            # Si llego un evento mientras la consulta estaba en vuelo, el evento es mas nuevo
+            if self.version == version:
+                self._guardar(InfoCanal(info.user.name, info.title, info.game_name, info.game_id))
+            else:
+                self._vence = time.monotonic() + self.ttl
+            futuro.set_result(self.actual)
+            return self.actual
+        finally:
+            self._en_vuelo = None
+
+    def actualizar(self, title=None, game_name=None, game_id=None, broadcaster=None) -> None:
+        """Aplica un cambio conocido (event_channel_update o un cambio hecho por el bot)"""
+        self.eventos += 1
+        if self.actual is None:
+            if broadcaster is None:
+                return  # Sin semilla ni broadcaster no hay con que completar; la primera lectura consultara
+            self.actual = InfoCanal(broadcaster, title, game_name, game_id)
+        if title is not None:
+            self.actual.title = title
+        if game_name is not None:
+            self.actual.game_name = game_name
+        if game_id is not None:
+            self.actual.game_id = game_id
+        self._guardar(self.actual)
+
+    def _guardar(self, info: InfoCanal) -> None:
+        self.actual = info
+        self.version += 1
+        self._vence = time.monotonic() + self.ttl
+
+    def invalidar(self) -> None:
+        """Fuerza una consulta en la proxima lectura (conserva el dato para los fallos)"""
+        self._vence = 0.0
+
+    def estadisticas(self):
+        """Lecturas servidas desde la cache, consultas a Helix y eventos aplicados"""
+        total = self.aciertos + self.compartidas + self.consultas
+        return {
+            "aciertos": self.aciertos,
+            "compartidas": self.compartidas,
+            "consultas_helix": self.consultas,
+            "tasa_acierto": ((self.aciertos + self.compartidas) / total) if total else 0.0,
+            "eventos": self.eventos,
+            "version": self.version,
+            "errores": self.errores
+        }
@@ -0,0 +1,398 @@
+import os
+import time
+import asyncio
+from abc import ABC, abstractmethod
+import logging
+from typing import Optional, Set, Dict, Tuple
+import recurso.twitch_zk.utils as utils
+import recurso.gui.utils_gui as utils_gui
+from clases.twitch_zk.protocol_class import TwitchChatProtocol
+from clases.twitch_zk.helix_class import HelixUserBatcher
+from clases.twitch_zk.workers_class import HandlerWorkers
+
+class ChannelState:
+    """Estado de un canal dentro de una conexión de chat"""
+    def __init__(self, name, user_data_twitch=None, follower_index=None, broadcaster_id=None, prefijo="", analytics=None, consultar_follow=True):
+        self.name = name.lower().lstrip("#")
+        self.joined_users: Set[str] = set()
+        self.user_data_twitch = user_data_twitch if user_data_twitch is not None else {}
+        self.follower_index = follower_index
+        self.broadcaster_id = broadcaster_id  # None = BROADCASTER_ID del .env
+        self.prefijo = prefijo                # Prefijo de los mensajes en consola/GUI
+        self.analytics = analytics            # ChatAnalytics del canal (JOIN/PART por minuto)
+        # Sin indice, el follow solo se consulta en Helix si el token tiene permiso en el canal (el propio)
+        self.consultar_follow = consultar_follow
+        self.previos: Set[str] = set()        # Presentes antes de reconectar (ver reiniciar_presencia)
+        self.previos_hasta = 0.0
+
+    def reiniciar_presencia(self, gracia=60.0):
+        """Vacia los presentes antes de volver a hacer JOIN (tras un corte o al cambiar de conexion).
+
+        Twitch reenvia el JOIN de quienes siguen en el canal; si llega dentro de
+        `gracia` segundos no se cuenta ni se muestra como una entrada nueva.
+        Quien se fue durante el corte no vuelve a aparecer y deja de figurar.
+        """
+        self.previos = set(self.joined_users)
+        self.previos_hasta = time.monotonic() + gracia
+        self.joined_users.clear()
+
+    def volvio(self, user) -> bool:
+        """True si `user` ya estaba antes del ultimo reinicio de presencia"""
+        if not self.previos:
+            return False
+        if time.monotonic() > self.previos_hasta:
+            self.previos.clear()
+            return False
+        if user in self.previos:
+            self.previos.discard(user)
+            return True
+        return False
+
+class TwitchChatClientBase(ABC):
+    """Lógica común de los clientes de chat (IRC por TCP y por WebSocket).
+
+    El protocolo (TwitchChatProtocol) convierte lo recibido en eventos y esta
+    clase los despacha: PING y RECONNECT en el mismo bucle de lectura, el resto
+    a las colas de HandlerWorkers. Los manejadores, el enriquecimiento de
+    JOIN/PART y el estado por canal viven aquí una sola vez; las subclases solo
+    implementan el transporte (connect, listen, _send_raw, disconnect).
+    """
+
+    def __init__(self, oauth_token, username, channel, userbots, user_data_twitch, msg_type, message_callback=None, user_lookup=None, follower_index=None, nombre="chat", logger="CHAT", analytics=None):
+        self.oauth_token = oauth_token
+        self.username = username
+        self.channel = channel
+        self.nombre = nombre
+        self.running = False
+        self.userbots = userbots
+        self.user_data_twitch = user_data_twitch
+        self.message_callback = message_callback
+        self.msg_type = msg_type
+        self.LOGGER = logging.getLogger(logger)
+        self.LOGGER.setLevel(logging.INFO)
+
+        # Busquedas de usuarios en Helix agrupadas por lotes
+        self.user_lookup = user_lookup or HelixUserBatcher()
+        self._lookup_propio = user_lookup is None  # Si es compartido (pool) lo cierra su dueño
+
+        # Indice local de seguidores (si no hay, se consulta Helix)
+        self.follower_index = follower_index
+
+        # Estado por canal; `channel` es el canal principal (puede ser None en el pool)
+        self.channels: Dict[str, ChannelState] = {}
+        self.principal: Optional[ChannelState] = None
+        if channel:
+            self.principal = ChannelState(channel, user_data_twitch, follower_index, analytics=analytics)
+            self.channels[self.principal.name] = self.principal
+            self.joined_users = self.principal.joined_users
+        else:
+            self.joined_users: Set[str] = set()
+
+        # Tabla de despacho por comando IRC
+        self._handlers = {
+            "PING": self._handle_ping,
+            "CLEARCHAT": self._handle_clearchat,
+            "CLEARMSG": self._handle_clearmsg,
+            "JOIN": self._handle_join,
+            "PART": self._handle_part,
+            "RECONNECT": self._handle_reconnect,
+            "001": self._handle_bienvenida,
+            "NOTICE": self._handle_notice,
+        }
+
+        # Comandos de control que se atienden en el mismo bucle de lectura
+        self._control = {"PING", "RECONNECT", "001", "NOTICE"}
+        self._reconnect_pedido = False
+
+        # Resultado del login de la sesion actual (los reinicia cada connect)
+        self._bienvenida = False
+        self._auth_fallida = False
+
+        # Protocolo sin E/S: solo construye eventos para los comandos con manejador
+        self.protocolo = TwitchChatProtocol(self._handlers)
+
+        # Colas acotadas por tipo con trabajadores (el bucle de lectura nunca espera a un manejador)
+        self.workers = HandlerWorkers(self._handlers, nombre=f"{nombre}_colas")
+
+        # Enriquecimiento de JOIN en tareas propias, fuera de los trabajadores; el limite
+        # supera el lote de Helix para que toda una rafaga llegue a la misma ventana
+        self._joins_en_vuelo = asyncio.Semaphore(int(os.getenv("IRC_JOIN_EN_VUELO", "500")))
+        self._tareas_membresia: Set[asyncio.Task] = set()
+        # Ultima tarea de JOIN/PART pendiente por (canal, usuario): la siguiente espera a que termine
+        self._pendientes_usuario: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    @abstractmethod
+    async def connect(self):
+        """Abrir la conexión, autenticar y unirse a los canales"""
+
+    @abstractmethod
+    async def listen(self):
+        """Bucle de lectura: pasa lo recibido al protocolo y despacha los eventos"""
+
+    @abstractmethod
+    async def _send_raw(self, message):
+        """Enviar una línea al servidor"""
+
+    @abstractmethod
+    async def disconnect(self):
+        """Cerrar la conexión y detener los manejadores"""
+
+    async def _despachar(self, eventos):
+        """Control en el bucle de lectura; el resto a la cola de su tipo"""
+        for evento in eventos:
+            try:
+                if evento.command in self._control:
+                    await self._handlers[evento.command](evento)
+                else:
+                    self.workers.encolar(evento)
+            except Exception as e:
+                self.LOGGER.error(f"Error despachando {evento!r}: {e}")
+
+    async def _handle_ping(self, evento):
+        """Responder PING con PONG"""
+        await self._send_raw(self.protocolo.pong(evento.target))
+
+    async def _handle_reconnect(self, evento):
+        """El servidor va a reiniciarse: reconectar en cuanto se procese el bloque actual"""
+        self.LOGGER.info("Servidor IRC solicitó RECONNECT")
+        self._reconnect_pedido = True
+
+    async def _handle_bienvenida(self, evento):
+        """Bienvenida 001: el servidor acepto el login"""
+        self._bienvenida = True
+
+    async def _handle_notice(self, evento):
+        """Avisos del servidor; un login rechazado invalida la sesion"""
+        if evento.auth_fallida:
+            self._auth_fallida = True
+            self.LOGGER.error(f"El servidor rechazó el login: {evento.text}")
+        else:
+            self.LOGGER.info(f"NOTICE {evento.channel or '*'}: {evento.text}")
+
+    async def _handle_clearchat(self, evento):
+        """Manejar eventos CLEARCHAT"""
+        try:
+            estado = self.channels.get(evento.channel)
+            if estado is None:
+                return
+
+            # Verificar si es para usuario específico o limpieza general
+            if evento.user:
+                # Ban/timeout a usuario específico
+                if evento.duration:
+                    action_type = f"timeout por {evento.duration} segundos"
+                else:
+                    action_type = "ban permanente"
+                if evento.reason:
+                    action_type += f" - Razón: {evento.reason}"
+
+                utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m {estado.prefijo}Usuario {evento.user} recibió {action_type} \033[0m", self.msg_type)
+            else:
+                # Limpieza completa del chat
+                utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m {estado.prefijo}Chat limpiado completamente \033[0m", self.msg_type)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error en _handle_clearchat: {e}")
+
+    async def _handle_clearmsg(self, evento):
+        """Manejar eventos CLEARMSG"""
+        try:
+            estado = self.channels.get(evento.channel)
+            if estado is None:
+                return
+
+            login = evento.user or "desconocido"
+
+            # Contenido del mensaje eliminado si está disponible
+            msg_content = f" - Mensaje: '{evento.text}'" if evento.text else ""
+
+            utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m {estado.prefijo}Mensaje de {login} eliminado{msg_content} \033[0m", self.msg_type)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error en _handle_clearmsg: {e}")
+
+    async def _handle_join(self, evento):
+        """Manejar eventos JOIN"""
+        try:
+            user = evento.user
+            estado = self.channels.get(evento.channel)
+            if user and estado is not None:
+                if user not in self.userbots and user not in estado.joined_users:
+                    estado.joined_users.add(user)
+                    # Tras reconectar Twitch reenvía JOIN de quienes ya estaban
+                    if estado.volvio(user):
+                        return
+                    if estado.analytics is not None:
+                        estado.analytics.join()
+                    # La busqueda no ocupa al trabajador: los JOIN de una rafaga (un raid)
+                    # quedan todos pendientes en la misma ventana y comparten lote en Helix
+                    self._en_orden(estado, user, self._join_en_fondo)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error en _handle_join: {e}")
+
+    async def _join_en_fondo(self, estado, user):
+        async with self._joins_en_vuelo:
+            await self._process_user_join(estado, user)
+
+    def _en_orden(self, estado, user, procesar):
+        """Corre `procesar(estado, user)` en una tarea propia, despues de lo pendiente del mismo usuario"""
+        clave = (estado.name, user)
+        previa = self._pendientes_usuario.get(clave)
+        tarea = asyncio.create_task(procesar(estado, user) if previa is None else self._tras(previa, procesar, estado, user))
+        self._pendientes_usuario[clave] = tarea
+        self._tareas_membresia.add(tarea)
+
+        def terminada(t):
+            self._tareas_membresia.discard(t)
+            if self._pendientes_usuario.get(clave) is t:
+                del self._pendientes_usuario[clave]
+        tarea.add_done_callback(terminada)
+
+    @staticmethod
+    async def _tras(previa, procesar, estado, user):
+        await asyncio.wait([previa])  # Sin propagar su error ni su cancelacion
+        await procesar(estado, user)
+
+    def _detener_manejadores(self):
+        """Detiene los trabajadores y cancela los JOIN/PART que siguen enriqueciendose"""
+        self.workers.detener()
+        for tarea in list(self._tareas_membresia):
+            tarea.cancel()
+        self._tareas_membresia.clear()
+        self._pendientes_usuario.clear()
+
+    async def _handle_part(self, evento):
+        """Manejar eventos PART"""
+        try:
+            user = evento.user
+            estado = self.channels.get(evento.channel)
+            if user and estado is not None:
+                if user in estado.joined_users:
+                    estado.joined_users.remove(user)
+                    if estado.analytics is not None:
+                        estado.analytics.part()
+                    if (estado.name, user) in self._pendientes_usuario:
+                        # Su JOIN sigue buscando el ID: el PART sale despues, sin ocupar al trabajador
+                        self._en_orden(estado, user, self._process_user_part)
+                    else:
+                        await self._process_user_part(estado, user)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error en _handle_part: {e}")
+
+    @staticmethod
+    def _con_follow(estado) -> bool:
+        """Si el estado de follow del canal se puede conocer (indice local o consulta permitida)"""
+        return estado.follower_index is not None or estado.consultar_follow
+
+    async def _follow_fecha(self, estado, user_id, guardada=None):
+        """Fecha de follow desde el indice local (O(1)), o desde Helix si el indice no alcanza y se permite.
+
+        Una ausencia en el indice puede ser un follow posterior al snapshot: solo se
+        toma como "no sigue" si el indice es confiable para ese usuario. Si no se
+        puede confirmar, se devuelve lo `guardada` para no degradarlo.
+        """
+        indice = estado.follower_index
+        if indice is not None and indice.cargado:
+            fecha = indice.fecha(user_id)
+            if fecha is not None or indice.confiable(user_id, guardada):
+                return fecha
+        if not estado.consultar_follow or not user_id:
+            return guardada
+        fecha = await asyncio.to_thread(utils.verificar_follow_fecha, user_id, estado.broadcaster_id)
+        if indice is not None and indice.cargado:
+            # Lo confirmado por Helix queda en el indice: el proximo JOIN/PART no vuelve a consultar
+            if fecha is not None:
+                indice.agregar(user_id, fecha)
+            else:
+                indice.sin_follow(user_id)
+        return fecha
+
+    async def _process_user_join(self, estado, user):
+        """Procesar cuando un usuario se une al canal"""
+        try:
+            user_data_twitch = estado.user_data_twitch
+            user_id = user_data_twitch[user]["id"] if user in user_data_twitch else None
+            con_follow = self._con_follow(estado)
+            # En canales ajenos sin indice no hay follow que consultar: ni Helix ni busqueda del ID
+            if not user_id and con_follow:
+                user_id = await self.user_lookup.buscar_id(user)
+            guardada = user_data_twitch[user]["follow_date"] if user in user_data_twitch else None
+            follow_first_time = await self._follow_fecha(estado, user_id, guardada) if con_follow else None
+
+            if user in user_data_twitch:
+                follow_status = user_data_twitch[user]["follow_date"]
+
+                if follow_first_time is None and follow_status not in ["Visita", "New", "Renegado"]:
+                    follow_status = "Renegado"
+                    user_data_twitch[user]["follow_date"] = follow_status
+            else:
+                if follow_first_time is not None:
+                    follow_status = follow_first_time
+                else:
+                    follow_status = "New" if con_follow else "Visita"
+
+                user_data_twitch[user] = {
+                    "id": user_id,
+                    "follow_date": follow_status,
+                    "color": utils.assign_random_color(),
+                    "nickname": ""
+                }
+
+            user_color = user_data_twitch[user]["color"]
+            nickuser = user_data_twitch[user]["nickname"]
+            formatted_nick = f"[{nickuser}] " if nickuser else ""
+
+            utils_gui.log_and_callback(self, f"{estado.prefijo}{user_color}{user}\033[0m {formatted_nick}({follow_status}) \033[32mse unió al canal\033[0m", self.msg_type)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error procesando JOIN de {user}: {e}")
+
+    async def _process_user_part(self, estado, user):
+        """Procesar cuando un usuario sale del canal"""
+        try:
+            user_data_twitch = estado.user_data_twitch
+            if user not in user_data_twitch:
+                return
+
+            user_id = user_data_twitch[user]["id"]
+
+            if user_id and self._con_follow(estado):
+                follow_status = user_data_twitch[user]["follow_date"]
+                follow_last_time = await self._follow_fecha(estado, user_id, follow_status)
+
+                if follow_last_time is None and follow_status not in ["Visita", "New", "Renegado"]:
+                    follow_status = "Renegado"
+                    user_data_twitch[user]["follow_date"] = follow_status
+            else:
+                follow_status = user_data_twitch[user]["follow_date"]
+
+            user_color = user_data_twitch[user]["color"]
+            nickuser = user_data_twitch[user]["nickname"]
+            formatted_nick = f"[{nickuser}] " if nickuser else ""
+
+            utils_gui.log_and_callback(self, f"{estado.prefijo}{user_color}{user}\033[0m {formatted_nick}({follow_status}) \033[31msalió del canal\033[0m", self.msg_type)
+
+        except Exception as e:
+            self.LOGGER.error(f"Error procesando PART de {user}: {e}")
+
+    async def agregar_canal(self, estado: ChannelState):
+        """Agregar un canal a esta conexión (JOIN inmediato si ya está conectada)"""
+        self.channels[estado.name] = estado
+        if self.running:
+            await self._send_raw(self.protocolo.join(estado.name))
+
+    async def quitar_canal(self, name) -> Optional[ChannelState]:
+        """Quitar un canal de esta conexión; devuelve su estado para moverlo a otra"""
+        estado = self.channels.pop(name.lower().lstrip("#"), None)
+        if estado is not None and self.running:
+            await self._send_raw(self.protocolo.part(estado.name))
+        return estado
+
+    def get_connected_users(self, channel=None):
+        """Obtener la lista de usuarios conectados (del canal principal por defecto)"""
+        if channel is None:
+            return list(self.joined_users)
+        estado = self.channels.get(channel.lower().lstrip("#"))
+        return list(estado.joined_users) if estado else []
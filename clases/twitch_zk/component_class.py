@@ -4,6 +4,10 @@ import twitchio # v3.0.0b3
 import recurso.twitch_zk.utils as utils
 import recurso.gui.utils_gui as utils_gui
 from clases.twitch_zk import Gemi
+from clases.twitch_zk.pipeline_class import EventPipeline
+from clases.twitch_zk.flood_class import FloodDetector
+from clases.twitch_zk.scheduler_class import MODERACION, IA, INFO
+from clases.twitch_zk.cooldown_class import compartido
 from twitchio.ext import commands
 from dotenv import load_dotenv
 
@@ -12,74 +16,186 @@ BROADCASTER_NAME = os.getenv("BROADCASTER")
 BOT_NAME = os.getenv("BOT")
 charla = None
 
+LOGGER = logging.getLogger("COMPONENT")
+LOGGER.setLevel(logging.INFO)
+
+def salvo_elevados(clave):
+    """Clave para @commands.cooldown que exime a moderadores y al broadcaster (con None twitchio no aplica el cooldown)"""
+    def obtener(ctx: commands.Context):
+        if ctx.chatter.moderator or ctx.chatter.broadcaster:
+            return None
+        return clave(ctx)
+    return obtener
+
 def save_active_chat_history():
     """Guarda el historial del chat activo si existe y tiene mensajes"""
     global charla
     if charla is not None and hasattr(charla, 'get_message_count'):
         if charla.get_message_count() > 0:
-            print("Guardando historial de chat activo...")
+            LOGGER.info("Guardando historial de chat activo...")
             charla.terminate(False)
     return
 
 class MyComponent(commands.Component):
     def __init__(self, bot) -> None:
         self.bot = bot
-        self.LOGGER = logging.getLogger("COMPONENT")
-        self.LOGGER.setLevel(logging.INFO)
+        self.LOGGER = LOGGER
+
+        # Los listeners solo ingresan el evento; enriquecer y mostrar corren aparte
+        self.eventos = EventPipeline("eventos")
+        self.eventos.etapa(
+            "enriquecer", self._enriquecer,
+            trabajadores=int(os.getenv("EVENTOS_WORKERS", "4")),
+            clave=lambda evento: evento[2],                                # Orden por usuario
+            fusion=lambda evento: evento[0] if evento[0] == "channel_update" else None
+        )
+        self.eventos.etapa("mostrar", self._mostrar)
+
+        # Oleadas de mensajes copiados desde varias cuentas y flood de un mismo usuario
+        self.flood = FloodDetector(on_alerta=self._alerta_flood)
+
+        # Enriquecimiento por tipo de evento: devuelve el texto a mostrar (o None)
+        self._enriquecedores = {
+            "message": self._enriquecer_message,
+            "follow": self._enriquecer_follow,
+            "redemption": self._enriquecer_redemption,
+            "raid": self._enriquecer_raid,
+            "mod_action": self._enriquecer_mod_action,
+            "channel_update": self._enriquecer_channel_update,
+        }
+
+    async def component_load(self) -> None:
+        self.eventos.iniciar()
+
+    async def component_teardown(self) -> None:
+        await self.eventos.detener()
+
+    async def _ingresar(self, tipo, payload, user_id=None) -> None:
+        """Ingesta: el evento va al pipeline; user_id mantiene en orden los de un mismo usuario"""
+        await self.eventos.ingresar((tipo, payload, user_id or tipo))
+
+    async def _enriquecer(self, evento):
+        tipo, payload, _ = evento
+        return await self._enriquecedores[tipo](payload)
+
+    def _enviar(self, ctx: commands.Context, texto: str, prioridad=INFO, empaquetar=True) -> None:
+        """Encola un mensaje en la salida del bot (se puede juntar con otros cortos, salvo empaquetar=False)"""
+        self.bot.chat_salida.enviar(ctx.send, texto, prioridad, ctx.channel.id, empaquetar=empaquetar)
+
+    def _responder(self, ctx: commands.Context, texto: str, prioridad=MODERACION) -> None:
+        """Encola una respuesta (reply) al mensaje del comando; no se junta con otros"""
+        self.bot.chat_salida.enviar(ctx.reply, texto, prioridad, ctx.channel.id, empaquetar=False)
+
+    def _mostrar(self, texto) -> None:
+        utils_gui.log_and_callback(self.bot, texto, self.bot.msg_type)
 
     @commands.Component.listener()
     async def event_message(self, payload: twitchio.ChatMessage) -> None:
+        if self.bot.chat_store is not None:
+            # Solo encola en memoria; el hilo del almacen escribe por lotes
+            self.bot.chat_store.agregar(payload.chatter.name, payload.text, payload.broadcaster.name, payload.chatter.id, payload.id)
+        if self.bot.analytics is not None:
+            self.bot.analytics.mensaje(payload.chatter.id)
+        await self._ingresar("message", payload, payload.chatter.id)
+
+    @commands.Component.listener()
+    async def event_follow(self, payload: twitchio.ChannelFollow) -> None:
+        # Evento enviado cuando alguien sigue al canal...
+        # El estado se actualiza aqui mismo: si el pipeline descarta el evento, el follow no se pierde
+        self._registrar_follow(payload)
+        await self._ingresar("follow", payload, payload.user.id)
+
+    @commands.Component.listener()
+    async def event_custom_redemption_add(self, payload: twitchio.ChannelPointsRedemptionAdd) -> None:
+        # Evento enviado cuando alguien canjea un punto de canal...
+        await self._ingresar("redemption", payload, payload.user.id)
+
+    @commands.Component.listener()
+    async def event_raid(self, payload: twitchio.ChannelRaid) -> None:
+        # Evento enviado cuando alguien hace un raid al canal...
+        await self._ingresar("raid", payload)
+
+    @commands.Component.listener()
+    async def event_mod_action(self, payload: twitchio.ChannelModerate) -> None:
+        # Evento enviado cuando alguien modera el canal...
+        await self._ingresar("mod_action", payload)
+
+    @commands.Component.listener()
+    async def event_channel_update(self, payload: twitchio.ChannelUpdate) -> None:
+        # Evento enviado cuando se actualiza el titulo o la categoria del canal...
+        # La cache se actualiza aqui mismo para que ?title y Gemi lo vean sin esperar al pipeline
+        self.bot.channel_info.actualizar(payload.title, payload.category_name, payload.category_id, payload.broadcaster.name)
+        await self._ingresar("channel_update", payload)
+
+    async def _enriquecer_message(self, payload: twitchio.ChatMessage):
         usuario = payload.chatter
         if usuario.name == BOT_NAME:
-            utils_gui.log_and_callback(self.bot, f"\033[95m{usuario.name}\033[0m (BOTME): {payload.text}", self.bot.msg_type)
+            return f"\033[95m{usuario.name}\033[0m (BOTME): {payload.text}"
         elif usuario.name == BROADCASTER_NAME:
-            utils_gui.log_and_callback(self.bot, f"\033[92m{usuario.name}\033[0m (BROADCASTER): {payload.text}", self.bot.msg_type)
+            return f"\033[92m{usuario.name}\033[0m (BROADCASTER): {payload.text}"
         elif usuario.name in self.bot.userbots:
-            utils_gui.log_and_callback(self.bot, f"\033[93m{usuario.name}\033[0m (BOT): {payload.text}", self.bot.msg_type)
-        else:
-            follow = await usuario.follow_info()
-            
-            if follow is None:
-                if usuario.name in self.bot.user_data_twitch:
-                    estado_seguimiento = self.bot.user_data_twitch[usuario.name]["follow_date"]
-                    
-                    if estado_seguimiento != "Visita" and estado_seguimiento != "New" and estado_seguimiento != "Renegado":
-                        follow_status = "Renegado"
-                        self.bot.user_data_twitch[usuario.name]["follow_date"] = follow_status
-                    else:
-                        follow_status = estado_seguimiento
-                else:
-                    follow_status = "Visita"
-                    self.bot.user_data_twitch[usuario.name] = {
-                        "id": usuario.id,
-                        "follow_date": follow_status,
-                        "color": utils.assign_random_color(),
-                        "nickname": ""
-                    }
-            else: #? Es seguidor
-                follow_status = f"{follow.followed_at.strftime('%d-%m-%Y')}"
-                if usuario.name not in self.bot.user_data_twitch:
-                    self.bot.user_data_twitch[usuario.name] = {
-                        "id": usuario.id,
-                        "follow_date": follow_status,
-                        "color": utils.assign_random_color(),
-                        "nickname": ""
-                    }
-                else:
+            return f"\033[93m{usuario.name}\033[0m (BOT): {payload.text}"
+
+        self.flood.analizar(usuario.name, payload.text)
+        followed_at = await self.bot.follow_cache.obtener(usuario.id, lambda: self._consultar_follow(usuario))
+        
+        if followed_at is None:
+            if usuario.name in self.bot.user_data_twitch:
+                estado_seguimiento = self.bot.user_data_twitch[usuario.name]["follow_date"]
+                
+                if estado_seguimiento != "Visita" and estado_seguimiento != "New" and estado_seguimiento != "Renegado":
+                    follow_status = "Renegado"
                     self.bot.user_data_twitch[usuario.name]["follow_date"] = follow_status
+                else:
+                    follow_status = estado_seguimiento
+            else:
+                follow_status = "Visita"
+                self.bot.user_data_twitch[usuario.name] = {
+                    "id": usuario.id,
+                    "follow_date": follow_status,
+                    "color": utils.assign_random_color(),
+                    "nickname": ""
+                }
+        else: #? Es seguidor
+            follow_status = f"{followed_at.strftime('%d-%m-%Y')}"
+            if usuario.name not in self.bot.user_data_twitch:
+                self.bot.user_data_twitch[usuario.name] = {
+                    "id": usuario.id,
+                    "follow_date": follow_status,
+                    "color": utils.assign_random_color(),
+                    "nickname": ""
+                }
+            else:
+                self.bot.user_data_twitch[usuario.name]["follow_date"] = follow_status
 
-            user_color = self.bot.user_data_twitch[usuario.name]["color"]
-            nickuser = self.bot.user_data_twitch[usuario.name]["nickname"]
-            formatted_nick = f"[{nickuser}] " if nickuser else ""
-            roles = utils.rol_user(usuario)
-            utils_gui.log_and_callback(self.bot, f"{roles}{user_color}{usuario.name}\033[0m {formatted_nick}({follow_status}): {payload.text}", self.bot.msg_type)
+        user_color = self.bot.user_data_twitch[usuario.name]["color"]
+        nickuser = self.bot.user_data_twitch[usuario.name]["nickname"]
+        formatted_nick = f"[{nickuser}] " if nickuser else ""
+        roles = utils.rol_user(usuario)
+        return f"{roles}{user_color}{usuario.name}\033[0m {formatted_nick}({follow_status}): {payload.text}"
 
-    @commands.Component.listener()
-    async def event_follow(self, payload: twitchio.ChannelFollow) -> None:
-        # Evento enviado cuando alguien sigue al canal...
+    def _alerta_flood(self, alerta) -> None:
+        if alerta.tipo == "oleada":
+            texto = f"\033[1m\033[41m\033[30m Posible oleada de bots: {alerta.cantidad:.0f} mensajes de {alerta.cuentas} cuentas: \"{alerta.muestra}\" \033[0m"
+        else:
+            texto = f"\033[1m\033[41m\033[30m Flood de {alerta.usuario}: {alerta.cantidad:.0f} mensajes en {self.flood.ventana:.0f} s \033[0m"
+        utils_gui.log_and_callback(self.bot, texto, self.bot.msg_type)
+
+    async def _consultar_follow(self, usuario):
+        """Fecha de follow desde Helix (solo cuando la cache no tiene al usuario)"""
+        follow = await usuario.follow_info()
+        return follow.followed_at if follow is not None else None
+
+    def _registrar_follow(self, payload: twitchio.ChannelFollow) -> None:
         usuario = payload.user.name
         fecha_creacion = payload.followed_at.strftime('%d-%m-%Y')
         
+        # Mantener al dia el indice local de seguidores
+        if self.bot.follower_index is not None:
+            self.bot.follower_index.agregar(payload.user.id, payload.followed_at)
+        # Y la cache de event_message, que podia tenerlo como "no sigue"
+        self.bot.follow_cache.actualizar(payload.user.id, payload.followed_at)
+        
         if usuario in self.bot.user_data_twitch:
             # Si el usuario ya existe, actualizamos la fecha de seguimiento
             self.bot.user_data_twitch[usuario]["follow_date"] = fecha_creacion
@@ -92,10 +208,10 @@ class MyComponent(commands.Component):
                 "nickname": ""
             }
 
-        utils_gui.log_and_callback(self.bot, f"\033[1m\033[30m{usuario}\033[0m\033[1m ha seguido al canal!\033[0m", self.bot.msg_type)
+    async def _enriquecer_follow(self, payload: twitchio.ChannelFollow):
+        return f"\033[1m\033[30m{payload.user.name}\033[0m\033[1m ha seguido al canal!\033[0m"
 
-    @commands.Component.listener()
-    async def event_custom_redemption_add(self, payload: twitchio.ChannelPointsRedemptionAdd) -> None:
+    async def _enriquecer_redemption(self, payload: twitchio.ChannelPointsRedemptionAdd):
         if payload.user.name not in self.bot.user_data_twitch:
             # Si el usuario no existe, lo agregamos a la lista
             self.bot.user_data_twitch[payload.user.name] = {
@@ -108,28 +224,23 @@ class MyComponent(commands.Component):
         user_color = self.bot.user_data_twitch[payload.user.name]["color"]
         nickuser = self.bot.user_data_twitch[payload.user.name]["nickname"]
         formatted_nick = f" [{nickuser}]" if nickuser else ""
-        # Evento enviado cuando alguien canjea un punto de canal...
-        utils_gui.log_and_callback(self.bot, f"{user_color}\033[1m{payload.user.name}\033[0m{formatted_nick}\033[1m ha canjeado \033[1m\033[30m{payload.reward.title}\033[0m\033[1m | \033[1m\033[30m{payload.reward.cost}\033[0m\033[1m Puntos\033[0m", self.bot.msg_type)
+        return f"{user_color}\033[1m{payload.user.name}\033[0m{formatted_nick}\033[1m ha canjeado \033[1m\033[30m{payload.reward.title}\033[0m\033[1m | \033[1m\033[30m{payload.reward.cost}\033[0m\033[1m Puntos\033[0m"
 
-    @commands.Component.listener()
-    async def event_raid(self, payload: twitchio.ChannelRaid) -> None:
-        # Evento enviado cuando alguien canjea un punto de canal...
-        utils_gui.log_and_callback(self.bot, f"\033[1m\033[30m{payload.from_broadcaster}\033[0m\033[1m ha hecho un raid con {payload.viewer_count} viewers\033[0m", self.bot.msg_type)
-    
-    
-    @commands.Component.listener()
-    async def event_mod_action(self, payload: twitchio.ChannelModerate) -> None:
-        # Evento enviado cuando alguien modera el canal...
+    async def _enriquecer_raid(self, payload: twitchio.ChannelRaid):
+        return f"\033[1m\033[30m{payload.from_broadcaster}\033[0m\033[1m ha hecho un raid con {payload.viewer_count} viewers\033[0m"
+
+    async def _enriquecer_mod_action(self, payload: twitchio.ChannelModerate):
         if payload.action == "delete" and payload.delete is not None:
-            utils_gui.log_and_callback(self.bot, f"\033[1m\033[30m{payload.moderator}\033[0m\033[1m ha eliminado el mensaje \033[1m\033[31m\"{payload.delete.text}\"\033[0m\033[1m de \033[1m\033[30m{payload.delete.user}\033[0m", self.bot.msg_type)
+            return f"\033[1m\033[30m{payload.moderator}\033[0m\033[1m ha eliminado el mensaje \033[1m\033[31m\"{payload.delete.text}\"\033[0m\033[1m de \033[1m\033[30m{payload.delete.user}\033[0m"
         elif payload.action == "raid" and payload.raid is not None:
-            utils_gui.log_and_callback(self.bot, f"\033[1m\033[30m{payload.moderator}\033[0m\033[1m ha hecho un raid con {payload.raid.viewer_count} viewers\033[0m", self.bot.msg_type)
-        
-        
-    @commands.Component.listener()
-    async def event_channel_update(self, payload: twitchio.ChannelUpdate) -> None:
-        # Evento enviado cuando alguien modera el canal...
-        utils_gui.log_and_callback(self.bot, f"\033[1m{payload.title} - {payload.category_name}\033[0m", self.bot.msg_type)
+            return f"\033[1m\033[30m{payload.moderator}\033[0m\033[1m ha hecho un raid con {payload.raid.viewer_count} viewers\033[0m"
+        return None
+
+    async def _enriquecer_channel_update(self, payload: twitchio.ChannelUpdate):
+        # Con la politica colapsar, solo se muestra la ultima actualizacion pendiente
+        if self.bot.message_callback:
+            self.bot.message_callback(f"{payload.title}|{payload.category_name}", "stream_info")
+        return f"\033[1m{payload.title} - {payload.category_name}\033[0m"
 
     @commands.command(aliases=["commands"])
     async def help(self, ctx: commands.Context, add: str | None = None) -> None:
@@ -138,9 +249,9 @@ class MyComponent(commands.Component):
         !help, !commands
         """
         if add == "mod":
-            await ctx.send("Lista de comandos de moderadores: ?settitle, ?setgame, ?getgame, ?on, ?off, ?resp")
+            self._enviar(ctx, "Lista de comandos de moderadores: ?settitle, ?setgame, ?getgame, ?on, ?off, ?resp")
         elif add is None:
-            await ctx.send("Lista de comandos disponibles: ?clip, ?discord, ?socials, ?title")
+            self._enviar(ctx, "Lista de comandos disponibles: ?clip, ?discord, ?socials, ?title")
 
     @commands.command(aliases=["Hola", "Holiwi", "hey"])
     async def hi(self, ctx: commands.Context) -> None:
@@ -148,10 +259,11 @@ class MyComponent(commands.Component):
 
         !hi, !Hola, !Holiwi, !hey
         """
-        await ctx.reply(f"¡Hola {ctx.chatter.mention}!")
+        self._responder(ctx, f"¡Hola {ctx.chatter.mention}!", INFO)
 
 
     @commands.command(aliases=["corte"])
+    @commands.cooldown(rate=1, per=60, key=salvo_elevados(commands.BucketType.user))
     async def clip(self, ctx: commands.Context) -> None:
         """Comando que crea un clip para luego ser editado y sin no es el caso
         crea un clip de los ultimos 30 segundos.
@@ -159,14 +271,18 @@ class MyComponent(commands.Component):
         !clip, !corte
         """
         try:
-            corte = await ctx.chatter.create_clip(has_delay=False, token_for=self.bot.user)
-
-            edit_url = corte.edit_url  # URL para editar el clip
+            edit_url = await self._crear_clip(ctx.channel)  # URL para editar el clip
             
-            await ctx.send(f"¡Clip creado! Editar: {edit_url}")
+            self._enviar(ctx, f"¡Clip creado! Editar: {edit_url}")
         except Exception as e:
             self.LOGGER.error(f"Error al crear clip: {str(e)}")
 
+    @compartido(ventana=30, clave=lambda canal: canal.id)
+    async def _crear_clip(self, canal) -> str:
+        """Crea el clip del canal; varios ?clip seguidos (tras una jugada) reciben el mismo"""
+        corte = await canal.create_clip(has_delay=False, token_for=self.bot.user)
+        return corte.edit_url
+
 
     @commands.command(aliases=["ds"])
     async def discord(self, ctx: commands.Context) -> None:
@@ -174,7 +290,7 @@ class MyComponent(commands.Component):
 
         !discord, !ds
         """
-        await ctx.send("Link de discord: discord.gg/UwbUxbj - Igualmente tambien pueden copiar el codigo: UwbUxbj")
+        self._enviar(ctx, "Link de discord: discord.gg/UwbUxbj - Igualmente tambien pueden copiar el codigo: UwbUxbj")
 
 
     @commands.group(invoke_fallback=True, aliases=["social", "rrss"])
@@ -183,7 +299,7 @@ class MyComponent(commands.Component):
 
         !socials
         """
-        await ctx.send("discord.gg/UwbUxbj, tiktok.com/@kleisarc, facebook.com/TioArcW")
+        self._enviar(ctx, "discord.gg/UwbUxbj, tiktok.com/@kleisarc, facebook.com/TioArcW")
 
     @socials.command(name="discord", aliases=["ds"])
     async def socials_discord(self, ctx: commands.Context) -> None:
@@ -191,7 +307,7 @@ class MyComponent(commands.Component):
 
         !socials discord
         """
-        await ctx.send("Link de discord: discord.gg/UwbUxbj - Igualmente tambien pueden copiar el codigo: UwbUxbj")
+        self._enviar(ctx, "Link de discord: discord.gg/UwbUxbj - Igualmente tambien pueden copiar el codigo: UwbUxbj")
         
     @socials.command(name="tiktok", aliases=["tt"])
     async def socials_tiktok(self, ctx: commands.Context) -> None:
@@ -199,7 +315,7 @@ class MyComponent(commands.Component):
 
         !socials tiktok
         """
-        await ctx.send("Link de tiktok: tiktok.com/@kleisarc")
+        self._enviar(ctx, "Link de tiktok: tiktok.com/@kleisarc")
         
     @socials.command(name="facebook", aliases=["fb"])
     async def socials_facebook(self, ctx: commands.Context) -> None:
@@ -207,7 +323,7 @@ class MyComponent(commands.Component):
 
         !socials facebook
         """
-        await ctx.send("Link de facebook: facebook.com/TioArcW")
+        self._enviar(ctx, "Link de facebook: facebook.com/TioArcW")
 
 
     #example commands.guard
@@ -218,21 +334,18 @@ class MyComponent(commands.Component):
 
         !say hello world, !repeat I am cool LUL
         """
-        await ctx.send(content)
+        self._enviar(ctx, content, MODERACION)
         
     @commands.command(aliases=["titulo", "tit"])
+    @commands.cooldown(rate=1, per=10, key=salvo_elevados(commands.BucketType.channel))
     async def title(self, ctx: commands.Context) -> None:
         """Comando que envia el titulo del stream.
 
         !title
         """
-        user_bot = self.bot.user
-        print(user_bot)
-        channel = await ctx.channel.fetch_channel_info(token_for=user_bot)
-        print(channel)
-        title = channel.title
-        print(title)
-        await ctx.send(f"El titulo del stream es: {title}")
+        # Sale de la cache que mantiene event_channel_update: no llama a la API
+        channel = await self.bot.channel_info.obtener()
+        self._enviar(ctx, f"El titulo del stream es: {channel.title}")
         
     @commands.command(aliases=["settitle"])
     @commands.is_moderator()  #? Solo para moderadores
@@ -242,7 +355,8 @@ class MyComponent(commands.Component):
         !title Nuevo titulo del stream
         """
         await ctx.channel.modify_channel(title=tittle)
-        await ctx.send(f"Titulo cambiado a: {tittle}")
+        self.bot.channel_info.actualizar(title=tittle)
+        self._enviar(ctx, f"Titulo cambiado a: {tittle}", MODERACION)
         
         
     @commands.command(aliases=["setgame"])
@@ -255,21 +369,23 @@ class MyComponent(commands.Component):
         game_id = utils.name_game(game)
         if game_id is not None:
             await ctx.channel.modify_channel(game_id=game_id)
-            await ctx.send(f"Juego cambiado a: {game}")
+            self._enviar(ctx, f"Juego cambiado a: {game}", MODERACION)
         else:
-            await ctx.send(f"Juego no encontrado: {game} - Revisa la lista de juegos disponibles con ?getgame o ?games.")
+            self._enviar(ctx, f"Juego no encontrado: {game} - Revisa la lista de juegos disponibles con ?getgame o ?games.", MODERACION)
     
     
     @commands.command(aliases=["getgame"])
     @commands.is_moderator()  #? Solo para moderadores
+    @commands.cooldown(rate=1, per=30, key=commands.BucketType.channel)
     async def games(self, ctx: commands.Context) -> None:
         """Comando que envia la lista de juegos disponibles.
 
         !getgame, !games
         """
         games = utils.get_games()
-        await ctx.send(f"Lista de categorias disponibles para cambiar con ?setgame o ?game: {', '.join(games)}")
-        await ctx.send("No importa si esta en mayusculas o minusculas, solo importa que sea el nombre correcto.")
+        # Dos mensajes cortos seguidos: la cola de salida los junta en un solo envio
+        self._enviar(ctx, f"Lista de categorias disponibles para cambiar con ?setgame o ?game: {', '.join(games)}", MODERACION)
+        self._enviar(ctx, "No importa si esta en mayusculas o minusculas, solo importa que sea el nombre correcto.", MODERACION)
     
     @commands.command(aliases=["activar", "on"])
     @commands.is_broadcaster()
@@ -279,7 +395,7 @@ class MyComponent(commands.Component):
         # Verificar si ya existe una instancia activa
         if charla is not None:
             if charla.is_active():
-                await ctx.reply("Gemi ya esta activa. Desactivala primero con ?off antes de iniciar una nueva instancia.")
+                self._responder(ctx, "Gemi ya esta activa. Desactivala primero con ?off antes de iniciar una nueva instancia.")
                 return
             else:
                 # Si existe pero no esta activa, la terminamos correctamente
@@ -287,12 +403,12 @@ class MyComponent(commands.Component):
                 charla = None
         # Verificar el valor minimo
         if maximo < 5:
-            await ctx.reply("Error: El limite de mensajes debe ser al menos 5.")
+            self._responder(ctx, "Error: El limite de mensajes debe ser al menos 5.")
             return
-        canal = await ctx.channel.fetch_channel_info(token_for=self.bot.user)
+        canal = await self.bot.channel_info.obtener()
         model = await utils.iniciar_gemi(canal)
-        charla = Gemi(model, max_messages=maximo, bot=self.bot)
-        await ctx.reply(f"Gemi ON con limite de {maximo} mensajes.")
+        charla = Gemi(model, max_messages=maximo, bot=self.bot, channel_info=self.bot.channel_info)
+        self._responder(ctx, f"Gemi ON con limite de {maximo} mensajes.")
         
     @commands.command(aliases=["desactivar", "off"])
     @commands.is_broadcaster()  #! Solo para moderadores
@@ -305,7 +421,7 @@ class MyComponent(commands.Component):
         if charla is not None:
             charla.terminate(False)
         charla = None
-        await ctx.reply("Gemi OFF.")
+        self._responder(ctx, "Gemi OFF.")
     
     @commands.command(aliases=["ai", "resp"])
     @commands.is_elevated()
@@ -314,19 +430,29 @@ class MyComponent(commands.Component):
         global charla
         if charla is not None:
             if not charla.is_active():
-                await ctx.send("Gemi ha alcanzado el limite de mensajes.")
+                self._enviar(ctx, "Gemi ha alcanzado el limite de mensajes.", IA)
                 charla = None
                 return
             usuario = ctx.chatter.name
             # Pasar el contexto para que el modelo pueda ejecutar comandos
-            response = charla.send_message(usuario, message, ctx=ctx)
+            # (la consulta es async: el bot sigue atendiendo eventos mientras el modelo responde)
+            gemi = charla
+            if gemi.agrupar > 0:
+                # Las preguntas que llegan casi juntas van en un solo turno; cada uno recibe su parte
+                response = await gemi.send_grouped_async(usuario, message, ctx=ctx)
+                self._enviar(ctx, response, IA)
+            elif gemi.streaming:
+                # Cada frase sale apenas esta lista y como mensaje propio (sin juntarla con " | ")
+                async for trozo in gemi.stream_message_async(usuario, message, ctx=ctx):
+                    self._enviar(ctx, trozo, IA, empaquetar=False)
+            else:
+                # Las respuestas largas se parten en trozos de 500 caracteres
+                response = await gemi.send_message_async(usuario, message, ctx=ctx)
+                self._enviar(ctx, response, IA)
             
-            if not charla.is_active():
-                await ctx.send(response)
-                await ctx.send("Gemi ha alcanzado el limite de mensajes y se ha desactivado.")
-                charla = None
-                return
-                
-            await ctx.send(response)
+            if not gemi.is_active() and gemi.get_message_count() >= gemi.max_messages:
+                self._enviar(ctx, "Gemi ha alcanzado el limite de mensajes y se ha desactivado.", IA)
+                if charla is gemi:  # Durante la espera pudieron activar otra instancia
+                    charla = None
         else:
-            await ctx.send("Gemi no esta activada.")
\ No newline at end of file
+            self._enviar(ctx, "Gemi no esta activada.", IA)
\ No newline at end of file
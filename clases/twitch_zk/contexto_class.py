@@ -0,0 +1,139 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from google.generativeai import protos
+
+LOGGER = logging.getLogger("CONTEXTO")
+LOGGER.setLevel(logging.INFO)
+
+def estimar_tokens(contenido) -> int:
+    """Tokens aproximados de un Content (~4 caracteres por token; sin llamar a la API)"""
+    return sum(len(part.text) for part in contenido.parts) // 4 + 1
+
+class ChatContext:
+    """Ventana de contexto acotada para Gemi con resumen acumulado.
+
+    Los ultimos `turnos` intercambios (pregunta + respuesta) se envian tal
+    cual; cuando se pasan de `turnos` o de `max_tokens`, los mas viejos
+    (hasta dejar la mitad) pasan a una cola de pendientes y una tarea de
+    fondo los funde en un resumen corto junto con el resumen anterior. Mientras el resumen se genera, los
+    pendientes se siguen enviando completos, asi nunca se pierde contexto y
+    el turno de quien pregunta no espera al resumen. Con esto el tamaño de
+    cada consulta queda acotado aunque la sesion sea larga.
+
+    `transcripcion` guarda todos los turnos para el historial en disco; no
+    se envia al modelo.
+    """
+
+    def __init__(self, resumidor: Callable[[str, List[Any]], Awaitable[str]], turnos=None, max_tokens=None):
+        """
+        Args:
+            resumidor: Corrutina (resumen_anterior, contenidos) -> resumen nuevo
+            turnos: Intercambios que se envian completos (por defecto GEMI_CONTEXTO_TURNOS o 6)
+            max_tokens: Tokens aproximados maximos de los intercambios completos (por defecto GEMI_CONTEXTO_TOKENS o 2000)
+        """
+        self.resumidor = resumidor
+        self.turnos = turnos or int(os.getenv("GEMI_CONTEXTO_TURNOS", "6"))
+        self.max_tokens = max_tokens or int(os.getenv("GEMI_CONTEXTO_TOKENS", "2000"))
+        self.resumen = ""
+        self.transcripcion: List[Any] = []
+        self._recientes: "deque[Tuple[Any, Any, int]]" = deque()    # (pregunta, respuesta, tokens)
+        self._pendientes: "deque[Tuple[Any, Any, int]]" = deque()   # Ya salieron de la ventana, falta resumirlos
+        self._tokens_recientes = 0
+        self._tarea: Optional[asyncio.Task] = None
+
+        # Estadisticas
+        self.resumenes = 0
+        self.resumidos = 0
+        self.errores = 0
+        self.ultimo_prompt = 0
+        self.max_prompt = 0
+        self.prompt_total = 0
+        self.prompts = 0
+
+    def agregar(self, pregunta, respuesta) -> None:
+        """Registra un intercambio completo y desplaza los viejos hacia el resumen"""
+        self.transcripcion.append(pregunta)
+        self.transcripcion.append(respuesta)
+        tokens = estimar_tokens(pregunta) + estimar_tokens(respuesta)
+        self._recientes.append((pregunta, respuesta, tokens))
+        self._tokens_recientes += tokens
+        if len(self._recientes) > self.turnos or self._tokens_recientes > self.max_tokens:
+            # Se vacia hasta la mitad para resumir por tandas (no una llamada al modelo por turno);
+            # siempre queda al menos el ultimo intercambio completo
+            while len(self._recientes) > 1 and (len(self._recientes) > self.turnos // 2 or self._tokens_recientes > self.max_tokens // 2):
+                viejo = self._recientes.popleft()
+                self._tokens_recientes -= viejo[2]
+                self._pendientes.append(viejo)
+        if self._pendientes and (self._tarea is None or self._tarea.done()):
+            self._tarea = asyncio.create_task(self._resumir())
+
+    def _resumen_contenido(self) -> List[Any]:
+        if not self.resumen:
+            return []
+        return [
+            protos.Content(role="user", parts=[protos.Part(text=f"(Resumen de la conversacion anterior: {self.resumen})")]),
+            protos.Content(role="model", parts=[protos.Part(text="Entendido.")]),
+        ]
+
+    def contenido(self, turno) -> List[Any]:
+        """Lo que se envia al modelo: resumen, pendientes de resumir, ventana reciente y el turno nuevo"""
+        contenidos = self._resumen_contenido()
+        for pregunta, respuesta, _ in self._pendientes:
+            contenidos.append(pregunta)
+            contenidos.append(respuesta)
+        for pregunta, respuesta, _ in self._recientes:
+            contenidos.append(pregunta)
+            contenidos.append(respuesta)
+        contenidos.append(turno)
+
+        tokens = (sum(t for *_, t in self._pendientes) + self._tokens_recientes + estimar_tokens(turno)
+                  + (len(self.resumen) // 4 + 1 if self.resumen else 0))
+        self.ultimo_prompt = tokens
+        self.max_prompt = max(self.max_prompt, tokens)
+        self.prompt_total += tokens
+        self.prompts += 1
+        return contenidos
+
+    async def _resumir(self) -> None:
+        """Funde los pendientes en el resumen; corre en segundo plano hasta vaciar la cola"""
+        while self._pendientes:
+            lote = list(self._pendientes)
+            contenidos = [contenido for pregunta, respuesta, _ in lote for contenido in (pregunta, respuesta)]
+            try:
+                resumen = await self.resumidor(self.resumen, contenidos)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Se reintenta con el proximo intercambio; mientras tanto van completos
+                self.errores += 1
+                LOGGER.warning(f"No se pudo resumir el historial de Gemi: {e}")
+                return
+            if not resumen:
+                self.errores += 1
+                return
+            self.resumen = resumen
+            for _ in lote:
+                self._pendientes.popleft()
+            self.resumenes += 1
+            self.resumidos += len(lote)
+
+    def cancelar(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+
+    def estadisticas(self):
+        """Tamaño aproximado de cada consulta y trabajo del resumen"""
+        return {
+            "prompt_tokens": self.ultimo_prompt,
+            "prompt_tokens_medio": (self.prompt_total / self.prompts) if self.prompts else 0.0,
+            "prompt_tokens_max": self.max_prompt,
+            "turnos_completos": len(self._recientes),
+            "turnos_por_resumir": len(self._pendientes),
+            "resumen_tokens": len(self.resumen) // 4,
+            "resumenes": self.resumenes,
+            "turnos_resumidos": self.resumidos,
+            "errores_resumen": self.errores
+        }
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import functools
+from typing import Any, Callable, Dict, Hashable, Optional
+import recurso.twitch_zk.metricas as metricas
+
+class _Compartida:
+    """Ejecucion en vuelo (o reciente) de una funcion compartida"""
+    __slots__ = ("futuro", "vence")
+
+    def __init__(self, futuro):
+        self.futuro = futuro
+        self.vence = float("inf")  # Mientras esta en vuelo no vence
+
+class SingleFlight:
+    """Registro de ejecuciones compartidas de los comandos.
+
+    `compartir` junta las llamadas con la misma clave: mientras una esta en
+    vuelo y durante `ventana` segundos despues, las demas reciben su mismo
+    resultado sin volver a ejecutarla (p. ej. cinco ?clip seguidos crean un
+    solo clip y todos reciben su enlace). Los errores no se guardan: los
+    reciben quienes esperaban y la siguiente llamada vuelve a intentar. Los
+    cooldowns de los comandos son los de twitchio (@commands.cooldown).
+    """
+
+    def __init__(self, reloj=time.monotonic):
+        self.reloj = reloj
+        self._compartidas: Dict[Hashable, _Compartida] = {}
+        self.compartidas = 0
+        self.ejecuciones = 0
+        metricas.registrar("comandos", self.estadisticas)
+
+    async def compartir(self, clave: Hashable, ventana, funcion: Callable[[], Any]):
+        """Ejecuta `funcion` o se suma a la ejecucion en vuelo/reciente con la misma clave"""
+        ahora = self.reloj()
+        actual = self._compartidas.get(clave)
+        if actual is not None and actual.vence > ahora:
+            self.compartidas += 1
+            return await asyncio.shield(actual.futuro)
+
+        # Limpiar las vencidas de vez en cuando (son pocas: una por clave usada)
+        if len(self._compartidas) > 64:
+            self._compartidas = {c: e for c, e in self._compartidas.items() if e.vence > ahora}
+
+        futuro = asyncio.get_running_loop().create_future()
+        entrada = self._compartidas[clave] = _Compartida(futuro)
+        self.ejecuciones += 1
+        try:
+            resultado = await funcion()
+        except BaseException as e:
+            if self._compartidas.get(clave) is entrada:
+                del self._compartidas[clave]
+            if not futuro.done():
+                if isinstance(e, asyncio.CancelledError):
+                    futuro.cancel()
+                else:
+                    futuro.set_exception(e)
+                    futuro.exception()  # Marcar como recuperada si nadie mas la esperaba
+            raise
+        entrada.vence = self.reloj() + ventana
+        if not futuro.done():
+            futuro.set_result(resultado)
+        return resultado
+
+    def estadisticas(self):
+        """Ejecuciones reales y llamadas que se sumaron a una ya en vuelo o reciente"""
+        return {"ejecuciones_compartibles": self.ejecuciones, "compartidas": self.compartidas}
+
+# Registro unico para todos los componentes
+single_flight = SingleFlight()
+
+def compartido(ventana=0.0, clave: Optional[Callable[..., Hashable]] = None):
+    """Single-flight para metodos async: llamadas concurrentes comparten una ejecucion.
+
+    Args:
+        ventana: Segundos que, tras terminar, se sigue entregando el mismo resultado
+        clave: Funcion de los argumentos (sin self) que decide que llamadas son "la misma";
+            por defecto los propios argumentos
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        async def envoltura(self, *args, **kwargs):
+            argumentos = clave(*args, **kwargs) if clave is not None else (args, tuple(sorted(kwargs.items())))
+            return await single_flight.compartir((funcion.__qualname__, argumentos), ventana, lambda: funcion(self, *args, **kwargs))
+        return envoltura
+    return decorador
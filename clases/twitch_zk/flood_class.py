@@ -0,0 +1,277 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("FLOOD")
+LOGGER.setLevel(logging.INFO)
+
+MASCARA = (1 << 64) - 1
+_NO_ALFANUMERICO = re.compile(r"[^\w\s]+")
+_ESPACIOS = re.compile(r"\s+")
+_REPETIDOS = re.compile(r"(.)\1{2,}")
+
+def normalizar(texto: str) -> str:
+    """Minusculas, sin acentos ni signos, espacios colapsados y letras repetidas a dos ('holaaaa' -> 'holaa')"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _NO_ALFANUMERICO.sub(" ", texto)
+    texto = _REPETIDOS.sub(r"\1\1", texto)
+    return _ESPACIOS.sub(" ", texto).strip()
+
+def simhash(texto: str, largo_shingle=3) -> int:
+    """SimHash de 64 bits sobre los shingles de caracteres del texto normalizado"""
+    if len(texto) <= largo_shingle:
+        shingles = {texto}
+    else:
+        shingles = {texto[i:i + largo_shingle] for i in range(len(texto) - largo_shingle + 1)}
+
+    # Contadores por bit en paralelo (bit-sliced): niveles[l] guarda el bit l del
+    # contador de cada una de las 64 posiciones, y sumar un hash es un sumador con
+    # acarreo sobre enteros de 64 bits (casi siempre 1 o 2 operaciones, no 64)
+    niveles: List[int] = []
+    for shingle in shingles:
+        # hash() de str es de 64 bits y estable dentro del proceso (nada de esto se persiste)
+        acarreo = hash(shingle) & MASCARA
+        for i, nivel in enumerate(niveles):
+            niveles[i] = nivel ^ acarreo
+            acarreo &= nivel
+            if not acarreo:
+                break
+        else:
+            if acarreo:
+                niveles.append(acarreo)
+
+    # Bit i de la firma = contador i mayor que la mitad; comparacion tambien por niveles
+    mitad = len(shingles) // 2
+    if mitad >> len(niveles):
+        return 0
+    mayor, igual = 0, MASCARA
+    for l in range(len(niveles) - 1, -1, -1):
+        if mitad >> l & 1:
+            igual &= niveles[l]
+        else:
+            mayor |= igual & niveles[l]
+            igual &= ~niveles[l]
+    return mayor
+
+class _Ventana:
+    """Contador de ventana deslizante aproximado con dos cubetas (actual y anterior)"""
+    __slots__ = ("inicio", "actual", "previo")
+
+    def __init__(self, ahora):
+        self.inicio = ahora
+        self.actual = 0
+        self.previo = 0
+
+    def sumar(self, ahora, ventana) -> float:
+        """Suma 1 y devuelve la estimacion de eventos en los ultimos `ventana` segundos"""
+        transcurrido = ahora - self.inicio
+        if transcurrido >= ventana:
+            # Rotar: la cubeta actual pasa a ser la anterior (o ambas vencen)
+            self.previo = self.actual if transcurrido < 2 * ventana else 0
+            self.actual = 0
+            self.inicio = ahora - (transcurrido % ventana)
+            transcurrido = ahora - self.inicio
+        self.actual += 1
+        return self.actual + self.previo * (1 - transcurrido / ventana)
+
+class _Grupo:
+    """Mensajes iguales o casi iguales: conteo en ventana, cuentas distintas y una muestra corta"""
+    __slots__ = ("firma", "ventana", "usuarios", "muestra", "alertado")
+
+    def __init__(self, firma, ahora, muestra):
+        self.firma = firma
+        self.ventana = _Ventana(ahora)
+        self.usuarios: Set[str] = set()
+        self.muestra = muestra
+        self.alertado = -1.0
+
+class Alerta:
+    """Evento emitido al cruzar un umbral"""
+    __slots__ = ("tipo", "cantidad", "cuentas", "usuario", "muestra")
+
+    def __init__(self, tipo, cantidad, cuentas, usuario, muestra):
+        self.tipo = tipo          # "oleada" (mismo texto desde varias cuentas) o "flood" (un usuario)
+        self.cantidad = cantidad
+        self.cuentas = cuentas
+        self.usuario = usuario
+        self.muestra = muestra
+
+    def __repr__(self):
+        return f"Alerta({self.tipo}, cantidad={self.cantidad:.0f}, cuentas={self.cuentas}, usuario={self.usuario!r}, muestra={self.muestra!r})"
+
+class FloodDetector:
+    """Detector de mensajes duplicados/casi duplicados y de flood por usuario.
+
+    Cada mensaje se normaliza y se busca por su hash exacto (blake2b de 64
+    bits); si es nuevo se calcula su SimHash y se buscan grupos parecidos con
+    LSH por bandas (los 64 bits en `distancia + 1` bandas, cada una con los
+    grupos mas recientes: dos firmas a distancia de Hamming <= `distancia`
+    difieren en a lo sumo `distancia` bandas y comparten al menos una).
+    Los grupos y los usuarios llevan un contador de ventana deslizante de dos
+    cubetas y viven en LRU acotados, asi que cada mensaje cuesta O(1) y la
+    memoria no crece con el stream; del texto solo se guarda una muestra corta
+    mientras el grupo siga en el LRU.
+    """
+
+    POR_BANDA = 4  # Grupos recientes recordados por valor de banda
+
+    def __init__(self, ventana=None, umbral=None, min_cuentas=3, umbral_usuario=None, distancia=9, min_largo=12,
+                 max_grupos=5000, max_usuarios=5000, on_alerta: Optional[Callable[[Alerta], None]] = None, reloj=time.monotonic):
+        """
+        Args:
+            ventana: Segundos de la ventana deslizante (por defecto FLOOD_VENTANA o 30)
+            umbral: Mensajes del mismo grupo en la ventana para alertar (por defecto FLOOD_UMBRAL o 8)
+            min_cuentas: Cuentas distintas minimas para considerar una oleada
+            umbral_usuario: Mensajes de un mismo usuario en la ventana (por defecto FLOOD_UMBRAL_USUARIO o 12)
+            distancia: Distancia de Hamming maxima entre SimHash para considerar dos textos casi iguales
+            min_largo: Largo minimo del texto normalizado para agruparlo (las reacciones cortas
+                como 'GG' o 'F' se repiten de forma natural y no se tratan como oleada)
+            on_alerta: Funcion llamada con cada Alerta
+        """
+        self.ventana = ventana or float(os.getenv("FLOOD_VENTANA", "30"))
+        self.umbral = umbral or int(os.getenv("FLOOD_UMBRAL", "8"))
+        self.min_cuentas = min_cuentas
+        self.umbral_usuario = umbral_usuario or int(os.getenv("FLOOD_UMBRAL_USUARIO", "12"))
+        self.distancia = distancia
+        # Bandas contiguas de ancho casi igual (p. ej. 9 -> 10 bandas: 4 de 7 bits y 6 de 6)
+        bandas = min(64, distancia + 1)
+        anchos = [64 // bandas + (1 if i < 64 % bandas else 0) for i in range(bandas)]
+        self._cortes = [(sum(anchos[:i]), (1 << ancho) - 1) for i, ancho in enumerate(anchos)]
+        self.min_largo = min_largo
+        self.max_grupos = max_grupos
+        self.max_usuarios = max_usuarios
+        self.on_alerta = on_alerta
+        self.reloj = reloj
+
+        self._grupos: "OrderedDict[int, _Grupo]" = OrderedDict()   # firma SimHash -> grupo
+        self._exactos: "OrderedDict[bytes, int]" = OrderedDict()   # hash exacto -> firma del grupo
+        self._bandas: Dict[tuple, List[int]] = {}                   # (banda, valor) -> firmas recientes
+        self._usuarios: "OrderedDict[str, list]" = OrderedDict()    # usuario -> [_Ventana, ultima alerta]
+
+        # Estadisticas
+        self.analizados = 0
+        self.exactos = 0
+        self.similares = 0
+        self.alertas = 0
+        self.tiempo_total = 0.0
+        metricas.registrar("flood", self.estadisticas)
+
+    def _bandas_de(self, firma) -> List[tuple]:
+        return [(i, (firma >> desplazamiento) & mascara) for i, (desplazamiento, mascara) in enumerate(self._cortes)]
+
+    def _buscar_similar(self, firma) -> Optional[_Grupo]:
+        for banda in self._bandas_de(firma):
+            for candidata in self._bandas.get(banda, ()):
+                if bin(candidata ^ firma).count("1") <= self.distancia:
+                    grupo = self._grupos.get(candidata)
+                    if grupo is not None:
+                        return grupo
+        return None
+
+    def _indexar(self, firma):
+        """Pone la firma al frente de sus bandas (las oleadas activas quedan primero)"""
+        for banda in self._bandas_de(firma):
+            firmas = self._bandas.setdefault(banda, [])
+            if firmas and firmas[0] == firma:
+                continue
+            if firma in firmas:
+                firmas.remove(firma)
+            firmas.insert(0, firma)
+            del firmas[self.POR_BANDA:]
+
+    def _nuevo_grupo(self, firma, ahora, texto) -> _Grupo:
+        grupo = _Grupo(firma, ahora, texto[:80])
+        self._grupos[firma] = grupo
+        if len(self._grupos) > self.max_grupos:
+            _, viejo = self._grupos.popitem(last=False)
+            for banda in self._bandas_de(viejo.firma):
+                firmas = self._bandas.get(banda)
+                if firmas and viejo.firma in firmas:
+                    firmas.remove(viejo.firma)
+                    if not firmas:
+                        del self._bandas[banda]
+        return grupo
+
+    def _grupo(self, normalizado, ahora, texto) -> _Grupo:
+        clave = hashlib.blake2b(normalizado.encode(), digest_size=8).digest()
+        firma = self._exactos.get(clave)
+        if firma is not None:
+            grupo = self._grupos.get(firma)
+            if grupo is not None:
+                # Ruta rapida: texto ya visto, sin SimHash
+                self.exactos += 1
+                self._exactos.move_to_end(clave)
+                self._grupos.move_to_end(firma)
+                return grupo
+
+        firma = simhash(normalizado)
+        grupo = self._grupos.get(firma) or self._buscar_similar(firma)
+        if grupo is not None:
+            self.similares += 1
+            self._grupos.move_to_end(grupo.firma)
+        else:
+            grupo = self._nuevo_grupo(firma, ahora, texto)
+        self._indexar(grupo.firma)
+        self._exactos[clave] = grupo.firma
+        if len(self._exactos) > self.max_grupos * 2:
+            self._exactos.popitem(last=False)
+        return grupo
+
+    def analizar(self, usuario: str, texto: str) -> List[Alerta]:
+        """Registra un mensaje y devuelve las alertas que dispara (normalmente ninguna)"""
+        inicio = time.perf_counter()
+        ahora = self.reloj()
+        alertas = []
+        self.analizados += 1
+
+        normalizado = normalizar(texto)
+        if len(normalizado) >= self.min_largo:
+            grupo = self._grupo(normalizado, ahora, texto)
+            cantidad = grupo.ventana.sumar(ahora, self.ventana)
+            if len(grupo.usuarios) < self.umbral * 4:  # Acotado: solo interesa saber si son varias
+                grupo.usuarios.add(usuario)
+            if (cantidad >= self.umbral and len(grupo.usuarios) >= self.min_cuentas
+                    and ahora - grupo.alertado >= self.ventana):
+                grupo.alertado = ahora
+                alertas.append(Alerta("oleada", cantidad, len(grupo.usuarios), None, grupo.muestra))
+
+        estado = self._usuarios.get(usuario)
+        if estado is None:
+            estado = self._usuarios[usuario] = [_Ventana(ahora), -self.ventana]
+            if len(self._usuarios) > self.max_usuarios:
+                self._usuarios.popitem(last=False)
+        else:
+            self._usuarios.move_to_end(usuario)
+        cantidad = estado[0].sumar(ahora, self.ventana)
+        if cantidad >= self.umbral_usuario and ahora - estado[1] >= self.ventana:
+            estado[1] = ahora
+            alertas.append(Alerta("flood", cantidad, 1, usuario, texto[:80]))
+
+        for alerta in alertas:
+            self.alertas += 1
+            if self.on_alerta is not None:
+                try:
+                    self.on_alerta(alerta)
+                except Exception as e:
+                    LOGGER.error(f"Error en on_alerta: {e}")
+        self.tiempo_total += time.perf_counter() - inicio
+        return alertas
+
+    def estadisticas(self):
+        """Mensajes analizados, aciertos por hash exacto/similar, alertas y costo medio"""
+        return {
+            "analizados": self.analizados,
+            "exactos": self.exactos,
+            "similares": self.similares,
+            "grupos": len(self._grupos),
+            "usuarios": len(self._usuarios),
+            "alertas": self.alertas,
+            "us_por_mensaje": (self.tiempo_total / self.analizados * 1e6) if self.analizados else 0.0
+        }
@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("FOLLOW_CACHE")
+LOGGER.setLevel(logging.INFO)
+
+class FollowCache:
+    """Cache del estado de follow por user_id para los mensajes de chat.
+
+    Guarda la fecha de follow (o None si no sigue) con un TTL; los "no sigue"
+    se guardan con un TTL mas corto para que un follow reciente aparezca
+    pronto aunque se pierda el evento. Si varios mensajes del mismo usuario
+    fallan a la vez, comparten una unica consulta en vuelo. event_follow
+    reemplaza la entrada con el dato del evento.
+    """
+
+    def __init__(self, ttl=None, ttl_negativo=None, max_entradas=10000):
+        """
+        Args:
+            ttl: Segundos que vale una fecha de follow (por defecto FOLLOW_CACHE_TTL o 600)
+            ttl_negativo: Segundos que vale un "no sigue" (por defecto FOLLOW_CACHE_TTL_NEG o 60)
+            max_entradas: Entradas maximas; al superarlas se descarta la mas antigua
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("FOLLOW_CACHE_TTL", "600"))
+        self.ttl_negativo = ttl_negativo if ttl_negativo is not None else float(os.getenv("FOLLOW_CACHE_TTL_NEG", "60"))
+        self.max_entradas = max_entradas
+        self._entradas: Dict[str, Tuple[Optional[datetime], float]] = {}
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+
+        # Estadisticas
+        self.aciertos = 0
+        self.fallos = 0
+        self.compartidas = 0
+        self.consultas = 0
+        self.errores = 0
+        metricas.registrar("follow_cache", self.estadisticas)
+
+    async def obtener(self, user_id, consulta: Callable[[], Awaitable[Optional[datetime]]]) -> Optional[datetime]:
+        """Fecha de follow del usuario; `consulta` solo se llama si no hay entrada vigente"""
+        clave = str(user_id)
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[1] > time.monotonic():
+            self.aciertos += 1
+            return entrada[0]
+
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            # Ya hay una consulta para este usuario: esperar su resultado
+            self.compartidas += 1
+            return await asyncio.shield(futuro)
+
+        self.fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            self.consultas += 1
+            followed_at = await consulta()
+        except Exception as e:
+            self.errores += 1
+            if not futuro.done():
+                futuro.set_exception(e)
+                futuro.exception()  # Marcar como recuperada si nadie mas la esperaba
+            raise
+        else:
+            # Si se invalido mientras estaba en vuelo, el dato ya no es fiable
+            if self._en_vuelo.get(clave) is futuro:
+                self._guardar(clave, followed_at)
+            if not futuro.done():
+                futuro.set_result(followed_at)
+            return followed_at
+        finally:
+            if self._en_vuelo.get(clave) is futuro:
+                del self._en_vuelo[clave]
+
+    def _guardar(self, clave, followed_at):
+        ttl = self.ttl if followed_at is not None else self.ttl_negativo
+        self._entradas.pop(clave, None)
+        self._entradas[clave] = (followed_at, time.monotonic() + ttl)
+        if len(self._entradas) > self.max_entradas:
+            # Los dict conservan el orden de insercion: la primera es la mas antigua
+            del self._entradas[next(iter(self._entradas))]
+
+    def actualizar(self, user_id, followed_at: Optional[datetime]):
+        """Reemplaza la entrada con un dato conocido (p. ej. de event_follow)"""
+        if not user_id:
+            return
+        self.invalidar(user_id)
+        self._guardar(str(user_id), followed_at)
+
+    def invalidar(self, user_id):
+        """Descarta la entrada y desliga la consulta en vuelo para que no la sobrescriba"""
+        clave = str(user_id)
+        self._entradas.pop(clave, None)
+        self._en_vuelo.pop(clave, None)
+
+    def limpiar(self):
+        self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estadisticas(self):
+        """Aciertos, fallos y consultas a Helix ahorradas"""
+        total = self.aciertos + self.fallos + self.compartidas
+        return {
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "compartidas": self.compartidas,
+            "tasa_acierto": ((self.aciertos + self.compartidas) / total) if total else 0.0,
+            "consultas_helix": self.consultas,
+            "ahorradas": total - self.consultas,
+            "errores": self.errores,
+            "en_vuelo": len(self._en_vuelo)
+        }
@@ -0,0 +1,149 @@
+import os
+import re
+import csv
+import glob
+import logging
+from datetime import date, datetime
+from typing import Dict, Optional, Set
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("FOLLOWERS")
+LOGGER.setLevel(logging.INFO)
+
+# Carpeta donde listadofollow.py deja los snapshots ([yy-mm-dd] Followers.csv por año)
+CARPETA_SNAPSHOTS = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'recurso', 'twitch_zk', 'follow', 'follow'
+)
+
+class FollowerIndex:
+    """Indice en memoria de seguidores del canal: user_id -> fecha de follow.
+
+    Las claves son IDs enteros y la fecha se guarda empaquetada como ordinal de
+    dia (date.toordinal), asi cada entrada son dos enteros. Se carga del ultimo
+    snapshot generado por listadofollow.py y se mantiene al dia con los eventos
+    de follow, de modo que resolver el estado de un JOIN/PART es una busqueda
+    O(1) local en lugar de una consulta a Helix. Los unfollows posteriores al
+    snapshot solo se reflejan con el siguiente snapshot.
+
+    Quien no figura puede haber seguido despues del snapshot (con el bot
+    apagado), asi que una ausencia solo es confiable (`confiable`) si su
+    follow guardado es anterior al snapshot o si Helix ya lo confirmo en esta
+    sesion (`sin_follow`); si no, hay que consultar.
+    """
+
+    def __init__(self):
+        self._fechas: Dict[int, int] = {}
+        self._sin_follow: Set[int] = set()  # Confirmados en Helix en esta sesion: no siguen al canal
+        self.cargado = False
+        self.snapshot: Optional[str] = None
+        self.fecha_snapshot: Optional[date] = None
+        self.consultas = 0
+        self.aciertos = 0
+        metricas.registrar("followers", self.estadisticas)
+
+    def cargar_ultimo_snapshot(self, carpeta=CARPETA_SNAPSHOTS) -> bool:
+        """Carga el snapshot mas reciente; devuelve False si no hay ninguno"""
+        archivos = glob.glob(os.path.join(carpeta, "*", "*Followers.csv"))
+        if not archivos:
+            LOGGER.warning("No hay snapshot de seguidores; se consultara Helix en cada JOIN/PART")
+            return False
+        archivo = max(archivos, key=os.path.getmtime)
+        return self.cargar_csv(archivo)
+
+    def cargar_csv(self, archivo) -> bool:
+        """Carga un CSV con columnas #, User ID, Username, Followed At (dd/mm/yy)"""
+        fechas = {}
+        try:
+            with open(archivo, 'r', newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Saltar header
+                for row in reader:
+                    if len(row) >= 4:
+                        fechas[int(row[1])] = datetime.strptime(row[3], '%d/%m/%y').toordinal()
+        except Exception as e:
+            LOGGER.error(f"Error al cargar snapshot de seguidores {archivo}: {e}")
+            return False
+
+        # Los follows recibidos antes de cargar el snapshot tienen prioridad
+        fechas.update(self._fechas)
+        self._fechas = fechas
+        self.cargado = True
+        self.snapshot = os.path.basename(archivo)
+        self.fecha_snapshot = self._fecha_de(archivo)
+        LOGGER.info(f"Indice de seguidores cargado: {len(fechas)} desde {self.snapshot}")
+        return True
+
+    @staticmethod
+    def _fecha_de(archivo) -> date:
+        """Dia del snapshot: el del nombre "[yy-mm-dd] Followers.csv" de listadofollow.py, o el de modificacion"""
+        coincide = re.match(r"\[(\d{2}-\d{2}-\d{2})\]", os.path.basename(archivo))
+        if coincide:
+            return datetime.strptime(coincide.group(1), '%y-%m-%d').date()
+        return date.fromtimestamp(os.path.getmtime(archivo))
+
+    def agregar(self, user_id, followed_at) -> None:
+        """Registra un follow (desde event_follow); followed_at es datetime/date o 'dd-mm-YYYY'"""
+        if not user_id:
+            return
+        if isinstance(followed_at, str):
+            followed_at = datetime.strptime(followed_at, '%d-%m-%Y')
+        self._fechas[int(user_id)] = followed_at.toordinal()
+        self._sin_follow.discard(int(user_id))
+
+    def eliminar(self, user_id) -> None:
+        """Quita a un usuario del indice (unfollow conocido)"""
+        if user_id:
+            self._fechas.pop(int(user_id), None)
+            self._sin_follow.add(int(user_id))
+
+    def fecha(self, user_id) -> Optional[str]:
+        """Fecha de follow en formato 'dd-mm-YYYY' (como verificar_follow_fecha) o None"""
+        self.consultas += 1
+        if not user_id:
+            return None
+        ordinal = self._fechas.get(int(user_id))
+        if ordinal is None:
+            return None
+        self.aciertos += 1
+        return date.fromordinal(ordinal).strftime('%d-%m-%Y')
+
+    def sin_follow(self, user_id) -> None:
+        """Registra que Helix confirmo que el usuario no sigue al canal"""
+        if user_id:
+            self._sin_follow.add(int(user_id))
+
+    def confiable(self, user_id, guardada=None) -> bool:
+        """Si la respuesta de `fecha` para este usuario es segura o puede ser un follow posterior al snapshot.
+
+        Args:
+            guardada: follow_date guardado del usuario ('dd-mm-YYYY', "New", "Visita", "Renegado")
+        """
+        if not user_id:
+            return False
+        if int(user_id) in self._fechas or int(user_id) in self._sin_follow:
+            return True
+        if self.fecha_snapshot is None:
+            return False
+        try:
+            seguia = datetime.strptime(guardada, '%d-%m-%Y').date()
+        except (TypeError, ValueError):
+            return False
+        # Seguia antes del snapshot y no figura en el: dejo de seguir antes de tomarlo
+        return seguia < self.fecha_snapshot
+
+    def __contains__(self, user_id) -> bool:
+        return bool(user_id) and int(user_id) in self._fechas
+
+    def __len__(self) -> int:
+        return len(self._fechas)
+
+    def estadisticas(self):
+        """Metricas del indice"""
+        return {
+            "seguidores": len(self._fechas),
+            "consultas": self.consultas,
+            "seguidores_hallados": self.aciertos,
+            "sin_follow_confirmados": len(self._sin_follow),
+            "snapshot": self.snapshot or "-"
+        }
@@ -0,0 +1,59 @@
+import logging
+from typing import List
+
+LOGGER = logging.getLogger("FRAMER")
+LOGGER.setLevel(logging.INFO)
+
+class IRCLineFramer:
+    """Separa el flujo de bytes del socket IRC en lineas completas.
+
+    Trabaja sobre un bytearray: cada bloque recibido se agrega al final, la
+    region de lineas completas se decodifica una unica vez y se separa en una
+    sola pasada, y el prefijo consumido se descarta de una vez. Como solo se
+    decodifican lineas completas, un caracter UTF-8 multibyte partido entre
+    dos lecturas ya no se corrompe.
+    """
+
+    DELIMITADOR = b"\r\n"
+
+    def __init__(self, max_buffer=1024 * 1024):
+        """
+        Args:
+            max_buffer: Tamaño maximo en bytes de una linea incompleta antes de descartarla
+        """
+        self.buffer = bytearray()
+        self.max_buffer = max_buffer
+        self.lineas_totales = 0
+        self.bytes_descartados = 0
+
+    def feed(self, data) -> List[str]:
+        """Agrega un bloque de bytes y devuelve las lineas completas (sin vacias)"""
+        buffer = self.buffer
+        buffer += data
+
+        # Un unico rfind ubica el ultimo limite; \r\n nunca cae dentro de un
+        # caracter UTF-8, asi que todo lo anterior se decodifica de una vez
+        fin = buffer.rfind(self.DELIMITADOR)
+        if fin == -1:
+            if len(buffer) > self.max_buffer:
+                LOGGER.warning(f"Linea IRC de {len(buffer)} bytes sin terminar, descartando buffer")
+                self.bytes_descartados += len(buffer)
+                buffer.clear()
+            return []
+
+        with memoryview(buffer) as vista:
+            bloque = str(vista[:fin], 'utf-8', 'replace')
+        # Descartar de una vez todo lo consumido
+        del buffer[:fin + 2]
+
+        lines = [line for line in map(str.strip, bloque.split("\r\n")) if line]
+        self.lineas_totales += len(lines)
+        return lines
+
+    def pending(self) -> int:
+        """Bytes pendientes de una linea incompleta"""
+        return len(self.buffer)
+
+    def reset(self):
+        """Vaciar el buffer (por ejemplo al reconectar)"""
+        self.buffer.clear()
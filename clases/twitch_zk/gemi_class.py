@@ -1,17 +1,95 @@
 import os
-import json
+import re
 import logging
 import asyncio
-import datetime
-from typing import Set, Optional, Dict, List, Any
+import time
+from typing import Set, Optional, Dict, List
+from google.generativeai import protos
+from clases.twitch_zk.scheduler_class import INFO, LARGO_MAXIMO
+from clases.twitch_zk.contexto_class import ChatContext
+from clases.twitch_zk.transcript_class import TranscriptWriter
+import recurso.twitch_zk.metricas as metricas
 
 LOGGER: logging.Logger = logging.getLogger("BOT")
 LOGGER.setLevel(logging.INFO)
 
+# Fin de frase: signo de cierre (y comillas/parentesis) seguido de un espacio o salto de linea
+_FIN_FRASE = re.compile(r"[.!?…][\"')\]]*\s")
+
+class Frases:
+    """Junta el texto que llega del stream y lo entrega en trozos que terminan en fin de frase.
+
+    Cada trozo llega hasta el ultimo fin de frase disponible dentro de 500
+    caracteres; si no hay ninguno y ya se pasaron los 500, se corta en el
+    ultimo espacio.
+    """
+
+    def __init__(self, largo=LARGO_MAXIMO):
+        self.largo = largo
+        self.buffer = ""
+
+    def agregar(self, texto) -> List[str]:
+        """Suma texto y devuelve los trozos que ya estan completos"""
+        self.buffer += texto
+        trozos = []
+        while True:
+            fin = None
+            for m in _FIN_FRASE.finditer(self.buffer, 0, self.largo + 1):
+                fin = m.end()
+            if fin is None:
+                if len(self.buffer) <= self.largo:
+                    break
+                fin = self.buffer.rfind(" ", 0, self.largo + 1)
+                if fin <= self.largo // 2:
+                    fin = self.largo  # Palabra enorme (p. ej. un enlace): cortar en seco
+            trozo = " ".join(self.buffer[:fin].split())
+            self.buffer = self.buffer[fin:]
+            if trozo:
+                trozos.append(trozo)
+        return trozos
+
+    def cerrar(self) -> List[str]:
+        """Entrega lo que quedo pendiente (el stream termino o viene una llamada a funcion)"""
+        trozos = self.agregar(" ")  # Un fin de frase al final del buffer ya cuenta
+        resto = " ".join(self.buffer.split())
+        self.buffer = ""
+        if resto:
+            trozos.append(resto)
+        return trozos
+
+# Pedido al modelo para fundir los turnos viejos en el resumen del contexto
+INSTRUCCION_RESUMEN = ("Resume en pocas frases (maximo {palabras} palabras) esta conversacion de un chat de Twitch: "
+                       "quien pregunto que, lo que se respondio y los datos que convenga recordar. "
+                       "Responde solo con el resumen.")
+
+# Instruccion agregada al turno cuando se juntan preguntas de varias personas
+INSTRUCCION_GRUPAL = ("(Varias personas preguntaron a la vez: responde a cada una por separado, "
+                      "empezando cada respuesta con \"Nombre:\" y en el mismo orden)")
+
+def repartir(texto: str, usuarios: List[str]) -> Dict[str, str]:
+    """Separa una respuesta grupal en la parte de cada usuario ("Nombre: ..." o "@Nombre: ...")
+
+    Funciona tanto con una respuesta por linea como con todas en una sola
+    linea; el texto que no sigue a ningun nombre conocido se ignora. Los
+    usuarios sin parte propia no aparecen en el resultado.
+    """
+    nombres = {usuario.lower(): usuario for usuario in usuarios}
+    patron = re.compile(r"(?:^|(?<=\s))@?(" + "|".join(re.escape(u) for u in nombres) + r")\s*:", re.IGNORECASE)
+    marcas = list(patron.finditer(texto))
+    partes: Dict[str, str] = {}
+    for i, marca in enumerate(marcas):
+        fin = marcas[i + 1].start() if i + 1 < len(marcas) else len(texto)
+        parte = " ".join(texto[marca.end():fin].split())
+        if parte:
+            usuario = nombres[marca.group(1).lower()]
+            partes[usuario] = f"{partes[usuario]} {parte}" if usuario in partes else parte
+    return partes
+
 ############## Usando Chat Grupal ##############
 
 class Gemi:
-    def __init__(self, model, max_messages=20, bot=None):
+    def __init__(self, model, max_messages=20, bot=None, channel_info=None, timeout=None, max_en_vuelo=None, streaming=None, cache=None,
+                 agrupar=None, max_lote=5, turnos=None, max_tokens=None, transcript=None):
         """
         Inicializa el chat grupal con Gemini.
         
@@ -19,51 +97,126 @@ class Gemi:
             model: El modelo de Gemini configurado
             max_messages: Numero maximo de mensajes antes de desactivarse (default: 20)
             bot: Referencia al bot de Twitch para ejecutar comandos
+            channel_info: ChannelInfoCache del bot; si el titulo o la categoria cambian, se avisa al modelo
+            timeout: Segundos maximos por respuesta del modelo (por defecto GEMI_TIMEOUT o 30)
+            max_en_vuelo: Consultas simultaneas al modelo (por defecto GEMI_EN_VUELO o 2)
+            streaming: Si ?ia envia la respuesta por frases a medida que se genera (por defecto GEMI_STREAMING o no)
+            cache: ResponseCache para preguntas repetidas (por defecto la del bot, si tiene)
+            agrupar: Segundos en que las preguntas de ?ia se juntan en un solo turno (por defecto
+                GEMI_AGRUPAR_MS / 1000; 0 = cada pregunta va sola)
+            max_lote: Preguntas maximas por turno agrupado
+            turnos: Intercambios recientes que se envian completos (por defecto GEMI_CONTEXTO_TURNOS o 6)
+            max_tokens: Tokens aproximados de esos intercambios antes de resumir (por defecto GEMI_CONTEXTO_TOKENS o 2000)
+            transcript: TranscriptWriter donde se guarda cada turno (por defecto uno nuevo por sesion)
         """
         self.model = model
-        self.chat = model.start_chat(history=[])
+        # El historial lo lleva Gemi (no un ChatSession): asi varias consultas pueden
+        # estar en vuelo sin pisarse y cada turno se agrega solo cuando termina.
+        # Al modelo solo viajan los ultimos turnos y un resumen de los anteriores;
+        # `history` sigue teniendo la conversacion completa para guardarla
+        self.contexto = ChatContext(self._resumir, turnos, max_tokens)
+        self.history: List[protos.Content] = self.contexto.transcripcion
+        # Cada turno va a disco apenas termina; si el bot se cae no se pierde la sesion
+        self.transcript = transcript if transcript is not None else TranscriptWriter()
         self.participants = set()
         self.max_messages = max_messages
         self.active = True
         self.message_count = 0
         self.bot = bot
+        self.channel_info = channel_info
+        # El system prompt se armo con la version actual; solo se avisan los cambios posteriores
+        self._version_canal = channel_info.version if channel_info is not None else 0
+        self.timeout = timeout or float(os.getenv("GEMI_TIMEOUT", "30"))
+        if streaming is None:
+            streaming = os.getenv("GEMI_STREAMING", "0").lower() in ("1", "true", "si")
+        self.streaming = streaming
+        # La cache vive en el bot para que sobreviva a cada ?on/?off
+        self.cache = cache if cache is not None else getattr(bot, "respuestas_ia", None)
+        self._en_vuelo = asyncio.Semaphore(max_en_vuelo or int(os.getenv("GEMI_EN_VUELO", "2")))
+        self._reservados = 0                       # Consultas aceptadas que aun no terminan
+        self._tareas: Set[asyncio.Task] = set()    # Llamadas al modelo en curso (se cancelan en terminate)
+        self.agrupar = agrupar if agrupar is not None else float(os.getenv("GEMI_AGRUPAR_MS", "0")) / 1000
+        self.max_lote = max_lote
+        self._lote: Optional[List[tuple]] = None   # Preguntas esperando a que cierre la ventana
+        self._lote_lleno: Optional[asyncio.Event] = None
+
+        # Estadisticas
+        self.consultas = 0
+        self.timeouts = 0
+        self.errores = 0
+        self.latencia_total = 0.0
+        self.ttfm_total = 0.0     # Tiempo hasta el primer trozo enviado (modo streaming)
+        self.ttfm_cantidad = 0
+        self.lotes = 0            # Turnos agrupados enviados al modelo
+        self.agrupadas = 0        # Preguntas que viajaron en esos turnos
+        metricas.registrar("gemi", self.estadisticas)
+    
+    def _turno(self, usuario, message):
+        """Turno de usuario con el formato "Nombre: mensaje" (y el contexto del canal si cambio)"""
+        return self._turno_grupal([(usuario, message)])
+    
+    def _turno_grupal(self, preguntas):
+        """Turno con una linea "Nombre: mensaje" por pregunta; con varias, pide una respuesta por persona"""
+        # Formatea cada mensaje con el nombre del usuario
+        lineas = []
+        for usuario, message in preguntas:
+            self.participants.add(usuario)
+            lineas.append(f"{usuario}: {message}")
+        contexto = self._contexto_canal()
+        if contexto:
+            lineas.append(contexto)
+        if len(preguntas) > 1:
+            lineas.append(INSTRUCCION_GRUPAL)
+        return protos.Content(role="user", parts=[protos.Part(text="\n".join(lineas))])
+    
+    def _sin_cupo(self):
+        # Si supero el limite (contando las que estan en vuelo), no procesar mas mensajes
+        return not self.active or self.message_count + self._reservados >= self.max_messages
+    
+    def _clave_cache(self, message):
+        """Clave de la cache: pregunta normalizada mas el titulo y la categoria actuales"""
+        if self.cache is None:
+            return None
+        canal = self.channel_info.actual if self.channel_info is not None else None
+        return self.cache.clave(message, canal.title if canal else None, canal.game_name if canal else None)
     
-    def send_message(self, usuario, message, ctx=None):
-        """Envia un mensaje de un usuario especifico al chat grupal"""
-        # Si supero el limite, no procesar mas mensajes
-        if not self.active:
+    def _desde_cache(self, usuario, message, clave):
+        """Respuesta guardada para la pregunta, o None; un acierto no llama al modelo ni cuenta para el limite"""
+        if clave is None:
+            return None
+        respuesta = self.cache.obtener(clave, usuario)
+        if respuesta is not None:
+            # Al historial igual que una respuesta del modelo, para que la conversacion siga coherente
+            self._agregar(self._turno(usuario, message), protos.Content(role="model", parts=[protos.Part(text=respuesta)]))
+        return respuesta
+    
+    async def send_message_async(self, usuario, message, ctx=None):
+        """Envia un mensaje de un usuario especifico al chat grupal sin bloquear el bot"""
+        if self._sin_cupo():
             return "Gemi ha alcanzado el limite de mensajes."
+        clave = self._clave_cache(message)
+        guardada = self._desde_cache(usuario, message, clave)
+        if guardada is not None:
+            return guardada
+        turno = self._turno(usuario, message)
         
-        self.participants.add(usuario)
-        
-        # Formatea el mensaje con el nombre del usuario
-        formatted_message = f"{usuario}: {message}"
-        
-        # Envia el mensaje al chat
-        response = self.chat.send_message(formatted_message)
-        # Variable para almacenar el texto de respuesta
-        response_text = None
-        function_called = False
+        self._reservados += 1
+        inicio = time.perf_counter()
+        try:
+            response = await self._consultar(turno)
+        finally:
+            self._reservados -= 1
+        if isinstance(response, str):
+            return response  # Mensaje de error/timeout: no cuenta para el limite
+        latencia = time.perf_counter() - inicio
         
         # Procesar la respuesta
         try:
-            # Primero intentamos procesar la respuesta directamente como texto
-            if hasattr(response, 'text'):
-                response_text = response.text
-            # Si no tiene el atributo text, buscamos en los candidatos
-            elif hasattr(response, 'candidates'):
-                for candidate in response.candidates:
-                    if hasattr(candidate, 'content'):
-                        for part in candidate.content.parts:
-                            if hasattr(part, 'function_call'):
-                                function_called = True
-                                result = self._handle_function_call(part.function_call, ctx)
-                                response_text = result
-                            if hasattr(part, 'text'):
-                                if not function_called:
-                                    response_text = part.text
-                                elif function_called and part.text != "":
-                                    response_text = str(response_text) + " | " + part.text
+            response_text = await self._procesar_respuesta(response, ctx)
+            # Las respuestas que ejecutaron funciones (change_title) no se repiten desde la cache
+            if (clave is not None and response_text is not None and response.candidates
+                    and not self._con_funciones(response.candidates[0].content.parts)):
+                self.cache.guardar(clave, response_text, latencia, usuario)
         except Exception as e:
             LOGGER.info(f"Error al procesar respuesta: {str(e)}")
             response_text = "Lo siento, ocurrio un error al procesar tu mensaje."
@@ -72,24 +225,315 @@ class Gemi:
         if response_text is None:
             response_text = "Lo siento, no pude procesar tu solicitud correctamente."
         
+        self._contar(ctx)
+        return response_text
+    
+    async def send_grouped_async(self, usuario, message, ctx=None):
+        """Como send_message_async, pero las preguntas que llegan dentro de la ventana `agrupar`
+        viajan juntas en un solo turno (una llamada al modelo y un mensaje del limite) y cada
+        usuario recibe su parte de la respuesta."""
+        if self.agrupar <= 0:
+            return await self.send_message_async(usuario, message, ctx)
+        if self._sin_cupo():
+            return "Gemi ha alcanzado el limite de mensajes."
+        futuro = asyncio.get_running_loop().create_future()
+        if self._lote is None:
+            self._lote, self._lote_lleno = [], asyncio.Event()
+            asyncio.create_task(self._cerrar_lote(self._lote, self._lote_lleno))
+        self._lote.append((usuario, message, ctx, futuro))
+        if len(self._lote) >= self.max_lote:
+            # Lleno: se despacha ya y la proxima pregunta abre otro lote
+            self._lote_lleno.set()
+            self._lote = self._lote_lleno = None
+        return await futuro
+    
+    async def _cerrar_lote(self, lote, lleno):
+        try:
+            await asyncio.wait_for(lleno.wait(), self.agrupar)
+        except asyncio.TimeoutError:
+            pass
+        if self._lote is lote:
+            self._lote = self._lote_lleno = None
+        try:
+            await self._despachar_lote(lote)
+        except Exception as e:
+            LOGGER.error(f"Error al responder preguntas agrupadas: {e}")
+            for pregunta in lote:
+                self._resolver(pregunta[3], "Lo siento, ocurrio un error al procesar tu mensaje.")
+    
+    @staticmethod
+    def _resolver(futuro, texto):
+        if not futuro.done():  # El comando que esperaba pudo cancelarse
+            futuro.set_result(texto)
+    
+    async def _despachar_lote(self, lote):
+        # Las que ya tienen respuesta en la cache no viajan al modelo
+        pendientes = []
+        for usuario, message, ctx, futuro in lote:
+            clave = self._clave_cache(message)
+            guardada = self._desde_cache(usuario, message, clave)
+            if guardada is not None:
+                self._resolver(futuro, guardada)
+            else:
+                pendientes.append((usuario, message, ctx, futuro, clave))
+        if not pendientes:
+            return
+        if len(pendientes) == 1:
+            usuario, message, ctx, futuro, _ = pendientes[0]
+            self._resolver(futuro, await self.send_message_async(usuario, message, ctx))
+            return
+        
+        ctx = pendientes[-1][2]
+        turno = self._turno_grupal([(usuario, message) for usuario, message, *_ in pendientes])
+        self._reservados += 1
+        inicio = time.perf_counter()
+        try:
+            response = await self._consultar(turno)
+        finally:
+            self._reservados -= 1
+        if isinstance(response, str):
+            for pendiente in pendientes:
+                self._resolver(pendiente[3], response)
+            return
+        latencia = time.perf_counter() - inicio
+        self.lotes += 1
+        self.agrupadas += len(pendientes)
+        
+        response_text = await self._procesar_respuesta(response, ctx)
+        if response_text is None:
+            response_text = "Lo siento, no pude procesar tu solicitud correctamente."
+        usuarios = [usuario for usuario, *_ in pendientes]
+        partes = repartir(response_text, usuarios)
+        con_funciones = not response.candidates or self._con_funciones(response.candidates[0].content.parts)
+        for usuario, message, _, futuro, clave in pendientes:
+            parte = partes.get(usuario)
+            if parte is None:
+                # El modelo no separo la respuesta: cada uno recibe el texto completo
+                self._resolver(futuro, response_text)
+                continue
+            if clave is not None and not con_funciones:
+                self.cache.guardar(clave, parte, latencia, usuario)
+            self._resolver(futuro, f"@{usuario} {parte}")
+        self._contar(ctx)
+    
+    @staticmethod
+    def _con_funciones(partes):
+        return any(part.function_call.name for part in partes)
+    
+    async def stream_message_async(self, usuario, message, ctx=None):
+        """Como send_message_async, pero entrega la respuesta por frases a medida que el modelo la genera.
+        
+        Es un generador async: cada trozo (hasta 500 caracteres, cortado al final de
+        una frase) sale apenas esta completo, sin esperar al resto de la respuesta.
+        """
+        if self._sin_cupo():
+            yield "Gemi ha alcanzado el limite de mensajes."
+            return
+        clave = self._clave_cache(message)
+        guardada = self._desde_cache(usuario, message, clave)
+        if guardada is not None:
+            yield guardada
+            return
+        turno = self._turno(usuario, message)
+        
+        self._reservados += 1
+        try:
+            async with self._en_vuelo:
+                if not self.active:
+                    yield "Gemi ha sido desactivada."
+                    return
+                contenido = self.contexto.contenido(turno)
+                partes: List[protos.Part] = []
+                trozos: List[str] = []
+                inicio = time.perf_counter()
+                entregados = 0
+                self.consultas += 1
+                try:
+                    async for trozo in self._trozos(contenido, partes, ctx):
+                        if not entregados:
+                            self.ttfm_total += time.perf_counter() - inicio
+                            self.ttfm_cantidad += 1
+                        entregados += 1
+                        trozos.append(trozo)
+                        yield trozo
+                except asyncio.CancelledError:
+                    current = asyncio.current_task()
+                    if current is not None and current.cancelling():
+                        raise
+                    if not entregados:
+                        yield "Gemi ha sido desactivada."
+                    return
+                except Exception as e:
+                    mensaje = self._mensaje_error(e)
+                    if not entregados:
+                        yield mensaje
+                    return
+                latencia = time.perf_counter() - inicio
+                self.latencia_total += latencia
+                if not entregados:
+                    yield "Lo siento, no pude procesar tu solicitud correctamente."
+                
+                # Solo los turnos completos entran al historial
+                if partes:
+                    self._agregar(turno, protos.Content(role="model", parts=partes))
+                if clave is not None and trozos and not self._con_funciones(partes):
+                    self.cache.guardar(clave, " ".join(trozos), latencia, usuario)
+        finally:
+            self._reservados -= 1
+        self._contar(ctx)
+    
+    async def _trozos(self, contenido, partes, ctx):
+        """Consume el stream del modelo y produce trozos listos para el chat; junta en `partes` la respuesta"""
+        limite = time.monotonic() + self.timeout
+        respuesta = await self._esperar(
+            self.model.generate_content_async(contenido, stream=True, request_options={"timeout": self.timeout}), limite)
+        frases = Frases()
+        texto = []
+        iterador = respuesta.__aiter__()
+        while True:
+            try:
+                chunk = await self._esperar(iterador.__anext__(), limite)
+            except StopAsyncIteration:
+                break
+            for candidate in chunk.candidates:
+                for part in candidate.content.parts:
+                    if part.function_call.name:
+                        # Lo que vino antes de la llamada sale primero, luego el resultado
+                        for trozo in frases.cerrar():
+                            yield trozo
+                        partes.append(part)
+                        yield await self._handle_function_call(part.function_call, ctx)
+                    elif part.text:
+                        texto.append(part.text)
+                        for trozo in frases.agregar(part.text):
+                            yield trozo
+        for trozo in frases.cerrar():
+            yield trozo
+        if texto:
+            partes.insert(0, protos.Part(text="".join(texto)))
+    
+    async def _esperar(self, coro, limite):
+        """Espera una llamada al modelo como tarea (terminate la puede cancelar) hasta el instante `limite`"""
+        tarea = asyncio.ensure_future(coro)
+        self._tareas.add(tarea)
+        try:
+            return await asyncio.wait_for(tarea, max(0.0, limite - time.monotonic()))
+        finally:
+            self._tareas.discard(tarea)
+    
+    def _mensaje_error(self, e):
+        """Cuenta el error de una consulta y devuelve el texto para el chat"""
+        if isinstance(e, asyncio.TimeoutError):
+            self.timeouts += 1
+            LOGGER.warning(f"Gemi no respondio en {self.timeout:.0f} s")
+            return "Gemi tardo demasiado en responder, intentalo de nuevo."
+        self.errores += 1
+        LOGGER.error(f"Error al consultar a Gemi: {e}")
+        return "Lo siento, ocurrio un error al contactar a Gemi."
+    
+    async def _consultar(self, turno):
+        """Llama al modelo con el historial mas el turno nuevo; devuelve la respuesta o un texto de error"""
+        async with self._en_vuelo:
+            if not self.active:
+                return "Gemi ha sido desactivada."
+            # El historial se toma al obtener el turno: incluye lo que termino mientras se esperaba
+            contenido = self.contexto.contenido(turno)
+            inicio = time.perf_counter()
+            self.consultas += 1
+            try:
+                response = await self._esperar(
+                    self.model.generate_content_async(contenido, request_options={"timeout": self.timeout}),
+                    time.monotonic() + self.timeout)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if current is not None and current.cancelling():
+                    raise  # Nos cancelaron a nosotros (p. ej. al cerrar el bot)
+                return "Gemi ha sido desactivada."
+            except Exception as e:
+                return self._mensaje_error(e)
+            self.latencia_total += time.perf_counter() - inicio
+        
+        # Solo los turnos completos entran al historial
+        if response.candidates:
+            self._agregar(turno, response.candidates[0].content)
+        return response
+    
+    def _agregar(self, turno, respuesta):
+        """Registra un intercambio completo en la ventana de contexto y en la transcripcion"""
+        self.contexto.agregar(turno, respuesta)
+        self.transcript.agregar(turno)
+        self.transcript.agregar(respuesta)
+    
+    async def _resumir(self, resumen, contenidos):
+        """Resumen nuevo a partir del anterior y los turnos que salen de la ventana (fuera del camino de ?ia)"""
+        lineas = [f"Resumen anterior: {resumen}"] if resumen else []
+        for contenido in contenidos:
+            texto = " ".join(part.text for part in contenido.parts if part.text)
+            if texto:
+                lineas.append(texto if contenido.role == "user" else f"Gemi: {texto}")
+        pedido = protos.Content(role="user", parts=[protos.Part(text=INSTRUCCION_RESUMEN.format(palabras=120) + "\n\n" + "\n".join(lineas))])
+        # Sin herramientas: un resumen nunca debe cambiar el titulo del stream
+        response = await self._esperar(
+            self.model.generate_content_async([pedido], tool_config={"function_calling_config": {"mode": "NONE"}},
+                                              request_options={"timeout": self.timeout}),
+            time.monotonic() + self.timeout)
+        if not response.candidates:
+            return None
+        return " ".join(part.text for part in response.candidates[0].content.parts if part.text).strip() or None
+    
+    async def _procesar_respuesta(self, response, ctx):
+        """Texto de la respuesta; ejecuta las llamadas a funciones que pida el modelo"""
+        response_text = None
+        function_called = False
+        for candidate in response.candidates:
+            for part in candidate.content.parts:
+                if part.function_call.name:
+                    function_called = True
+                    response_text = await self._handle_function_call(part.function_call, ctx)
+                elif part.text:
+                    if not function_called:
+                        response_text = part.text if response_text is None else response_text + part.text
+                    else:
+                        response_text = str(response_text) + " | " + part.text
+        return response_text
+    
+    def _contar(self, ctx):
+        """Cuenta una respuesta, avisa cuando quedan pocas y desactiva al llegar al limite"""
         # Incrementar contador despues de procesar el mensaje
         self.message_count += 1
+        self.transcript.mensajes = self.message_count
         
         maximo = self.max_messages
         limite = maximo - 3
         if self.message_count >= limite and self.message_count < maximo:
             aviso = maximo - self.message_count
             if ctx is not None:
-                asyncio.create_task(ctx.send(f"Solo quedan {aviso} mensajes para que Gemi se desactive."))
+                self._avisar(ctx, f"Solo quedan {aviso} mensajes para que Gemi se desactive.")
         
         # Verificar si llegamos al limite despues de esta respuesta
-        if self.message_count >= self.max_messages:
+        if self.message_count >= self.max_messages and self.active:
             self.active = False
             self.terminate(True)
-        
-        return response_text
     
-    def _handle_function_call(self, function_call, ctx):
+    def _avisar(self, ctx, texto):
+        """Aviso informativo al chat por la cola de salida del bot (o directo si no la tiene)"""
+        salida = getattr(self.bot, "chat_salida", None)
+        if salida is not None:
+            salida.enviar(ctx.send, texto, INFO, ctx.channel.id)
+        else:
+            asyncio.create_task(ctx.send(texto))
+    
+    def _contexto_canal(self):
+        """Nota con el titulo y la categoria actuales si cambiaron desde el ultimo mensaje"""
+        if self.channel_info is None or self.channel_info.actual is None:
+            return None
+        if self.channel_info.version == self._version_canal:
+            return None
+        self._version_canal = self.channel_info.version
+        canal = self.channel_info.actual
+        return f"(Contexto actualizado: el titulo actual del stream es \"{canal.title}\" y la categoria/juego es \"{canal.game_name}\")"
+    
+    async def _handle_function_call(self, function_call, ctx):
         """Maneja las llamadas a funciones del modelo"""
         if not ctx:
             return "No puedo ejecutar comandos administrativos en este contexto."
@@ -99,14 +543,37 @@ class Gemi:
         
         if function_name == "change_title" and "title" in args:
             # Usar el comando del bot para cambiar el titulo
-            asyncio.create_task(ctx.channel.modify_channel(title=args["title"]))
+            try:
+                await ctx.channel.modify_channel(title=args["title"])
+            except Exception as e:
+                LOGGER.error(f"Error al cambiar el titulo: {e}")
+                return "No pude cambiar el titulo del stream."
+            if self.channel_info is not None:
+                self.channel_info.actualizar(title=args["title"])
+                self._version_canal = self.channel_info.version  # El modelo ya sabe el titulo nuevo
             return f"He cambiado el titulo del stream a: {args['title']}"
         
         return "No pude ejecutar el comando solicitado."
     
     def get_history(self):
         """Obtiene el historial completo del chat"""
-        return self.chat.history
+        return self.history
+    
+    def estadisticas(self):
+        """Consultas al modelo, timeouts, errores, latencia media y tiempo hasta el primer mensaje"""
+        return {
+            "consultas": self.consultas,
+            "en_vuelo": len(self._tareas),
+            "timeouts": self.timeouts,
+            "errores": self.errores,
+            "latencia_ms": (self.latencia_total / (self.consultas - self.timeouts - self.errores) * 1000)
+                           if self.consultas > self.timeouts + self.errores else 0.0,
+            "primer_mensaje_ms": (self.ttfm_total / self.ttfm_cantidad * 1000) if self.ttfm_cantidad else 0.0,
+            "turnos_agrupados": self.lotes,
+            "llamadas_ahorradas": self.agrupadas - self.lotes,
+            "mensajes": self.message_count,
+            **self.contexto.estadisticas()
+        }
     
     def get_message_count(self):
         """Obtiene el numero de mensajes intercambiados"""
@@ -121,63 +588,26 @@ class Gemi:
         return self.active
     
     def terminate(self, suceso):
-        """Finaliza la instancia de Gemi y libera recursos y guarda el historial"""
+        """Finaliza la instancia de Gemi, libera recursos y cierra la transcripcion"""
         self.active = False
+        # Cancelar las consultas que sigan en vuelo; sus comandos responden "desactivada"
+        for tarea in list(self._tareas):
+            tarea.cancel()
+        self.contexto.cancelar()
         if suceso == True:
             LOGGER.info(f"Gemi ha alcanzado el limite de {self.max_messages} mensajes y se desactivara.")
         else:
             LOGGER.info(f"Gemi ha sido desactivado manualmente.")
         
-        # Guardar el historial de la conversacion
-        self._save_chat_history()
-    
-    def _save_chat_history(self):
-        """Guarda el historial de chat en un archivo JSON"""
-        # No guardar si no hay mensajes
-        if self.message_count == 0:
+        # Los turnos ya estan en disco: solo falta escribir el ultimo lote
+        if self.transcript.encolados == 0:
             LOGGER.info("No hay mensajes para guardar en el historial.")
             return
-            
-        # Crear la carpeta si no existe
-        chat_dir = os.path.join("recurso", "twitch_zk", "chat_gemi")
-        os.makedirs(chat_dir, exist_ok=True)
-        
-        # Generar nombre de archivo con fecha y hora
-        now = datetime.datetime.now()
-        filename = f"chat_{now.strftime('%Y%m%d_%H%M%S')}.json"
-        filepath = os.path.join(chat_dir, filename)
-        
-        # Preparar el historial para guardar
-        history_data: Dict[str, Any] = {
-            "timestamp": now.isoformat(),
-            "participants": list(self.participants),
-            "message_count": self.message_count,
-            "messages": []
-        }
-        
-        # Convertir el historial a un formato legible
-        for message in self.chat.history:
-            role = message.role
-            if hasattr(message, 'parts') and message.parts:
-                # Obtener el texto del mensaje de los parts
-                content = [part.text for part in message.parts if hasattr(part, 'text')]
-                content_text = " ".join(content) if content else ""
-                
-                # Para mensajes de usuario, extraer el nombre si esta en formato "nombre: mensaje"
-                user_name = None
-                if role == "user" and ":" in content_text:
-                    parts = content_text.split(":", 1)
-                    if len(parts) == 2:
-                        user_name = parts[0].strip()
-                
-                history_data["messages"].append({
-                    "role": role,
-                    "user_name": user_name if role == "user" else None,
-                    "content": content_text
-                })
-        
-        # Guardar en archivo JSON
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(history_data, f, indent=2, ensure_ascii=False)
-        
-        LOGGER.info(f"Historial de chat guardado en: {filepath}")
\ No newline at end of file
+        # Desde ?off o al llegar al limite corre en el bucle: el hilo escribe el ultimo lote sin esperarlo
+        try:
+            asyncio.get_running_loop()
+            en_bucle = True
+        except RuntimeError:
+            en_bucle = False
+        self.transcript.cerrar(esperar=not en_bucle)
+        LOGGER.info(f"Historial de chat guardado en: {self.transcript.ruta}")
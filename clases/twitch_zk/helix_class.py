@@ -0,0 +1,140 @@
+import os
+import asyncio
+import logging
+import aiohttp
+from typing import Dict, List, Optional
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("HELIX")
+LOGGER.setLevel(logging.INFO)
+
+class HelixUserBatcher:
+    """Agrupa las busquedas de usuarios de Helix en peticiones por lotes.
+
+    Cada llamada a `buscar_id` queda pendiente durante una ventana corta; al
+    cerrarse la ventana (o al juntar `max_lote` logins) se resuelven todos con
+    un unico GET /helix/users?login=a&login=b..., y el resultado se reparte a
+    cada manejador que estaba esperando. Un raid de 300 usuarios cuesta asi 3
+    peticiones en lugar de 300.
+    """
+
+    def __init__(self, token=None, client_id=None, base_url="https://api.twitch.tv/helix", ventana=None, max_lote=100):
+        """
+        Args:
+            token: Token OAuth (por defecto TTG_BOT_TOKEN)
+            client_id: Client ID de la aplicacion (por defecto TTG_BOT_CLIENT_ID)
+            base_url: URL base de Helix (configurable para pruebas locales)
+            ventana: Segundos que se espera para juntar logins (por defecto HELIX_LOTE_MS o 50 ms)
+            max_lote: Maximo de logins por peticion (Helix admite 100)
+        """
+        self.token = token or os.getenv("TTG_BOT_TOKEN")
+        self.client_id = client_id or os.getenv("TTG_BOT_CLIENT_ID")
+        self.base_url = base_url
+        self.ventana = ventana if ventana is not None else float(os.getenv("HELIX_LOTE_MS", "50")) / 1000
+        self.max_lote = max_lote
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pendientes: Dict[str, List[asyncio.Future]] = {}
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._tareas = set()
+
+        # Estadisticas
+        self.peticiones = 0
+        self.logins_resueltos = 0
+        self.solicitudes = 0
+        metricas.registrar("helix_users", self.estadisticas)
+
+    async def _get_session(self):
+        """Obtener o crear una sesión de aiohttp reutilizable"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        """Cerrar la sesión de aiohttp si está abierta"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            self._session = None
+
+    async def buscar_id(self, login: str) -> Optional[str]:
+        """Devuelve el ID de Twitch del usuario, o None si no existe o fallo la consulta"""
+        login = login.lower()
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self.solicitudes += 1
+
+        esperando = self._pendientes.get(login)
+        if esperando is None:
+            self._pendientes[login] = [futuro]
+        else:
+            # Mismo login dentro de la ventana: comparte la misma consulta
+            esperando.append(futuro)
+
+        if len(self._pendientes) >= self.max_lote:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.ventana, self._despachar)
+
+        return await futuro
+
+    def _despachar(self):
+        """Cierra la ventana actual y lanza la consulta del lote"""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if not self._pendientes:
+            return
+        lote = self._pendientes
+        self._pendientes = {}
+        tarea = asyncio.get_running_loop().create_task(self._resolver(lote))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+    async def _resolver(self, lote: Dict[str, List[asyncio.Future]]):
+        """Consulta el lote (en tramos de max_lote) y reparte los resultados"""
+        logins = list(lote)
+        for i in range(0, len(logins), self.max_lote):
+            tramo = logins[i:i + self.max_lote]
+            try:
+                resultados = await self._consultar(tramo)
+            except Exception as e:
+                # Un aviso por lote fallido, no uno por cada login del tramo
+                LOGGER.warning(f"Fallo la consulta de {len(tramo)} usuarios en Helix: {e}")
+                resultados = {}
+            for login in tramo:
+                user_id = resultados.get(login)
+                if user_id is None:
+                    LOGGER.debug(f"Usuario no encontrado: {login}")
+                for futuro in lote[login]:
+                    if not futuro.done():
+                        futuro.set_result(user_id)
+
+    async def _consultar(self, logins: List[str]) -> Dict[str, str]:
+        """Un unico GET /users con varios parametros login"""
+        headers = {
+            'Client-ID': str(self.client_id),
+            'Authorization': f'Bearer {self.token}'
+        }
+        params = [("login", login) for login in logins]
+        session = await self._get_session()
+        timeout = aiohttp.ClientTimeout(total=10.0)
+
+        self.peticiones += 1
+        async with session.get(f"{self.base_url}/users", headers=headers, params=params, timeout=timeout) as response:
+            if response.status != 200:
+                LOGGER.warning(f"Fallo la consulta de {len(logins)} usuarios en Helix: {response.status} - {await response.text()}")
+                return {}
+            data = await response.json()
+
+        resultados = {usuario['login'].lower(): usuario['id'] for usuario in data.get('data', [])}
+        self.logins_resueltos += len(resultados)
+        return resultados
+
+    def estadisticas(self):
+        """Metricas de agrupamiento"""
+        return {
+            "solicitudes": self.solicitudes,
+            "peticiones": self.peticiones,
+            "resueltos": self.logins_resueltos,
+            "lote_medio": (self.solicitudes / self.peticiones) if self.peticiones else 0.0,
+            "pendientes": len(self._pendientes)
+        }
@@ -1,44 +1,48 @@
-import logging
-import asyncio
-import socket
 import ssl
-from typing import Optional, Set, Any, Dict
-import recurso.twitch_zk.utils as utils
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Optional
 import recurso.gui.utils_gui as utils_gui
+from clases.twitch_zk.chat_base_class import TwitchChatClientBase, ChannelState
+from clases.twitch_zk.writer_class import IRCWriteQueue
+import recurso.twitch_zk.metricas as metricas
+
+class TwitchIRCClient(TwitchChatClientBase):
+    """Transporte TCP/TLS del chat: socket, cola de salida y reconexión"""
 
-class TwitchIRCClient:
-    def __init__(self, oauth_token, username, channel, userbots, user_data_twitch, msg_type, message_callback=None):
-        self.oauth_token = oauth_token
-        self.username = username
-        self.channel = channel
+    def __init__(self, oauth_token, username, channel, userbots, user_data_twitch, msg_type, message_callback=None, user_lookup=None, follower_index=None, nombre="irc", analytics=None):
+        super().__init__(oauth_token, username, channel, userbots, user_data_twitch, msg_type, message_callback, user_lookup, follower_index, nombre, logger="IRC", analytics=analytics)
         self.host = "irc.chat.twitch.tv"
         self.port = 6697  # Puerto SSL para IRC
+        self.use_ssl = True
         self.reader: Optional[asyncio.StreamReader] = None
         self.writer: Optional[asyncio.StreamWriter] = None
-        self.joined_users: Set[str] = set()
-        self.running = False
-        self.userbots = userbots
-        self.user_data_twitch = user_data_twitch
-        self.message_callback = message_callback
-        self.msg_type = msg_type
-        self.LOGGER = logging.getLogger("IRC")
-        self.LOGGER.setLevel(logging.INFO)
         
-        # Buffer para mensajes incompletos
-        self.buffer = ""
+        # Cola de salida con limites de Twitch y escrituras agrupadas
+        self.tx = IRCWriteQueue(nombre=f"{nombre}_tx")
         
-        # Configuración de reconexión
+        # Configuración de reconexión (sin límite de intentos, backoff exponencial con jitter)
         self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 5
-        self.reconnect_delay = 5  # segundos
+        self.backoff_base = 1      # segundos
+        self.backoff_max = 60      # segundos
+        self.read_timeout = 360    # Twitch envía PING cada ~5 min; sin datos se da por caída
+        self.max_outage = None     # segundos; None = reintentar siempre (el pool lo limita para rebalancear)
+        
+        # Métricas por corte de conexión
+        self.cortes = deque(maxlen=50)
+        metricas.registrar(f"{nombre}_reconexion", self.estadisticas_reconexion)
 
     async def connect(self):
         """Conectar al servidor IRC de Twitch"""
         try:
             # Crear contexto SSL
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
+            ssl_context = None
+            if self.use_ssl:
+                ssl_context = ssl.create_default_context()
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
             
             # Establecer conexión TCP con SSL
             self.reader, self.writer = await asyncio.open_connection(
@@ -46,18 +50,14 @@ class TwitchIRCClient:
                 self.port, 
                 ssl=ssl_context
             )
+            self.tx.iniciar(self.writer)
+            self.workers.iniciar()
+            self._bienvenida = self._auth_fallida = False
             
-            # Autenticación IRC
-            await self._send_raw(f"PASS oauth:{self.oauth_token}")
-            await self._send_raw(f"NICK {self.username}")
-            
-            # Habilitar capacidades de Twitch
-            await self._send_raw("CAP REQ :twitch.tv/membership")  # JOIN/PART events
-            await self._send_raw("CAP REQ :twitch.tv/commands")    # CLEARCHAT, etc.
-            await self._send_raw("CAP REQ :twitch.tv/tags")        # Message tags
-            
-            # Unirse al canal
-            await self._send_raw(f"JOIN #{self.channel}")
+            # Autenticación, capacidades de Twitch y JOIN a los canales
+            # (la cola de salida respeta el limite de JOIN)
+            for line in self.protocolo.saludo(self.oauth_token, self.username, self.channels):
+                await self._send_raw(line)
             
             utils_gui.log_and_callback(self, f"\033[1m\033[42m\033[30m   IRC Conectado                \033[0m", self.msg_type)
             self.running = True
@@ -69,58 +69,30 @@ class TwitchIRCClient:
             return False
 
     async def _send_raw(self, message):
-        """Enviar mensaje raw al servidor IRC"""
+        """Encolar mensaje raw para el servidor IRC (lo escribe la tarea de salida)"""
         if self.writer:
-            try:
-                self.writer.write(f"{message}\r\n".encode('utf-8'))
-                await self.writer.drain()
-                self.LOGGER.debug(f"Enviado: {message}")
-            except Exception as e:
-                self.LOGGER.error(f"Error enviando mensaje: {e}")
-                raise
+            self.tx.enviar(message)
+            self.LOGGER.debug(f"Encolado: {message}")
 
-    async def _read_line(self):
-        """Leer una línea completa del servidor IRC"""
+    async def _leer_eventos(self):
+        """Leer un bloque del socket y convertirlo en eventos (None si se cortó)"""
         if not self.reader:
             return None
             
         try:
-            data = await self.reader.read(4096)
+            data = await asyncio.wait_for(self.reader.read(65536), self.read_timeout)
             if not data:
                 return None
                 
-            self.buffer += data.decode('utf-8', errors='ignore')
-            
-            lines = []
-            while '\r\n' in self.buffer:
-                line, self.buffer = self.buffer.split('\r\n', 1)
-                if line.strip():
-                    lines.append(line.strip())
-                    
-            return lines
+            return self.protocolo.recibir_bytes(data)
             
+        except asyncio.TimeoutError:
+            self.LOGGER.warning(f"Sin datos del servidor en {self.read_timeout} s")
+            return None
         except Exception as e:
             self.LOGGER.error(f"Error leyendo del servidor: {e}")
             return None
 
-    def _parse_tags(self, message):
-        """Analizar las etiquetas IRC de Twitch"""
-        tags_dict = {}
-        if message.startswith("@"):
-            try:
-                tags_part, message_part = message.split(" ", 1)
-                tags_part = tags_part[1:]  # Quitar @
-                
-                for tag in tags_part.split(";"):
-                    if "=" in tag:
-                        key, value = tag.split("=", 1)
-                        tags_dict[key] = value if value else None
-                        
-            except Exception as e:
-                self.LOGGER.error(f"Error parseando tags: {e}")
-                
-        return tags_dict
-
     async def listen(self):
         """Escuchar mensajes del servidor IRC"""
         if not self.reader:
@@ -129,219 +101,125 @@ class TwitchIRCClient:
             
         try:
             while self.running:
-                lines = await self._read_line()
-                if not lines:
-                    # Conexión perdida
+                eventos = await self._leer_eventos()
+                if eventos is None:
+                    # Conexión perdida (un bloque sin linea completa devuelve [])
+                    if not self.running:
+                        break
                     self.LOGGER.warning("Conexión IRC perdida")
-                    if await self._reconnect():
+                    if await self._reconnect("conexion perdida"):
                         continue
                     else:
                         break
                 
-                for line in lines:
-                    await self._process_message(line)
+                await self._despachar(eventos)
+                
+                if self._reconnect_pedido:
+                    # El servidor avisó con RECONNECT: reconectar antes de que corte
+                    if not await self._reconnect("RECONNECT del servidor"):
+                        break
                     
         except Exception as e:
             self.LOGGER.error(f"Error en el loop de escucha: {e}")
         finally:
             self.running = False
+            self._detener_manejadores()
             await self._cleanup()
 
-    async def _process_message(self, message):
-        """Procesar un mensaje IRC individual"""
-        try:
-            self.LOGGER.debug(f"Recibido: {message}")
-            
-            # Manejo de PING
-            if message.startswith("PING"):
-                pong_target = message.split(":", 1)[1] if ":" in message else "tmi.twitch.tv"
-                await self._send_raw(f"PONG :{pong_target}")
-                return
-            
-            # Manejo de CLEARCHAT (bans, timeouts, clear)
-            if "CLEARCHAT" in message:
-                await self._handle_clearchat(message)
-                return
-                
-            # Manejo de CLEARMSG (eliminación de mensaje específico)
-            if "CLEARMSG" in message:
-                await self._handle_clearmsg(message)
-                return
-            
-            # Manejo de JOIN
-            if " JOIN " in message:
-                await self._handle_join(message)
-                return
-                
-            # Manejo de PART
-            if " PART " in message:
-                await self._handle_part(message)
-                return
-                
-        except Exception as e:
-            self.LOGGER.error(f"Error procesando mensaje '{message}': {e}")
+    def _backoff(self, intento):
+        """Espera antes del intento N: backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
 
-    async def _handle_clearchat(self, message):
-        """Manejar eventos CLEARCHAT"""
-        try:
-            if f"#{self.channel}" not in message:
-                return
-                
-            tags_dict = self._parse_tags(message)
-            
-            # Verificar si es para usuario específico o limpieza general
-            if f"#{self.channel} :" in message:
-                # Ban/timeout a usuario específico
-                user = message.split(f"#{self.channel} :")[1].strip()
-                
-                ban_duration = tags_dict.get("ban-duration")
-                ban_reason = tags_dict.get("ban-reason", "").replace("\\s", " ")
-                
-                if ban_duration:
-                    action_type = f"timeout por {ban_duration} segundos"
-                    if ban_reason:
-                        action_type += f" - Razón: {ban_reason}"
-                else:
-                    action_type = "ban permanente"
-                    if ban_reason:
-                        action_type += f" - Razón: {ban_reason}"
-                        
-                utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m Usuario {user} recibió {action_type} \033[0m", self.msg_type)
-            else:
-                # Limpieza completa del chat
-                utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m Chat limpiado completamente \033[0m", self.msg_type)
-                
-        except Exception as e:
-            self.LOGGER.error(f"Error en _handle_clearchat: {e}")
-
-    async def _handle_clearmsg(self, message):
-        """Manejar eventos CLEARMSG"""
-        try:
-            if f"#{self.channel}" not in message:
-                return
-                
-            tags_dict = self._parse_tags(message)
-            login = tags_dict.get("login", "desconocido")
-            
-            # Extraer contenido del mensaje eliminado si está disponible
-            msg_content = ""
-            if f"#{self.channel} :" in message:
-                msg_content = message.split(f"#{self.channel} :")[1].strip()
-                msg_content = f" - Mensaje: '{msg_content}'"
-                
-            utils_gui.log_and_callback(self, f"\033[1m\033[43m\033[30m Mensaje de {login} eliminado{msg_content} \033[0m", self.msg_type)
-            
-        except Exception as e:
-            self.LOGGER.error(f"Error en _handle_clearmsg: {e}")
-
-    async def _handle_join(self, message):
-        """Manejar eventos JOIN"""
-        try:
-            # Formato: :usuario!usuario@usuario.tmi.twitch.tv JOIN #canal
-            if "!" in message and f"#{self.channel}" in message:
-                user = message.split("!")[0][1:]  # Quitar el :
-                
-                if user not in self.userbots:
-                    self.joined_users.add(user)
-                    await self._process_user_join(user)
-                    
-        except Exception as e:
-            self.LOGGER.error(f"Error en _handle_join: {e}")
-
-    async def _handle_part(self, message):
-        """Manejar eventos PART"""
-        try:
-            # Formato: :usuario!usuario@usuario.tmi.twitch.tv PART #canal
-            if "!" in message and f"#{self.channel}" in message:
-                user = message.split("!")[0][1:]  # Quitar el :
-                
-                if user in self.joined_users:
-                    self.joined_users.remove(user)
-                    await self._process_user_part(user)
-                    
-        except Exception as e:
-            self.LOGGER.error(f"Error en _handle_part: {e}")
-
-    async def _process_user_join(self, user):
-        """Procesar cuando un usuario se une al canal"""
-        try:
-            user_id = utils.buscar_id_usuario(user)
-            follow_first_time = utils.verificar_follow_fecha(user_id)
-            
-            if user in self.user_data_twitch:
-                follow_status = self.user_data_twitch[user]["follow_date"]
-                
-                if follow_first_time is None and follow_status not in ["Visita", "New", "Renegado"]:
-                    follow_status = "Renegado"
-                    self.user_data_twitch[user]["follow_date"] = follow_status
-            else:
-                follow_status = follow_first_time if follow_first_time is not None else "New"
-                
-                self.user_data_twitch[user] = {
-                    "id": user_id,
-                    "follow_date": follow_status,
-                    "color": utils.assign_random_color(),
-                    "nickname": ""
-                }
-            
-            user_color = self.user_data_twitch[user]["color"]
-            nickuser = self.user_data_twitch[user]["nickname"]
-            formatted_nick = f"[{nickuser}] " if nickuser else ""
-            
-            utils_gui.log_and_callback(self, f"{user_color}{user}\033[0m {formatted_nick}({follow_status}) \033[32mse unió al canal\033[0m", self.msg_type)
-            
-        except Exception as e:
-            self.LOGGER.error(f"Error procesando JOIN de {user}: {e}")
-
-    async def _process_user_part(self, user):
-        """Procesar cuando un usuario sale del canal"""
-        try:
-            if user not in self.user_data_twitch:
-                return
-                
-            user_id = self.user_data_twitch[user]["id"]
-            
-            if user_id:
-                follow_last_time = utils.verificar_follow_fecha(user_id)
-                follow_status = self.user_data_twitch[user]["follow_date"]
-                
-                if follow_last_time is None and follow_status not in ["Visita", "New", "Renegado"]:
-                    follow_status = "Renegado"
-                    self.user_data_twitch[user]["follow_date"] = follow_status
-            else:
-                follow_status = self.user_data_twitch[user]["follow_date"]
-            
-            user_color = self.user_data_twitch[user]["color"]
-            nickuser = self.user_data_twitch[user]["nickname"]
-            formatted_nick = f"[{nickuser}] " if nickuser else ""
-            
-            utils_gui.log_and_callback(self, f"{user_color}{user}\033[0m {formatted_nick}({follow_status}) \033[31msalió del canal\033[0m", self.msg_type)
-            
-        except Exception as e:
-            self.LOGGER.error(f"Error procesando PART de {user}: {e}")
-
-    async def _reconnect(self):
-        """Intentar reconectar al servidor IRC"""
-        if self.reconnect_attempts >= self.max_reconnect_attempts:
-            self.LOGGER.error("Máximo número de reintentos de reconexión alcanzado")
-            return False
-            
-        self.reconnect_attempts += 1
-        self.LOGGER.info(f"Intentando reconectar ({self.reconnect_attempts}/{self.max_reconnect_attempts})...")
+    async def _reconnect(self, motivo="conexion perdida"):
+        """Reconectar al servidor IRC sin límite de intentos (hasta que se llame a disconnect)"""
+        detectado = time.monotonic()
+        proactivo = self._reconnect_pedido
+        self._reconnect_pedido = False
         
+        # Lo que no llegó a salir ni a procesarse se da por perdido
+        bytes_parciales = self.protocolo.framer.pending()
+        lineas_perdidas = self.tx.pendientes()
         await self._cleanup()
-        await asyncio.sleep(self.reconnect_delay)
         
-        success = await self.connect()
-        if success:
-            self.LOGGER.info("Reconexión exitosa")
+        # Los presentes se vuelven a conocer por los JOIN de la nueva sesion
+        for estado in self.channels.values():
+            estado.reiniciar_presencia()
+        
+        intento = 0
+        while self.running:
+            if self.max_outage is not None and time.monotonic() - detectado > self.max_outage:
+                self.LOGGER.warning(f"Sin conexión tras {self.max_outage} s; se abandona esta conexión")
+                return False
+            
+            # Con RECONNECT el primer intento es inmediato
+            if not (proactivo and intento == 0):
+                espera = self._backoff(intento)
+                self.LOGGER.info(f"Reconectando en {espera:.1f} s (intento {intento + 1}, {motivo})...")
+                await asyncio.sleep(espera)
+                if not self.running:
+                    break
+            
+            intento += 1
+            self.reconnect_attempts = intento
+            if await self.connect() and await self._confirmar_sesion():
+                duracion = time.monotonic() - detectado
+                self.cortes.append({
+                    "motivo": motivo,
+                    "duracion_s": duracion,
+                    "intentos": intento,
+                    "lineas_perdidas": lineas_perdidas,
+                    "bytes_parciales": bytes_parciales
+                })
+                self.LOGGER.info(f"Reconexión exitosa en {duracion:.1f} s tras {intento} intento(s)")
+                return True
+            
+            self.LOGGER.warning(f"Fallo en intento de reconexión {intento}")
+        
+        return False
+
+    async def _confirmar_sesion(self, timeout=10):
+        """La conexión cuenta como restablecida solo con la bienvenida 001.
+
+        Sigue leyendo (y despachando lo que llegue) hasta la bienvenida, un
+        NOTICE de login rechazado, un corte o `timeout` segundos.
+        """
+        limite = time.monotonic() + timeout
+        while not self._bienvenida and not self._auth_fallida:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                eventos = await asyncio.wait_for(self._leer_eventos(), restante)
+            except asyncio.TimeoutError:
+                eventos = None
+            if eventos is None:
+                break
+            await self._despachar(eventos)
+        if self._bienvenida and not self._auth_fallida:
             return True
-        else:
-            self.LOGGER.warning(f"Fallo en intento de reconexión {self.reconnect_attempts}")
-            return False
+        if not self._auth_fallida:
+            self.LOGGER.warning(f"Sin bienvenida del servidor en {timeout} s")
+        await self._cleanup()
+        return False
+
+    def estadisticas_reconexion(self):
+        """Métricas de cortes: cantidad, duración (detección a reconexión) y líneas perdidas"""
+        duraciones = [corte["duracion_s"] for corte in self.cortes]
+        ultimo = self.cortes[-1] if self.cortes else {}
+        return {
+            "cortes": len(self.cortes),
+            "ultimo_motivo": ultimo.get("motivo", "-"),
+            "ultima_duracion_s": ultimo.get("duracion_s", 0.0),
+            "max_duracion_s": max(duraciones, default=0.0),
+            "lineas_perdidas": sum(corte["lineas_perdidas"] for corte in self.cortes),
+            "bytes_parciales": sum(corte["bytes_parciales"] for corte in self.cortes)
+        }
 
     async def _cleanup(self):
         """Limpiar recursos de conexión"""
+        perdidas = self.tx.detener()
+        if perdidas:
+            self.LOGGER.warning(f"Se descartaron {perdidas} líneas pendientes de envío")
         if self.writer:
             try:
                 self.writer.close()
@@ -351,7 +229,7 @@ class TwitchIRCClient:
             
         self.writer = None
         self.reader = None
-        self.buffer = ""
+        self.protocolo.reset()
 
     async def disconnect(self):
         """Desconectar del servidor IRC"""
@@ -359,14 +237,15 @@ class TwitchIRCClient:
         
         if self.writer:
             try:
-                await self._send_raw(f"PART #{self.channel}")
-                await self._send_raw("QUIT")
+                for name in self.channels:
+                    await self._send_raw(self.protocolo.part(name))
+                await self._send_raw(self.protocolo.quit())
+                await self.tx.vaciar()
             except:
                 pass
                 
+        self._detener_manejadores()
         await self._cleanup()
+        if self._lookup_propio:
+            await self.user_lookup.close()
         utils_gui.log_and_callback(self, "Desconectado del IRC", self.msg_type)
-
-    def get_connected_users(self):
-        """Obtener la lista de usuarios conectados"""
-        return list(self.joined_users)
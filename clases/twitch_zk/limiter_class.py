@@ -0,0 +1,62 @@
+import time
+import asyncio
+from collections import deque
+
+class SlidingWindowLimiter:
+    """Limitador de tasa de ventana deslizante (registro de envios).
+
+    Guarda el instante de cada accion de los ultimos `periodo` segundos y
+    solo permite una nueva si hay menos de `capacidad` en ese lapso, asi
+    ninguna ventana de `periodo` segundos supera el limite de Twitch (por
+    ejemplo 20 JOIN cada 10 s), tampoco al arrancar: la rafaga inicial gasta
+    la ventana completa y lo siguiente espera a que venzan los primeros.
+    """
+
+    def __init__(self, capacidad, periodo):
+        """
+        Args:
+            capacidad: Cantidad maxima de acciones en la ventana
+            periodo: Duracion de la ventana en segundos
+        """
+        self.capacidad = int(capacidad)
+        self.periodo = float(periodo)
+        self._envios: "deque[float]" = deque()
+
+    def _purgar(self, ahora):
+        limite = ahora - self.periodo
+        while self._envios and self._envios[0] <= limite:
+            self._envios.popleft()
+
+    @property
+    def tokens(self) -> int:
+        """Acciones que todavia entran en la ventana actual"""
+        self._purgar(time.monotonic())
+        return max(0, self.capacidad - len(self._envios))
+
+    def consumir(self, cantidad=1) -> float:
+        """Intenta registrar `cantidad` acciones; devuelve 0 si pudo o los segundos que faltan esperar"""
+        cantidad = min(cantidad, self.capacidad)
+        ahora = time.monotonic()
+        self._purgar(ahora)
+        sobran = len(self._envios) + cantidad - self.capacidad
+        if sobran <= 0:
+            self._envios.extend([ahora] * cantidad)
+            return 0.0
+        # Hay que esperar a que salgan de la ventana las `sobran` acciones mas viejas
+        return max(self._envios[sobran - 1] + self.periodo - ahora, 1e-3)
+
+    async def adquirir(self, cantidad=1) -> float:
+        """Espera hasta poder consumir; devuelve el tiempo total esperado"""
+        esperado = 0.0
+        espera = self.consumir(cantidad)
+        while espera > 0:
+            await asyncio.sleep(espera)
+            esperado += espera
+            espera = self.consumir(cantidad)
+        return esperado
+
+    def configurar(self, capacidad, periodo):
+        """Cambia el limite (p. ej. al pasar de usuario normal a moderador); lo ya enviado sigue contando"""
+        self.capacidad = int(capacidad)
+        self.periodo = float(periodo)
+        self._purgar(time.monotonic())
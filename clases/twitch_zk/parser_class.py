@@ -0,0 +1,139 @@
+from typing import Dict, List, Optional
+
+# Secuencias de escape de valores de tags IRCv3
+_ESCAPES = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+def unescape_tag_value(value: str) -> str:
+    """Revierte el escape IRCv3 de un valor de tag (\\s, \\:, \\\\, \\r, \\n)"""
+    if "\\" not in value:
+        return value
+
+    out = []
+    i = 0
+    n = len(value)
+    while i < n:
+        c = value[i]
+        if c == "\\":
+            i += 1
+            if i < n:
+                # Un escape desconocido se reemplaza por el caracter sin la barra
+                out.append(_ESCAPES.get(value[i], value[i]))
+            # Una barra final sin pareja se descarta
+        else:
+            out.append(c)
+        i += 1
+    return "".join(out)
+
+def parse_tags(raw_tags: str) -> Dict[str, str]:
+    """Convierte la seccion de tags (sin '@') en diccionario con valores ya desescapados"""
+    tags = {}
+    for tag in raw_tags.split(";"):
+        if not tag:
+            continue
+        key, sep, value = tag.partition("=")
+        tags[key] = unescape_tag_value(value) if sep else ""
+    return tags
+
+class IRCMessage:
+    """Mensaje IRCv3 ya separado en tags, prefijo, comando y parametros.
+
+    Los tags y los parametros se guardan en crudo y solo se analizan la primera
+    vez que un manejador los lee, asi las lineas sin manejador (la mayoria de
+    PRIVMSG) cuestan apenas localizar el comando.
+    """
+    __slots__ = ("raw", "raw_tags", "prefix", "command", "_raw_params", "_params", "_tags")
+
+    def __init__(self, raw: str, raw_tags: Optional[str], prefix: Optional[str], command: str, raw_params: str):
+        self.raw = raw
+        self.raw_tags = raw_tags
+        self.prefix = prefix
+        self.command = command
+        self._raw_params = raw_params
+        self._params: Optional[List[str]] = None
+        self._tags: Optional[Dict[str, str]] = None
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        """Tags del mensaje, analizados de forma perezosa"""
+        if self._tags is None:
+            self._tags = parse_tags(self.raw_tags) if self.raw_tags else {}
+        return self._tags
+
+    @property
+    def params(self) -> List[str]:
+        """Parametros del comando; el ultimo puede contener espacios"""
+        if self._params is None:
+            raw = self._raw_params
+            if raw.startswith(":"):
+                self._params = [raw[1:]]
+            else:
+                # El parametro final empieza en el primer " :"
+                cabeza, sep, final = raw.partition(" :")
+                params = cabeza.split()
+                if sep:
+                    params.append(final)
+                self._params = params
+        return self._params
+
+    @property
+    def nick(self) -> Optional[str]:
+        """Nombre del usuario que origina el mensaje (parte del prefijo antes de '!')"""
+        if not self.prefix:
+            return None
+        return self.prefix.partition("!")[0]
+
+    @property
+    def channel(self) -> Optional[str]:
+        """Canal destino sin '#', si el primer parametro es un canal"""
+        if self._params is None:
+            # Camino rapido sin separar todos los parametros
+            raw = self._raw_params
+            if raw.startswith("#"):
+                return raw[1:].partition(" ")[0]
+            return None
+        params = self._params
+        if params and params[0].startswith("#"):
+            return params[0][1:]
+        return None
+
+    @property
+    def trailing(self) -> str:
+        """Ultimo parametro (texto del mensaje, usuario baneado, etc.)"""
+        params = self.params
+        return params[-1] if params else ""
+
+    def __repr__(self):
+        return f"IRCMessage(command={self.command!r}, prefix={self.prefix!r}, params={self.params!r})"
+
+def parse_message(line: str, commands=None) -> Optional[IRCMessage]:
+    """Analiza una linea IRC en una sola pasada.
+
+    Args:
+        line: Linea IRC sin \\r\\n
+        commands: Contenedor opcional (p. ej. la tabla de despacho) con los comandos
+            de interes; si el comando no esta, se devuelve None sin construir el mensaje
+
+    Returns:
+        IRCMessage, o None si la linea esta mal formada o no es de interes
+    """
+    if line.startswith("@"):
+        raw_tags, _, resto = line.partition(" ")
+        raw_tags = raw_tags[1:]
+    else:
+        raw_tags = None
+        resto = line
+
+    if resto.startswith(":"):
+        prefix, _, resto = resto.partition(" ")
+        prefix = prefix[1:]
+    else:
+        prefix = None
+
+    # Twitch envia los comandos siempre en mayusculas (o numericos)
+    command, _, raw_params = resto.partition(" ")
+    if not command:
+        return None
+    if commands is not None and command not in commands:
+        return None
+
+    return IRCMessage(line, raw_tags, prefix, command, raw_params)
@@ -0,0 +1,240 @@
+import os
+import time
+import asyncio
+import inspect
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("PIPELINE")
+LOGGER.setLevel(logging.INFO)
+
+# Politicas de sobrecarga cuando la cola de una etapa esta llena
+BLOQUEAR = "bloquear"            # El productor espera a que haya espacio
+DESCARTAR_ANTIGUO = "descartar"  # Se descarta el evento mas antiguo de la cola
+COLAPSAR = "colapsar"            # Un evento reemplaza al pendiente con su misma clave de fusion
+POLITICAS = (BLOQUEAR, DESCARTAR_ANTIGUO, COLAPSAR)
+
+class _Cola:
+    """Cola acotada con soporte para reemplazar pendientes por clave (colapsar)"""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self.items = deque()
+        self.por_fusion: Dict[Hashable, list] = {}
+        self.hay_items = asyncio.Event()
+        self.hay_espacio = asyncio.Event()
+        self.hay_espacio.set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def poner(self, entrada):
+        self.items.append(entrada)
+        if entrada[3] is not None:
+            self.por_fusion[entrada[3]] = entrada
+        self.hay_items.set()
+        if len(self.items) >= self.maximo:
+            self.hay_espacio.clear()
+
+    def sacar(self):
+        entrada = self.items.popleft()
+        self._olvidar(entrada)
+        if not self.items:
+            self.hay_items.clear()
+        self.hay_espacio.set()
+        return entrada
+
+    def _olvidar(self, entrada):
+        if entrada[3] is not None and self.por_fusion.get(entrada[3]) is entrada:
+            del self.por_fusion[entrada[3]]
+
+class Etapa:
+    """Una etapa del pipeline: colas acotadas y sus trabajadores.
+
+    Si hay `clave`, cada trabajador tiene su cola y el evento va a la que
+    corresponde al hash de su clave (los eventos de un mismo usuario se
+    procesan en orden); sin clave, todos los trabajadores comparten una cola.
+    """
+
+    def __init__(self, nombre, funcion: Callable[[Any], Any], trabajadores=1, max_cola=1000, politica=BLOQUEAR,
+                 clave: Optional[Callable[[Any], Hashable]] = None, fusion: Optional[Callable[[Any], Optional[Hashable]]] = None):
+        if politica not in POLITICAS:
+            raise ValueError(f"Politica desconocida '{politica}', usa una de {POLITICAS}")
+        self.nombre = nombre
+        self.funcion = funcion
+        self.asincrona = inspect.iscoroutinefunction(funcion)
+        self.trabajadores = max(1, trabajadores)
+        self.politica = politica
+        self.clave = clave
+        self.fusion = fusion if politica == COLAPSAR else None
+        self.colas: List[_Cola] = [_Cola(max_cola) for _ in range(self.trabajadores if clave else 1)]
+        self.siguiente: Optional["Etapa"] = None
+        self.en_proceso = 0  # Sacados de la cola que un trabajador todavia no termino
+
+        # Estadisticas
+        self.procesados = 0
+        self.descartados = 0
+        self.colapsados = 0
+        self.errores = 0
+        self.profundidad_max = 0
+        self.espera_total = 0.0
+        self.proceso_total = 0.0
+        self.proceso_max = 0.0
+        self._muestras = deque(maxlen=1024)  # Tiempo en la etapa (espera + proceso) de los ultimos eventos
+
+    def _cola(self, item) -> _Cola:
+        if len(self.colas) == 1:
+            return self.colas[0]
+        return self.colas[hash(self.clave(item)) % len(self.colas)]
+
+    async def poner(self, item, origen=None):
+        """Encola un evento aplicando la politica de sobrecarga; `origen` es su hora de ingreso"""
+        cola = self._cola(item)
+        fusion = self.fusion(item) if self.fusion is not None else None
+        entrada = [item, time.perf_counter(), origen or time.perf_counter(), fusion]
+
+        if fusion is not None:
+            pendiente = cola.por_fusion.get(fusion)
+            if pendiente is not None:
+                # Reemplazar en su lugar: conserva la posicion y la hora de entrada del primero
+                pendiente[0] = item
+                self.colapsados += 1
+                return
+
+        if len(cola) >= cola.maximo:
+            if self.politica == BLOQUEAR:
+                while len(cola) >= cola.maximo:
+                    await cola.hay_espacio.wait()
+            else:
+                cola.sacar()
+                self.descartados += 1
+                if self.descartados % 100 == 1:
+                    LOGGER.warning(f"Etapa '{self.nombre}' saturada: {self.descartados} eventos descartados")
+
+        cola.poner(entrada)
+        if len(cola) > self.profundidad_max:
+            self.profundidad_max = len(cola)
+
+    async def _trabajador(self, cola: _Cola):
+        while True:
+            while not cola.items:
+                await cola.hay_items.wait()
+            item, entrada, origen, _ = cola.sacar()
+            self.en_proceso += 1
+            try:
+                inicio = time.perf_counter()
+                try:
+                    resultado = await self.funcion(item) if self.asincrona else self.funcion(item)
+                except Exception as e:
+                    self.errores += 1
+                    LOGGER.error(f"Error en la etapa '{self.nombre}': {e}")
+                    resultado = None
+                fin = time.perf_counter()
+                self.procesados += 1
+                self.espera_total += inicio - entrada
+                self.proceso_total += fin - inicio
+                self.proceso_max = max(self.proceso_max, fin - inicio)
+                self._muestras.append(fin - entrada)
+
+                # None corta el evento aqui; la ultima etapa no pasa nada a nadie
+                if resultado is not None and self.siguiente is not None:
+                    await self.siguiente.poner(resultado, origen)
+            finally:
+                self.en_proceso -= 1
+
+    def pendientes(self) -> int:
+        """En cola o en manos de un trabajador (detener espera a ambos)"""
+        return sum(len(cola) for cola in self.colas) + self.en_proceso
+
+    def estadisticas(self):
+        muestras = sorted(self._muestras)
+        p95 = muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] if muestras else 0.0
+        return {
+            f"{self.nombre}_pendientes": self.pendientes(),
+            f"{self.nombre}_max": self.profundidad_max,
+            f"{self.nombre}_procesados": self.procesados,
+            f"{self.nombre}_descartados": self.descartados,
+            f"{self.nombre}_colapsados": self.colapsados,
+            f"{self.nombre}_errores": self.errores,
+            f"{self.nombre}_espera_ms": (self.espera_total / self.procesados * 1000) if self.procesados else 0.0,
+            f"{self.nombre}_proceso_ms": (self.proceso_total / self.procesados * 1000) if self.procesados else 0.0,
+            f"{self.nombre}_proceso_max_ms": self.proceso_max * 1000,
+            f"{self.nombre}_p95_ms": p95 * 1000,
+        }
+
+class EventPipeline:
+    """Pipeline por etapas entre los listeners de EventSub y la consola/GUI.
+
+    Los listeners solo ingresan el evento (ingesta) y vuelven; las etapas
+    siguientes (p. ej. enriquecer con datos de usuario/follow y mostrar) corren
+    en sus propios trabajadores unidas por colas acotadas. Cada etapa devuelve
+    lo que recibe la siguiente. Asi un formateo lento o una GUI ocupada no
+    retrasan el despacho del siguiente evento, y las metricas por etapa
+    (profundidad, espera, proceso, p95) muestran donde se va el tiempo.
+    """
+
+    def __init__(self, nombre="eventos"):
+        self.nombre = nombre
+        self.etapas: List[Etapa] = []
+        self._tareas: List[asyncio.Task] = []
+        self.ingresados = 0
+        metricas.registrar(nombre, self.estadisticas)
+
+    def etapa(self, nombre, funcion, trabajadores=1, max_cola=None, politica=None, clave=None, fusion=None) -> Etapa:
+        """Agrega una etapa al final del pipeline.
+
+        Args:
+            nombre: Nombre de la etapa en las metricas
+            funcion: Recibe el evento y devuelve el de la siguiente etapa (None lo descarta); puede ser async
+            trabajadores: Trabajadores concurrentes de la etapa
+            max_cola: Eventos maximos en cola (por defecto EVENTOS_MAX_COLA o 1000)
+            politica: bloquear, descartar o colapsar (por defecto EVENTOS_POLITICA o bloquear)
+            clave: Clave de orden; los eventos con la misma clave los procesa el mismo trabajador
+            fusion: Clave con la que un evento reemplaza al pendiente (solo con colapsar; None = no se fusiona)
+        """
+        nueva = Etapa(
+            nombre, funcion, trabajadores,
+            max_cola or int(os.getenv("EVENTOS_MAX_COLA", "1000")),
+            politica or os.getenv("EVENTOS_POLITICA", BLOQUEAR),
+            clave, fusion
+        )
+        if self.etapas:
+            self.etapas[-1].siguiente = nueva
+        self.etapas.append(nueva)
+        return nueva
+
+    def iniciar(self):
+        """Arranca los trabajadores de todas las etapas; no hace nada si ya corren"""
+        if self._tareas:
+            return
+        for etapa in self.etapas:
+            for cola in etapa.colas:
+                for _ in range(etapa.trabajadores if len(etapa.colas) == 1 else 1):
+                    self._tareas.append(asyncio.create_task(etapa._trabajador(cola)))
+
+    async def detener(self, timeout=2.0):
+        """Espera (hasta `timeout`) a que se vacie el pipeline y cancela los trabajadores"""
+        limite = time.monotonic() + timeout
+        while self.pendientes() and time.monotonic() < limite:
+            await asyncio.sleep(0.05)
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas.clear()
+
+    async def ingresar(self, item):
+        """Ingesta: entrega un evento a la primera etapa (con bloquear puede esperar)"""
+        self.ingresados += 1
+        await self.etapas[0].poner(item)
+
+    def pendientes(self) -> int:
+        return sum(etapa.pendientes() for etapa in self.etapas)
+
+    def estadisticas(self):
+        """Ingresados y, por etapa, profundidad, descartes y latencias"""
+        datos = {"ingresados": self.ingresados}
+        for etapa in self.etapas:
+            datos.update(etapa.estadisticas())
+        return datos
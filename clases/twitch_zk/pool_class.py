@@ -0,0 +1,204 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from clases.twitch_zk.irc_class import TwitchIRCClient
+from clases.twitch_zk.chat_base_class import ChannelState
+from clases.twitch_zk.helix_class import HelixUserBatcher
+from clases.twitch_zk.limiter_class import SlidingWindowLimiter
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("IRC_POOL")
+LOGGER.setLevel(logging.INFO)
+
+class IRCConnectionPool:
+    """Pool de conexiones IRC para monitorear muchos canales en un solo proceso.
+
+    Reparte los canales entre N conexiones TwitchIRCClient con un maximo de
+    canales por conexion, comparte entre todas el batcher de Helix y los
+    limites de JOIN/PRIVMSG (que Twitch aplica por cuenta, no por socket) y,
+    si una conexion muere, mueve sus canales a las demas. Cada conexion
+    enruta los mensajes al ChannelState de su canal.
+    """
+
+    def __init__(self, oauth_token, username, userbots, msg_type=None, message_callback=None,
+                 canales_por_conexion=None, user_lookup=None, es_moderador=False):
+        """
+        Args:
+            canales_por_conexion: Maximo de canales por socket (por defecto IRC_CANALES_POR_CONEXION o 50)
+            user_lookup: HelixUserBatcher compartido (se crea uno si no se pasa)
+        """
+        self.oauth_token = oauth_token
+        self.username = username
+        self.userbots = userbots
+        self.msg_type = msg_type
+        self.message_callback = message_callback
+        if canales_por_conexion is None:
+            canales_por_conexion = int(os.getenv("IRC_CANALES_POR_CONEXION", "50"))
+        self.canales_por_conexion = max(1, canales_por_conexion)
+        self.user_lookup = user_lookup or HelixUserBatcher()
+        self._lookup_propio = user_lookup is None
+        self.max_outage = 30  # segundos sin conexion antes de mover los canales a otra
+        self.host = "irc.chat.twitch.tv"
+        self.port = 6697
+        self.use_ssl = True
+        self.limites = {
+            "JOIN": SlidingWindowLimiter(20, 10),
+            "PRIVMSG": SlidingWindowLimiter(100 if es_moderador else 20, 30),
+        }
+
+        self.conexiones: List[TwitchIRCClient] = []
+        self.estados: Dict[str, ChannelState] = {}
+        self.asignacion: Dict[str, TwitchIRCClient] = {}
+        self._tareas: Dict[TwitchIRCClient, asyncio.Task] = {}
+        self._contador = 0
+        self.running = False
+        self.rebalanceos = 0
+        metricas.registrar("irc_pool", self.estadisticas)
+
+    def _nueva_conexion(self) -> TwitchIRCClient:
+        cliente = TwitchIRCClient(
+            self.oauth_token, self.username, None, self.userbots, {}, self.msg_type,
+            message_callback=self.message_callback, user_lookup=self.user_lookup,
+            nombre=f"irc{self._contador}"
+        )
+        self._contador += 1
+        cliente.tx.limites = self.limites
+        cliente.max_outage = self.max_outage
+        cliente.host, cliente.port, cliente.use_ssl = self.host, self.port, self.use_ssl
+        self.conexiones.append(cliente)
+        return cliente
+
+    def _elegir_conexion(self) -> TwitchIRCClient:
+        """La conexion con menos canales que aun tenga lugar, o una nueva"""
+        libres = [c for c in self.conexiones if len(c.channels) < self.canales_por_conexion]
+        if libres:
+            return min(libres, key=lambda c: len(c.channels))
+        return self._nueva_conexion()
+
+    async def agregar_canal(self, name, user_data_twitch=None, follower_index=None, broadcaster_id=None, propio=False, analytics=None) -> Optional[ChannelState]:
+        """Agrega un canal al pool.
+
+        Args:
+            propio: Canal del .env (BROADCASTER_ID), sin prefijo en los mensajes; en los demas,
+                sin `follower_index`, no se consulta el follow (el token no tiene permiso)
+            broadcaster_id: ID del canal; si falta y no es propio se busca en Helix
+            analytics: ChatAnalytics donde contar los JOIN/PART del canal
+        """
+        name = name.lower().lstrip("#")
+        if name in self.estados:
+            return self.estados[name]
+
+        if not propio and broadcaster_id is None:
+            broadcaster_id = await self.user_lookup.buscar_id(name)
+            if broadcaster_id is None:
+                LOGGER.warning(f"No se encontro el canal {name} en Twitch; no se agrega")
+                return None
+
+        estado = ChannelState(name, user_data_twitch, follower_index, broadcaster_id,
+                              prefijo="" if propio else f"[#{name}] ", analytics=analytics,
+                              consultar_follow=propio)
+        self.estados[name] = estado
+        await self._asignar(estado)
+        return estado
+
+    async def _asignar(self, estado: ChannelState):
+        cliente = self._elegir_conexion()
+        self.asignacion[estado.name] = cliente
+        await cliente.agregar_canal(estado)
+        # Conexion nueva con el pool en marcha: arrancarla
+        if self.running and cliente not in self._tareas:
+            self._tareas[cliente] = asyncio.create_task(self._supervisar(cliente))
+
+    async def quitar_canal(self, name):
+        """Saca un canal del pool (PART) y cierra su conexion si queda vacia"""
+        name = name.lower().lstrip("#")
+        cliente = self.asignacion.pop(name, None)
+        self.estados.pop(name, None)
+        if cliente is None:
+            return
+        await cliente.quitar_canal(name)
+        if not cliente.channels and len(self.conexiones) > 1:
+            await self._cerrar_conexion(cliente)
+
+    async def start(self) -> bool:
+        """Conecta todas las conexiones; True si al menos una lo logro"""
+        self.running = True
+        if not self.conexiones:
+            LOGGER.warning("Pool IRC sin canales")
+            return False
+        resultados = await asyncio.gather(*(c.connect() for c in self.conexiones))
+        for cliente in self.conexiones:
+            self._tareas[cliente] = asyncio.create_task(self._supervisar(cliente))
+        LOGGER.info(f"Pool IRC: {len(self.estados)} canales en {len(self.conexiones)} conexiones")
+        return any(resultados)
+
+    async def _supervisar(self, cliente: TwitchIRCClient):
+        """Mantiene viva una conexion; si su bucle termina, reparte sus canales"""
+        try:
+            if not cliente.running:
+                # Nunca conecto: usar el mismo motor de reconexion
+                cliente.running = True
+                if not await cliente.connect() and not await cliente._reconnect("conexion inicial"):
+                    return
+            await cliente.listen()
+        except Exception as e:
+            LOGGER.error(f"Error en la conexion {cliente.nombre}: {e}")
+        finally:
+            self._tareas.pop(cliente, None)
+            if self.running and cliente in self.conexiones:
+                LOGGER.warning(f"Conexion {cliente.nombre} terminada; rebalanceando {len(cliente.channels)} canales")
+                await self._rebalancear(cliente)
+
+    async def _rebalancear(self, caida: TwitchIRCClient):
+        """Mueve los canales de una conexion caida a las demas"""
+        estados = list(caida.channels.values())
+        caida.channels.clear()
+        await self._cerrar_conexion(caida)
+        for estado in estados:
+            estado.reiniciar_presencia()
+            await self._asignar(estado)
+        self.rebalanceos += 1
+
+    async def _cerrar_conexion(self, cliente: TwitchIRCClient):
+        if cliente in self.conexiones:
+            self.conexiones.remove(cliente)
+        tarea = self._tareas.pop(cliente, None)
+        if tarea is not None and tarea is not asyncio.current_task():
+            tarea.cancel()
+        if cliente.running:
+            await cliente.disconnect()
+        metricas.eliminar(f"{cliente.nombre}_tx")
+        metricas.eliminar(f"{cliente.nombre}_reconexion")
+        metricas.eliminar(f"{cliente.nombre}_colas")
+
+    async def listen(self):
+        """Espera mientras haya conexiones activas (equivalente a TwitchIRCClient.listen)"""
+        while self.running and self._tareas:
+            await asyncio.wait(set(self._tareas.values()), return_when=asyncio.FIRST_COMPLETED)
+
+    async def disconnect(self):
+        """Cierra todas las conexiones"""
+        self.running = False
+        for cliente in list(self.conexiones):
+            await self._cerrar_conexion(cliente)
+        if self._lookup_propio:
+            await self.user_lookup.close()
+
+    def get_connected_users(self, channel=None):
+        """Usuarios presentes en un canal (o en todos si no se indica)"""
+        if channel is not None:
+            estado = self.estados.get(channel.lower().lstrip("#"))
+            return list(estado.joined_users) if estado else []
+        return list({user for estado in self.estados.values() for user in estado.joined_users})
+
+    def estadisticas(self):
+        """Reparto de canales y usuarios por conexion"""
+        return {
+            "conexiones": len(self.conexiones),
+            "canales": len(self.estados),
+            "max_por_conexion": self.canales_por_conexion,
+            "reparto": "/".join(str(len(c.channels)) for c in self.conexiones) or "-",
+            "usuarios": sum(len(estado.joined_users) for estado in self.estados.values()),
+            "rebalanceos": self.rebalanceos
+        }
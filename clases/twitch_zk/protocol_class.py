@@ -0,0 +1,208 @@
+from typing import Callable, Container, Dict, List, Optional
+from clases.twitch_zk.framer_class import IRCLineFramer
+from clases.twitch_zk.parser_class import IRCMessage, parse_message
+
+# Textos de NOTICE con los que Twitch rechaza el login
+FALLOS_AUTH = ("Login authentication failed", "Login unsuccessful", "Improperly formatted auth")
+
+# --- Eventos tipados que emite el protocolo ---
+
+class ChatEvent:
+    """Evento de chat; `command` es el comando IRC que lo origina"""
+    __slots__ = ("channel", "user")
+    command = ""
+
+    def __init__(self, channel: Optional[str], user: Optional[str]):
+        self.channel = channel
+        self.user = user
+
+    def __repr__(self):
+        campos = ", ".join(f"{nombre}={getattr(self, nombre)!r}" for nombre in self._campos())
+        return f"{type(self).__name__}({campos})"
+
+    @classmethod
+    def _campos(cls):
+        for clase in reversed(cls.__mro__):
+            yield from getattr(clase, "__slots__", ())
+
+class Ping(ChatEvent):
+    __slots__ = ("target",)
+    command = "PING"
+
+    def __init__(self, target: str):
+        super().__init__(None, None)
+        self.target = target
+
+class Reconnect(ChatEvent):
+    __slots__ = ()
+    command = "RECONNECT"
+
+class Welcome(ChatEvent):
+    """Bienvenida 001: el servidor acepto el login"""
+    __slots__ = ()
+    command = "001"
+
+class Notice(ChatEvent):
+    """Aviso del servidor; los de login rechazado llegan antes de cualquier 001"""
+    __slots__ = ("text",)
+    command = "NOTICE"
+
+    def __init__(self, channel, text: str):
+        super().__init__(channel, None)
+        self.text = text
+
+    @property
+    def auth_fallida(self) -> bool:
+        return any(texto in self.text for texto in FALLOS_AUTH)
+
+class Join(ChatEvent):
+    __slots__ = ()
+    command = "JOIN"
+
+class Part(ChatEvent):
+    __slots__ = ()
+    command = "PART"
+
+class ClearChat(ChatEvent):
+    """Ban/timeout de `user`, o limpieza del chat completo si `user` es None"""
+    __slots__ = ("duration", "reason")
+    command = "CLEARCHAT"
+
+    def __init__(self, channel, user, duration: Optional[str], reason: str):
+        super().__init__(channel, user)
+        self.duration = duration
+        self.reason = reason
+
+class ClearMsg(ChatEvent):
+    """Mensaje borrado; `user` es el login del autor"""
+    __slots__ = ("text",)
+    command = "CLEARMSG"
+
+    def __init__(self, channel, user, text: str):
+        super().__init__(channel, user)
+        self.text = text
+
+class Privmsg(ChatEvent):
+    """Mensaje de chat; los tags se analizan solo si se leen"""
+    __slots__ = ("text", "message")
+    command = "PRIVMSG"
+
+    def __init__(self, channel, user, text: str, message: IRCMessage):
+        super().__init__(channel, user)
+        self.text = text
+        self.message = message
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        return self.message.tags
+
+def _clearchat(message: IRCMessage) -> ClearChat:
+    tags = message.tags
+    user = message.trailing.strip() if len(message.params) > 1 else None
+    return ClearChat(message.channel, user, tags.get("ban-duration") or None, tags.get("ban-reason", ""))
+
+def _clearmsg(message: IRCMessage) -> ClearMsg:
+    text = message.trailing.strip() if len(message.params) > 1 else ""
+    return ClearMsg(message.channel, message.tags.get("login") or None, text)
+
+# Constructor de evento para cada comando soportado
+_CONSTRUCTORES: Dict[str, Callable[[IRCMessage], ChatEvent]] = {
+    "PING": lambda m: Ping(m.trailing or "tmi.twitch.tv"),
+    "RECONNECT": lambda m: Reconnect(None, None),
+    "001": lambda m: Welcome(None, None),
+    "NOTICE": lambda m: Notice(m.channel, m.trailing),
+    "JOIN": lambda m: Join(m.channel, m.nick),
+    "PART": lambda m: Part(m.channel, m.nick),
+    "CLEARCHAT": _clearchat,
+    "CLEARMSG": _clearmsg,
+    "PRIVMSG": lambda m: Privmsg(m.channel, m.nick, m.trailing, m),
+}
+
+class TwitchChatProtocol:
+    """Nucleo del protocolo de chat de Twitch, sin E/S (sans-I/O).
+
+    Recibe bytes (socket TCP/TLS) o texto (frames de WebSocket) y devuelve
+    eventos tipados; para enviar, devuelve las lineas que el transporte debe
+    escribir. No abre sockets ni usa el bucle de eventos, asi el mismo codigo
+    de separacion de lineas, parseo y filtrado sirve para ambos clientes y se
+    puede medir sin red.
+    """
+
+    CAPACIDADES = ("twitch.tv/membership", "twitch.tv/commands", "twitch.tv/tags")
+
+    def __init__(self, comandos: Optional[Container[str]] = None):
+        """
+        Args:
+            comandos: Comandos de interes (p. ej. la tabla de manejadores del cliente, se
+                consulta en cada linea); el resto se descarta sin construir el mensaje.
+                None = todos los soportados.
+        """
+        self.comandos = comandos if comandos is not None else _CONSTRUCTORES
+        self.framer = IRCLineFramer()
+        self.lineas = 0
+        self.eventos = 0
+
+    # --- Entrada ---
+
+    def recibir_bytes(self, data: bytes) -> List[ChatEvent]:
+        """Eventos de un bloque leido del socket (las lineas incompletas quedan en espera)"""
+        return self._eventos(self.framer.feed(data))
+
+    def recibir_texto(self, frame: str) -> List[ChatEvent]:
+        """Eventos de un frame de WebSocket, que puede traer varias lineas"""
+        return self._eventos(frame.split("\r\n"))
+
+    def recibir_linea(self, line: str) -> Optional[ChatEvent]:
+        """Evento de una linea completa, o None si no es de interes"""
+        # Ruta rapida: PING sin pasar por el parser
+        if line.startswith("PING"):
+            if "PING" not in self.comandos:
+                return None
+            return Ping(line.partition(" :")[2] or "tmi.twitch.tv")
+
+        message = parse_message(line, self.comandos)
+        if message is None:
+            return None
+        constructor = _CONSTRUCTORES.get(message.command)
+        return constructor(message) if constructor else None
+
+    def _eventos(self, lines) -> List[ChatEvent]:
+        eventos = []
+        for line in lines:
+            if not line:
+                continue
+            self.lineas += 1
+            evento = self.recibir_linea(line)
+            if evento is not None:
+                eventos.append(evento)
+        self.eventos += len(eventos)
+        return eventos
+
+    def reset(self):
+        """Descarta la linea incompleta pendiente (al reconectar)"""
+        self.framer.reset()
+
+    # --- Salida ---
+
+    def saludo(self, oauth_token: str, nick: str, canales) -> List[str]:
+        """Lineas de autenticacion, capacidades y JOIN inicial"""
+        lineas = [f"PASS oauth:{oauth_token}", f"NICK {nick}"]
+        lineas.extend(f"CAP REQ :{capacidad}" for capacidad in self.CAPACIDADES)
+        lineas.extend(self.join(canal) for canal in canales)
+        return lineas
+
+    @staticmethod
+    def pong(target: str) -> str:
+        return f"PONG :{target}"
+
+    @staticmethod
+    def join(canal: str) -> str:
+        return f"JOIN #{canal}"
+
+    @staticmethod
+    def part(canal: str) -> str:
+        return f"PART #{canal}"
+
+    @staticmethod
+    def quit() -> str:
+        return "QUIT"
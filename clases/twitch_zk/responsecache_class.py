@@ -0,0 +1,118 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from clases.twitch_zk.flood_class import normalizar
+import recurso.twitch_zk.metricas as metricas
+
+# Marca que ocupa el lugar del nombre de quien pregunto dentro de una respuesta guardada
+MARCA_USUARIO = "\x00usuario\x00"
+
+class ResponseCache:
+    """Cache de respuestas de Gemi para las preguntas que se repiten en cada stream.
+
+    La clave es la pregunta normalizada (minusculas, sin acentos ni signos,
+    como en el detector de flood) mas el titulo y la categoria actuales, asi
+    un cambio de titulo no devuelve respuestas viejas. Las entradas vencen a
+    los `ttl` segundos y viven en un LRU acotado por cantidad y por bytes de
+    texto. Las respuestas con llamadas a funciones nunca se guardan.
+
+    Gemi se dirige a quien pregunta por su nombre; ese nombre se guarda como
+    una marca y al responder desde la cache se reemplaza por el de quien
+    pregunta ahora. Si el nombre es tambien una palabra de la pregunta no se
+    puede distinguir de la respuesta y no se guarda.
+    """
+
+    def __init__(self, ttl=None, max_bytes=None, max_entradas=2000, reloj=time.monotonic):
+        """
+        Args:
+            ttl: Segundos que vale una respuesta (por defecto GEMI_CACHE_TTL o 1800)
+            max_bytes: Bytes maximos de texto guardado (por defecto GEMI_CACHE_KB * 1024, 256 KB)
+            max_entradas: Entradas maximas
+            reloj: Funcion que devuelve los segundos actuales (inyectable para pruebas)
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("GEMI_CACHE_TTL", "1800"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("GEMI_CACHE_KB", "256")) * 1024
+        self.max_entradas = max_entradas
+        self.reloj = reloj
+        # clave -> (respuesta, vence, bytes, latencia de la consulta original)
+        self._entradas: "OrderedDict[Tuple[str, str, str], Tuple[str, float, int, float]]" = OrderedDict()
+        self.bytes = 0
+
+        # Estadisticas
+        self.aciertos = 0
+        self.fallos = 0
+        self.guardadas = 0
+        self.ahorrado = 0.0
+        self.tiempo_aciertos = 0.0
+        metricas.registrar("gemi_cache", self.estadisticas)
+
+    @staticmethod
+    def clave(pregunta: str, titulo: Optional[str] = None, categoria: Optional[str] = None) -> Tuple[str, str, str]:
+        return (normalizar(pregunta), titulo or "", categoria or "")
+
+    def obtener(self, clave, usuario: Optional[str] = None) -> Optional[str]:
+        """Respuesta guardada y vigente para la clave (dirigida a `usuario`), o None"""
+        inicio = time.perf_counter()
+        entrada = self._entradas.get(clave)
+        if entrada is None or not clave[0]:
+            self.fallos += 1
+            return None
+        if entrada[1] <= self.reloj():
+            self._quitar(clave)
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        self.ahorrado += entrada[3]
+        respuesta = entrada[0]
+        if MARCA_USUARIO in respuesta:
+            respuesta = respuesta.replace(MARCA_USUARIO, usuario or "")
+        self.tiempo_aciertos += time.perf_counter() - inicio
+        return respuesta
+
+    def guardar(self, clave, respuesta: str, latencia=0.0, usuario: Optional[str] = None) -> None:
+        """Guarda una respuesta de texto (nunca una con llamadas a funciones) sin el nombre de `usuario`"""
+        if not clave[0] or not respuesta:
+            return
+        if usuario:
+            if normalizar(usuario) in clave[0].split():
+                return
+            respuesta = re.sub(rf"(?<!\w){re.escape(usuario)}(?!\w)", MARCA_USUARIO, respuesta, flags=re.IGNORECASE)
+        tamano = len(respuesta.encode("utf-8"))
+        if tamano > self.max_bytes:
+            return
+        if clave in self._entradas:
+            self._quitar(clave)
+        self._entradas[clave] = (respuesta, self.reloj() + self.ttl, tamano, latencia)
+        self.bytes += tamano
+        self.guardadas += 1
+        # Desalojar las menos usadas hasta entrar en el presupuesto
+        while self.bytes > self.max_bytes or len(self._entradas) > self.max_entradas:
+            self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, clave) -> None:
+        entrada = self._entradas.pop(clave)
+        self.bytes -= entrada[2]
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estadisticas(self):
+        """Tasa de acierto, espacio usado y segundos de modelo ahorrados"""
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "kb": self.bytes / 1024,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_acierto": (self.aciertos / total) if total else 0.0,
+            "guardadas": self.guardadas,
+            "ahorrado_s": self.ahorrado,
+            "us_por_acierto": (self.tiempo_aciertos / self.aciertos * 1e6) if self.aciertos else 0.0
+        }
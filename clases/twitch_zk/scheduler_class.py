@@ -0,0 +1,180 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+from clases.twitch_zk.limiter_class import SlidingWindowLimiter
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("CHAT_TX")
+LOGGER.setLevel(logging.INFO)
+
+# Clases de prioridad (menor numero sale primero)
+MODERACION = 0  # Respuestas a comandos de moderadores/broadcaster
+IA = 1          # Respuestas de Gemi
+INFO = 2        # Mensajes informativos (help, socials, avisos...)
+NOMBRES = {MODERACION: "moderacion", IA: "ia", INFO: "info"}
+
+LARGO_MAXIMO = 500  # Limite de caracteres de un mensaje de chat de Twitch
+SEPARADOR = " | "
+
+def partir(texto: str, largo=LARGO_MAXIMO) -> List[str]:
+    """Parte un texto en trozos de hasta `largo` caracteres, cortando en espacios cuando se puede"""
+    texto = " ".join(texto.split())  # El chat no muestra saltos de linea
+    partes = []
+    while len(texto) > largo:
+        corte = texto.rfind(" ", 0, largo + 1)
+        if corte <= largo // 2:
+            corte = largo  # Palabra enorme (p. ej. un enlace): cortar en seco
+        partes.append(texto[:corte].rstrip())
+        texto = texto[corte:].lstrip()
+    if texto:
+        partes.append(texto)
+    return partes
+
+class _Salida:
+    __slots__ = ("prioridad", "orden", "canal", "texto", "funcion", "empaquetar", "encolado")
+
+    def __init__(self, prioridad, orden, canal, texto, funcion, empaquetar):
+        self.prioridad = prioridad
+        self.orden = orden
+        self.canal = canal
+        self.texto = texto
+        self.funcion = funcion
+        self.empaquetar = empaquetar
+        self.encolado = time.monotonic()
+
+    def __lt__(self, otro):
+        return (self.prioridad, self.orden) < (otro.prioridad, otro.orden)
+
+class ChatScheduler:
+    """Planificador central de los mensajes que el bot envia al chat.
+
+    Los comandos encolan y vuelven; una tarea de fondo saca los mensajes por
+    prioridad (moderacion, IA, informativos; dentro de cada clase en orden de
+    llegada) y cuenta cada envio en el limite de mensajes de Twitch (20 en
+    cualquier ventana de 30 s, o 100 si el bot es moderador). Los mensajes
+    cortos seguidos para el mismo canal se juntan en uno solo mientras
+    quepan en 500 caracteres, y los largos se parten en ese limite; las
+    respuestas (reply) no se juntan porque van ligadas al mensaje original.
+    """
+
+    def __init__(self, es_moderador=None, nombre="chat_tx"):
+        """
+        Args:
+            es_moderador: Si el bot es moderador del canal (por defecto BOT_ES_MODERADOR o no)
+            nombre: Nombre con el que se registran las metricas
+        """
+        if es_moderador is None:
+            es_moderador = os.getenv("BOT_ES_MODERADOR", "0").lower() in ("1", "true", "si")
+        self.limite = SlidingWindowLimiter(100 if es_moderador else 20, 30)
+        self._cola: List[_Salida] = []
+        self._orden = 0
+        self._hay_datos = asyncio.Event()
+        self._tarea: Optional[asyncio.Task] = None
+
+        # Estadisticas
+        self.encolados = 0
+        self.enviados = 0
+        self.empaquetados = 0
+        self.partidos = 0
+        self.errores = 0
+        self.espera_limite = 0.0
+        self._esperas: Dict[int, deque] = {prioridad: deque(maxlen=512) for prioridad in NOMBRES}
+        metricas.registrar(nombre, self.estadisticas)
+
+    def iniciar(self) -> None:
+        """Arranca la tarea de envio; no hace nada si ya corre"""
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self, timeout=5.0) -> None:
+        """Espera (hasta `timeout`) a que salga lo pendiente y detiene la tarea"""
+        limite = time.monotonic() + timeout
+        while self._cola and time.monotonic() < limite:
+            await asyncio.sleep(0.05)
+        if self._tarea is not None:
+            self._tarea.cancel()
+            await asyncio.gather(self._tarea, return_exceptions=True)
+            self._tarea = None
+
+    def enviar(self, funcion: Callable[[str], Awaitable], texto: str, prioridad=INFO, canal=None, empaquetar=True) -> None:
+        """Encola un mensaje sin bloquear.
+
+        Args:
+            funcion: Corrutina que publica el texto (p. ej. ctx.send o ctx.reply)
+            texto: Mensaje; si supera 500 caracteres se parte en varios
+            prioridad: MODERACION, IA o INFO
+            canal: Canal de destino; solo se juntan mensajes del mismo canal
+            empaquetar: False para mensajes que no pueden juntarse con otros (p. ej. reply)
+        """
+        partes = partir(texto)
+        if len(partes) > 1:
+            self.partidos += 1
+        for parte in partes:
+            self._orden += 1
+            heapq.heappush(self._cola, _Salida(prioridad, self._orden, canal, parte, funcion, empaquetar))
+            self.encolados += 1
+        self._hay_datos.set()
+
+    def _juntar(self, primera: _Salida) -> List[_Salida]:
+        """Saca de la cola los siguientes mensajes que caben en el mismo envio que `primera`"""
+        grupo = [primera]
+        if not primera.empaquetar:
+            return grupo
+        largo = len(primera.texto)
+        while self._cola:
+            siguiente = self._cola[0]
+            if (not siguiente.empaquetar or siguiente.canal != primera.canal
+                    or largo + len(SEPARADOR) + len(siguiente.texto) > LARGO_MAXIMO):
+                break
+            heapq.heappop(self._cola)
+            largo += len(SEPARADOR) + len(siguiente.texto)
+            grupo.append(siguiente)
+        return grupo
+
+    async def _bucle(self):
+        while True:
+            while not self._cola:
+                self._hay_datos.clear()
+                await self._hay_datos.wait()
+
+            # Esperar lugar en el limite antes de elegir: asi lo que llegue mientras tanto
+            # (una respuesta de moderacion, mas mensajes para juntar) entra en este envio
+            self.espera_limite += await self.limite.adquirir()
+            grupo = self._juntar(heapq.heappop(self._cola))
+            ahora = time.monotonic()
+            for salida in grupo:
+                self._esperas[salida.prioridad].append(ahora - salida.encolado)
+            if len(grupo) > 1:
+                self.empaquetados += len(grupo) - 1
+
+            try:
+                await grupo[0].funcion(SEPARADOR.join(salida.texto for salida in grupo))
+                self.enviados += 1
+            except Exception as e:
+                self.errores += 1
+                LOGGER.error(f"Error al enviar mensaje al chat: {e}")
+
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    def estadisticas(self):
+        """Envios, mensajes juntados/partidos y tiempo en cola por prioridad"""
+        datos = {
+            "pendientes": self.pendientes(),
+            "encolados": self.encolados,
+            "enviados": self.enviados,
+            "empaquetados": self.empaquetados,
+            "partidos": self.partidos,
+            "errores": self.errores,
+            "espera_limite_s": self.espera_limite,
+            "tokens": self.limite.tokens,
+        }
+        for prioridad, nombre in NOMBRES.items():
+            esperas = sorted(self._esperas[prioridad])
+            datos[f"{nombre}_espera_ms"] = (sum(esperas) / len(esperas) * 1000) if esperas else 0.0
+            datos[f"{nombre}_p95_ms"] = esperas[min(len(esperas) - 1, int(len(esperas) * 0.95))] * 1000 if esperas else 0.0
+        return datos
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import glob
+import queue
+import atexit
+import logging
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Set
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("TRANSCRIPT")
+LOGGER.setLevel(logging.INFO)
+
+CARPETA_POR_DEFECTO = os.path.join("recurso", "twitch_zk", "chat_gemi")
+
+# Escritores avisados de cerrar sin esperarlos (desde el bucle de eventos); al salir se los espera
+_cerrando: Set[threading.Thread] = set()
+
+@atexit.register
+def _esperar_cierres(timeout=5.0) -> None:
+    for hilo in list(_cerrando):
+        hilo.join(timeout)
+
+def _usuario(role, texto) -> Optional[str]:
+    """Nombre de quien pregunta en un turno "nombre: mensaje" (None para el modelo)"""
+    if role != "user" or ":" not in texto:
+        return None
+    return texto.split(":", 1)[0].strip()
+
+def _registro(n, ts, contenido) -> Dict[str, Any]:
+    texto = " ".join(part.text for part in contenido.parts if part.text)
+    registro = {"n": n, "ts": ts, "role": contenido.role, "user_name": _usuario(contenido.role, texto), "content": texto}
+    funciones = [part.function_call.name for part in contenido.parts if part.function_call.name]
+    if funciones:
+        registro["functions"] = funciones
+    return registro
+
+class TranscriptWriter:
+    """Transcripcion de una sesion de Gemi en disco, solo por agregado (JSONL).
+
+    `agregar` solo deja el turno en una cola en memoria; un hilo escritor
+    la vacia por lotes: escribe una linea JSON por turno, hace un unico
+    fsync por lote y reemplaza de forma atomica (archivo temporal +
+    os.replace) un indice chico con los totales de la sesion. Si el proceso
+    se cae se pierde a lo sumo el ultimo lote; una linea cortada al final se
+    ignora al leer. Los archivos se crean con el primer turno, asi una
+    sesion sin mensajes no deja nada en disco. El JSON legible de antes se
+    genera a pedido con `exportar`.
+    """
+
+    # Sesiones creadas por este proceso (los archivos recien aparecen con el primer turno)
+    _nombres: set = set()
+    _candado_nombres = threading.Lock()
+
+    def __init__(self, carpeta: Optional[str] = None, intervalo=1.0, max_lote=200):
+        """
+        Args:
+            carpeta: Carpeta de las transcripciones (por defecto GEMI_TRANSCRIPT_DIR o recurso/twitch_zk/chat_gemi)
+            intervalo: Segundos maximos que un turno espera en memoria antes de escribirse
+            max_lote: Turnos maximos por escritura (y por fsync)
+        """
+        self.carpeta = carpeta or os.getenv("GEMI_TRANSCRIPT_DIR") or CARPETA_POR_DEFECTO
+        self.intervalo = intervalo
+        self.max_lote = max_lote
+        self.inicio = datetime.datetime.now()
+        self.sesion = self._nombre_libre(f"chat_{self.inicio.strftime('%Y%m%d_%H%M%S')}")
+        self.ruta = os.path.join(self.carpeta, f"{self.sesion}.jsonl")
+        self.ruta_indice = os.path.join(self.carpeta, f"{self.sesion}.idx.json")
+        self.participantes: List[str] = []
+        self.mensajes = 0   # Respuestas que contaron para el limite de Gemi (lo actualiza Gemi)
+        self._cola: "queue.SimpleQueue[Optional[Any]]" = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._cierre: Optional[threading.Thread] = None   # Hilo que esta escribiendo el ultimo lote
+        self._candado = threading.Lock()
+
+        # Estadisticas
+        self.encolados = 0
+        self.registros = 0
+        self.bytes = 0
+        self.lotes = 0
+        self.errores = 0
+        self.escritura_total = 0.0
+        metricas.registrar("gemi_transcript", self.estadisticas)
+
+    def _nombre_libre(self, base) -> str:
+        """Nombre de sesion sin usar (dos ?on en el mismo segundo no comparten archivo)"""
+        with TranscriptWriter._candado_nombres:
+            nombre, n = base, 1
+            while nombre in TranscriptWriter._nombres or os.path.exists(os.path.join(self.carpeta, f"{nombre}.jsonl")):
+                n += 1
+                nombre = f"{base}_{n}"
+            TranscriptWriter._nombres.add(nombre)
+        return nombre
+
+    def agregar(self, contenido) -> None:
+        """Encola un turno (Content del usuario o del modelo) sin tocar el disco"""
+        with self._candado:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._escritor, name="gemi_transcript", daemon=True)
+                self._hilo.start()
+        self._cola.put((datetime.datetime.now().isoformat(), contenido))
+        self.encolados += 1
+
+    def cerrar(self, esperar=True, timeout=5.0) -> None:
+        """Escribe lo pendiente, marca la sesion como cerrada en el indice y detiene el hilo.
+
+        Con esperar=False solo avisa al hilo y vuelve enseguida, para no frenar el
+        bucle de eventos con el ultimo lote y su fsync; el proceso lo espera al salir.
+        """
+        with self._candado:
+            hilo, self._hilo = self._hilo, None
+        if hilo is None:
+            return
+        self._cierre = hilo
+        if not esperar:
+            _cerrando.add(hilo)
+        self._cola.put(None)
+        if esperar:
+            hilo.join(timeout)
+
+    def esperar_cierre(self, timeout=5.0) -> bool:
+        """Bloquea hasta que el hilo termina de cerrar la sesion; True si termino"""
+        if self._cierre is not None:
+            self._cierre.join(timeout)
+        return self._hilo is None and (self._cierre is None or not self._cierre.is_alive())
+
+    def _escritor(self) -> None:
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            archivo = open(self.ruta, "ab")
+        except OSError as e:
+            self.errores += 1
+            LOGGER.error(f"No se pudo abrir la transcripcion de Gemi {self.ruta}: {e}")
+            return
+
+        activo = True
+        while activo:
+            try:
+                turno = self._cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                continue
+            lote = []
+            # Juntar lo que ya este en cola, hasta max_lote
+            while turno is not None:
+                lote.append(turno)
+                if len(lote) >= self.max_lote:
+                    break
+                try:
+                    turno = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+            if turno is None:
+                activo = False
+            if lote:
+                self._escribir(archivo, lote)
+        archivo.close()
+        self._guardar_indice(cerrada=True)
+        _cerrando.discard(threading.current_thread())
+
+    def _escribir(self, archivo, lote) -> None:
+        inicio = time.perf_counter()
+        lineas = []
+        for ts, contenido in lote:
+            registro = _registro(self.registros + len(lineas) + 1, ts, contenido)
+            if registro["user_name"] and registro["user_name"] not in self.participantes:
+                self.participantes.append(registro["user_name"])
+            lineas.append(json.dumps(registro, ensure_ascii=False) + "\n")
+        datos = "".join(lineas).encode("utf-8")
+        try:
+            archivo.write(datos)
+            archivo.flush()
+            os.fsync(archivo.fileno())  # Un solo fsync por lote
+        except OSError as e:
+            self.errores += 1
+            LOGGER.error(f"Error al guardar {len(lote)} turnos de Gemi: {e}")
+            return
+        self.registros += len(lineas)
+        self.bytes += len(datos)
+        self.lotes += 1
+        self._guardar_indice(cerrada=False)
+        self.escritura_total += time.perf_counter() - inicio
+
+    def _guardar_indice(self, cerrada) -> None:
+        """Reemplaza el indice de forma atomica: o queda el anterior o el nuevo completo"""
+        indice = {
+            "sesion": self.sesion,
+            "archivo": os.path.basename(self.ruta),
+            "inicio": self.inicio.isoformat(),
+            "actualizado": datetime.datetime.now().isoformat(),
+            "registros": self.registros,
+            "bytes": self.bytes,
+            "mensajes": self.mensajes,
+            "participantes": self.participantes,
+            "cerrada": cerrada
+        }
+        temporal = self.ruta_indice + ".tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(indice, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta_indice)
+        except OSError as e:
+            self.errores += 1
+            LOGGER.error(f"No se pudo actualizar el indice de {self.sesion}: {e}")
+
+    def pendientes(self) -> int:
+        return self._cola.qsize()
+
+    def estadisticas(self):
+        """Turnos encolados/escritos, fsyncs (uno por lote) y costo de escritura"""
+        return {
+            "encolados": self.encolados,
+            "escritos": self.registros,
+            "pendientes": self.pendientes(),
+            "kb": self.bytes / 1024,
+            "lotes": self.lotes,
+            "escritura_ms_por_lote": (self.escritura_total / self.lotes * 1000) if self.lotes else 0.0,
+            "errores": self.errores
+        }
+
+def leer(ruta: str) -> List[Dict[str, Any]]:
+    """Registros de una transcripcion; ignora una ultima linea cortada por una caida"""
+    registros = []
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registros.append(json.loads(linea))
+            except json.JSONDecodeError:
+                LOGGER.warning(f"Linea incompleta ignorada en {ruta}")
+    return registros
+
+def sesiones(carpeta: Optional[str] = None) -> List[str]:
+    """Transcripciones JSONL de la carpeta, de la mas vieja a la mas nueva"""
+    carpeta = carpeta or os.getenv("GEMI_TRANSCRIPT_DIR") or CARPETA_POR_DEFECTO
+    return sorted(glob.glob(os.path.join(carpeta, "chat_*.jsonl")))
+
+def exportar(ruta: str, destino: Optional[str] = None) -> str:
+    """Genera el JSON legible de una sesion (mismo formato que el historial de antes); devuelve su ruta"""
+    registros = leer(ruta)
+    indice: Dict[str, Any] = {}
+    ruta_indice = ruta[:-len(".jsonl")] + ".idx.json"
+    if os.path.exists(ruta_indice):
+        with open(ruta_indice, "r", encoding="utf-8") as f:
+            indice = json.load(f)
+
+    participantes = indice.get("participantes") or list(dict.fromkeys(r["user_name"] for r in registros if r.get("user_name")))
+    history_data: Dict[str, Any] = {
+        "timestamp": indice.get("inicio") or (registros[0]["ts"] if registros else datetime.datetime.now().isoformat()),
+        "participants": participantes,
+        "message_count": indice.get("mensajes") or sum(1 for r in registros if r["role"] == "model"),
+        "messages": [{"role": r["role"], "user_name": r.get("user_name"), "content": r["content"]} for r in registros]
+    }
+    destino = destino or ruta[:-len(".jsonl")] + ".json"
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(history_data, f, indent=2, ensure_ascii=False)
+    return destino
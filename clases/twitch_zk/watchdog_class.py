@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Optional
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("WATCHDOG")
+LOGGER.setLevel(logging.INFO)
+
+# Raiz del proyecto, para distinguir nuestros frames de los de asyncio/qasync/librerias
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class LoopWatchdog:
+    """Vigila el bucle de eventos y detecta callbacks que lo bloquean.
+
+    Un latido dentro del bucle mide continuamente el retraso (lag) con el que
+    despierta respecto a lo programado. Un hilo aparte comprueba que el latido
+    siga llegando; si el bucle lleva mas de `umbral` segundos sin atenderlo,
+    captura la pila del hilo del bucle y la registra junto al manejador nuestro
+    que la esta bloqueando (por ejemplo un requests.get dentro de un JOIN).
+    """
+
+    def __init__(self, umbral=0.1, intervalo=0.05, muestras=4096, reporte=300):
+        """
+        Args:
+            umbral: Segundos de bloqueo a partir de los cuales se registra la pila
+            intervalo: Periodo del latido en segundos
+            muestras: Cantidad de mediciones de lag que se conservan para los percentiles
+            reporte: Cada cuantos segundos se registran los percentiles (0 para desactivar)
+        """
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.reporte = reporte
+        self.lags = deque(maxlen=muestras)
+        self.bloqueos = 0
+        self.max_lag = 0.0
+        self.running = False
+        self._ultimo_latido = 0.0
+        self._reportado = False
+        self._hilo_loop: Optional[int] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._hilo: Optional[threading.Thread] = None
+
+    def start(self):
+        """Inicia la vigilancia; debe llamarse desde el hilo del bucle de eventos"""
+        if self.running:
+            return
+        self.running = True
+        self._hilo_loop = threading.get_ident()
+        self._ultimo_latido = time.perf_counter()
+        self._tarea = asyncio.get_event_loop().create_task(self._latido())
+        self._hilo = threading.Thread(target=self._vigilar, name="loop-watchdog", daemon=True)
+        self._hilo.start()
+        metricas.registrar("loop", self.percentiles)
+        LOGGER.info(f"Watchdog del bucle activo (umbral {self.umbral * 1000:.0f} ms)")
+
+    def stop(self):
+        """Detiene la vigilancia"""
+        self.running = False
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+        metricas.eliminar("loop")
+
+    async def _latido(self):
+        """Mide cuanto tarda el bucle en despertar respecto a lo programado"""
+        ultimo_reporte = time.perf_counter()
+        while self.running:
+            inicio = time.perf_counter()
+            self._ultimo_latido = inicio
+            self._reportado = False
+            await asyncio.sleep(self.intervalo)
+            ahora = time.perf_counter()
+            lag = max(0.0, ahora - inicio - self.intervalo)
+            self.lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if self.reporte and ahora - ultimo_reporte >= self.reporte:
+                ultimo_reporte = ahora
+                p = self.percentiles()
+                LOGGER.info(f"Lag del bucle: p50={p['p50_ms']:.1f} ms p95={p['p95_ms']:.1f} ms p99={p['p99_ms']:.1f} ms max={p['max_ms']:.1f} ms bloqueos={p['bloqueos']}")
+
+    def _vigilar(self):
+        """Hilo que detecta bloqueos mientras el bucle no puede atender el latido"""
+        paso = max(self.umbral / 4, 0.005)
+        while self.running:
+            time.sleep(paso)
+            bloqueado = time.perf_counter() - self._ultimo_latido - self.intervalo
+            if bloqueado > self.umbral and not self._reportado:
+                self._reportado = True
+                self.bloqueos += 1
+                self._registrar_bloqueo(bloqueado)
+
+    def _registrar_bloqueo(self, bloqueado):
+        """Captura la pila del hilo del bucle y la registra con el manejador culpable"""
+        frame = sys._current_frames().get(self._hilo_loop) if self._hilo_loop is not None else None
+        if frame is None:
+            return
+        pila = traceback.extract_stack(frame)
+        propio = [f.filename.startswith(RAIZ_PROYECTO) and "site-packages" not in f.filename for f in pila]
+        if any(propio):
+            # El frame propio mas interno es quien bloquea; subiendo mientras sigan
+            # siendo frames propios se llega a la corrutina que ejecuta el bucle
+            fin = len(pila) - 1 - propio[::-1].index(True)
+            inicio = fin
+            while inicio > 0 and propio[inicio - 1]:
+                inicio -= 1
+            manejador = pila[fin]
+            origen = f"{manejador.name} ({os.path.relpath(manejador.filename, RAIZ_PROYECTO)}:{manejador.lineno}) en tarea {pila[inicio].name}"
+        else:
+            origen = f"{pila[-1].name} ({pila[-1].filename}:{pila[-1].lineno})"
+        LOGGER.warning(
+            f"Bucle bloqueado por mas de {bloqueado * 1000:.0f} ms en {origen}\n"
+            + "".join(traceback.format_list(pila))
+        )
+
+    def percentiles(self):
+        """Percentiles del lag del bucle en milisegundos"""
+        muestras = sorted(self.lags)
+        if not muestras:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "bloqueos": self.bloqueos, "muestras": 0}
+
+        def p(q):
+            return muestras[min(len(muestras) - 1, int(q * len(muestras)))] * 1000
+
+        return {
+            "p50_ms": p(0.50),
+            "p95_ms": p(0.95),
+            "p99_ms": p(0.99),
+            "max_ms": self.max_lag * 1000,
+            "bloqueos": self.bloqueos,
+            "muestras": len(muestras)
+        }
+
+def watchdog_desde_config(argv=None) -> Optional[LoopWatchdog]:
+    """Crea el watchdog si se activo con --watchdog o la variable LOOP_WATCHDOG=1.
+
+    El umbral se configura en milisegundos con LOOP_WATCHDOG_UMBRAL_MS (por defecto 100).
+    """
+    argv = sys.argv if argv is None else argv
+    if "--watchdog" not in argv and os.getenv("LOOP_WATCHDOG") != "1":
+        return None
+    umbral_ms = float(os.getenv("LOOP_WATCHDOG_UMBRAL_MS", "100"))
+    return LoopWatchdog(umbral=umbral_ms / 1000)
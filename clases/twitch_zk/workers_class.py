@@ -0,0 +1,109 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("IRC_WORKERS")
+LOGGER.setLevel(logging.INFO)
+
+# Tipo de cola para cada comando; lo que no figure va a "otros"
+TIPOS = {
+    "JOIN": "membresia",
+    "PART": "membresia",
+    "CLEARCHAT": "moderacion",
+    "CLEARMSG": "moderacion",
+}
+
+class HandlerWorkers:
+    """Colas acotadas por tipo de mensaje IRC, vaciadas por tareas trabajadoras.
+
+    Cada tipo tiene N colas (su concurrencia) y el mensaje va a la cola que
+    corresponde al hash de su usuario, asi los eventos de un mismo usuario se
+    procesan en orden mientras los de usuarios distintos avanzan en paralelo.
+    El bucle de lectura solo encola: si un manejador se queda esperando a
+    Helix, se llena su cola y se descartan lineas, pero el socket sigue
+    leyendo y respondiendo PING.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[..., Awaitable]], concurrencia=None, max_cola=None, nombre="irc_colas"):
+        """
+        Args:
+            handlers: Tabla comando -> manejador del cliente
+            concurrencia: Trabajadores por tipo (por defecto IRC_WORKERS o 32 para membresia, 1 el resto)
+            max_cola: Lineas maximas por cola (por defecto IRC_MAX_COLA o 1000)
+        """
+        self.handlers = handlers
+        self.concurrencia = {"membresia": int(os.getenv("IRC_WORKERS", "32")), "moderacion": 1, "otros": 1}
+        self.concurrencia.update(concurrencia or {})
+        self.max_cola = max_cola or int(os.getenv("IRC_MAX_COLA", "1000"))
+        self.colas: Dict[str, List[asyncio.Queue]] = {
+            tipo: [asyncio.Queue(self.max_cola) for _ in range(max(1, n))]
+            for tipo, n in self.concurrencia.items()
+        }
+        self._tareas: List[asyncio.Task] = []
+
+        # Estadisticas por tipo
+        self.procesadas = {tipo: 0 for tipo in self.colas}
+        self.descartadas = {tipo: 0 for tipo in self.colas}
+        self.profundidad_max = {tipo: 0 for tipo in self.colas}
+        self.errores = 0
+        metricas.registrar(nombre, self.estadisticas)
+
+    def iniciar(self):
+        """Arranca los trabajadores (una tarea por cola); no hace nada si ya corren"""
+        if self._tareas:
+            return
+        for tipo, colas in self.colas.items():
+            for cola in colas:
+                self._tareas.append(asyncio.create_task(self._trabajador(tipo, cola)))
+
+    def detener(self):
+        """Cancela los trabajadores y descarta lo pendiente"""
+        for tarea in self._tareas:
+            tarea.cancel()
+        self._tareas.clear()
+        for colas in self.colas.values():
+            for cola in colas:
+                while not cola.empty():
+                    cola.get_nowait()
+
+    def encolar(self, message) -> bool:
+        """Encola un evento sin bloquear; devuelve False si la cola estaba llena y se descarto"""
+        tipo = TIPOS.get(message.command, "otros")
+        colas = self.colas[tipo]
+        cola = colas[hash(message.user) % len(colas)] if len(colas) > 1 else colas[0]
+        try:
+            cola.put_nowait(message)
+        except asyncio.QueueFull:
+            self.descartadas[tipo] += 1
+            if self.descartadas[tipo] % 100 == 1:
+                LOGGER.warning(f"Cola '{tipo}' llena: {self.descartadas[tipo]} lineas descartadas")
+            return False
+        if cola.qsize() > self.profundidad_max[tipo]:
+            self.profundidad_max[tipo] = cola.qsize()
+        return True
+
+    async def _trabajador(self, tipo, cola: asyncio.Queue):
+        while True:
+            message = await cola.get()
+            try:
+                await self.handlers[message.command](message)
+            except Exception as e:
+                self.errores += 1
+                LOGGER.error(f"Error procesando {message.command}: {e}")
+            self.procesadas[tipo] += 1
+
+    def pendientes(self) -> int:
+        return sum(cola.qsize() for colas in self.colas.values() for cola in colas)
+
+    def estadisticas(self):
+        """Profundidad actual y maxima, procesadas y descartadas por tipo"""
+        datos = {}
+        for tipo, colas in self.colas.items():
+            datos[f"{tipo}_pendientes"] = sum(cola.qsize() for cola in colas)
+            datos[f"{tipo}_max"] = self.profundidad_max[tipo]
+            datos[f"{tipo}_procesadas"] = self.procesadas[tipo]
+            datos[f"{tipo}_descartadas"] = self.descartadas[tipo]
+        datos["errores"] = self.errores
+        return datos
@@ -0,0 +1,165 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Optional
+from clases.twitch_zk.limiter_class import SlidingWindowLimiter
+import recurso.twitch_zk.metricas as metricas
+
+LOGGER = logging.getLogger("IRC_TX")
+LOGGER.setLevel(logging.INFO)
+
+class IRCWriteQueue:
+    """Cola de escritura de salida para el socket IRC.
+
+    Una tarea de fondo vacia la cola y junta varias lineas en una sola
+    llamada a write con un solo drain. Los comandos con limite de Twitch
+    (JOIN, PRIVMSG) tienen una cola y un limite de ventana deslizante por
+    clase, y sale primero la linea mas vieja de las clases que tienen lugar:
+    un JOIN frenado no demora un PRIVMSG. El resto (PONG, PASS, NICK, CAP,
+    PART...) esta exento y va por una cola prioritaria, asi un PRIVMSG
+    limitado nunca retrasa un PONG.
+    """
+
+    def __init__(self, es_moderador=False, max_lote=64, nombre="irc_tx"):
+        """
+        Args:
+            es_moderador: Si el bot es moderador (limite de PRIVMSG de 100 en vez de 20 cada 30 s)
+            max_lote: Maximo de lineas por escritura
+            nombre: Nombre con el que se registran las metricas
+        """
+        self.limites: Dict[str, SlidingWindowLimiter] = {
+            "JOIN": SlidingWindowLimiter(20, 10),
+            "PRIVMSG": SlidingWindowLimiter(100 if es_moderador else 20, 30),
+        }
+        self.max_lote = max_lote
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._urgente = deque()
+        self._limitado: Dict[str, deque] = {}   # Una cola por clase de limite
+        self._hay_datos = asyncio.Event()
+        self._vacia = asyncio.Event()
+        self._vacia.set()
+        self._tarea: Optional[asyncio.Task] = None
+
+        # Estadisticas
+        self.lineas = 0
+        self.escrituras = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.descartadas = 0
+        metricas.registrar(nombre, self.estadisticas)
+
+    def iniciar(self, writer: asyncio.StreamWriter):
+        """Asocia el writer de la conexion actual y arranca la tarea de escritura"""
+        self.writer = writer
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.create_task(self._bucle())
+
+    def detener(self) -> int:
+        """Detiene la escritura y descarta lo pendiente; devuelve cuantas lineas se perdieron"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            self._tarea = None
+        perdidas = self.pendientes()
+        self.descartadas += perdidas
+        self._urgente.clear()
+        self._limitado.clear()
+        self._vacia.set()
+        self.writer = None
+        return perdidas
+
+    def enviar(self, line: str):
+        """Encola una linea sin bloquear"""
+        comando = line.split(" ", 1)[0].upper()
+        item = (line, comando, time.monotonic())
+        if comando in self.limites:
+            cola = self._limitado.get(comando)
+            if cola is None:
+                cola = self._limitado[comando] = deque()
+            cola.append(item)
+        else:
+            self._urgente.append(item)
+        self._vacia.clear()
+        self._hay_datos.set()
+
+    async def vaciar(self, timeout=5.0):
+        """Espera a que se escriba todo lo pendiente"""
+        try:
+            await asyncio.wait_for(self._vacia.wait(), timeout)
+        except asyncio.TimeoutError:
+            LOGGER.warning("Tiempo agotado esperando vaciar la cola de salida IRC")
+
+    def pendientes(self) -> int:
+        return len(self._urgente) + sum(len(cola) for cola in self._limitado.values())
+
+    def _siguiente_limitada(self):
+        """Saca la linea limitada mas vieja cuya clase tiene lugar; si ninguna, (None, espera minima)"""
+        espera = 0.0
+        colas = sorted((cola for cola in self._limitado.values() if cola), key=lambda cola: cola[0][2])
+        for cola in colas:
+            falta = self.limites[cola[0][1]].consumir()
+            if falta == 0:
+                return cola.popleft(), 0.0
+            espera = falta if espera == 0 else min(espera, falta)
+        return None, espera
+
+    async def _bucle(self):
+        """Tarea de fondo: junta lineas respetando los limites y escribe por lotes"""
+        try:
+            while True:
+                await self._hay_datos.wait()
+                lote = []
+                espera = 0.0
+
+                # Primero los exentos, siempre en orden de llegada
+                while self._urgente and len(lote) < self.max_lote:
+                    lote.append(self._urgente.popleft())
+
+                # Luego los limitados de las clases que tengan lugar en su ventana
+                while len(lote) < self.max_lote:
+                    item, espera = self._siguiente_limitada()
+                    if item is None:
+                        break
+                    lote.append(item)
+
+                if lote and self.writer is not None:
+                    ahora = time.monotonic()
+                    for _, _, encolado in lote:
+                        demora = ahora - encolado
+                        self.espera_total += demora
+                        if demora > self.espera_max:
+                            self.espera_max = demora
+                    self.writer.write("".join(f"{line}\r\n" for line, _, _ in lote).encode('utf-8'))
+                    await self.writer.drain()
+                    self.lineas += len(lote)
+                    self.escrituras += 1
+                    LOGGER.debug(f"Enviadas {len(lote)} lineas en una escritura")
+
+                if not self.pendientes():
+                    self._hay_datos.clear()
+                    self._vacia.set()
+                elif espera > 0 and not self._urgente:
+                    # Solo quedan lineas limitadas: dormir hasta que se libere lugar en alguna ventana
+                    # o hasta que llegue algo exento
+                    self._hay_datos.clear()
+                    try:
+                        await asyncio.wait_for(self._hay_datos.wait(), espera)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._hay_datos.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            LOGGER.error(f"Error escribiendo en el socket IRC: {e}")
+
+    def estadisticas(self):
+        """Profundidad de la cola y tiempos de espera"""
+        return {
+            "pendientes": self.pendientes(),
+            "lineas": self.lineas,
+            "escrituras": self.escrituras,
+            "lineas_por_escritura": (self.lineas / self.escrituras) if self.escrituras else 0.0,
+            "espera_media_ms": (self.espera_total / self.lineas * 1000) if self.lineas else 0.0,
+            "espera_max_ms": self.espera_max * 1000,
+            "descartadas": self.descartadas
+        }
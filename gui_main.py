@@ -6,6 +6,7 @@ import traceback
 import recurso.twitch_zk.utils as utils
 from dotenv import load_dotenv
 from clases.gui import MainWindow
+from clases.twitch_zk import watchdog_desde_config
 from PyQt5.QtWidgets import QApplication
 
 load_dotenv()
@@ -26,6 +27,11 @@ sys.excepthook = excepthook
 
 async def main():
     try:
+        # Watchdog opcional del bucle de eventos (--watchdog o LOOP_WATCHDOG=1)
+        watchdog = watchdog_desde_config()
+        if watchdog is not None:
+            watchdog.start()
+        
         # Crear la ventana principal
         window = MainWindow(userbots, user_data_twitch, file_path_user_data_twitch)
         window.show()
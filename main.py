@@ -7,8 +7,13 @@ import twitchio # v3.0.0b3
 import subprocess
 import recurso.twitch_zk.utils as utils
 from dotenv import load_dotenv
+from bd import ChatStore
 from clases.twitch_zk import Bot
 from clases.twitch_zk import TwitchIRCClient
+from clases.twitch_zk import IRCConnectionPool
+from clases.twitch_zk import FollowerIndex
+from clases.twitch_zk import ChatAnalytics
+from clases.twitch_zk import watchdog_desde_config
 from recurso.com_pross import command_processor
 from clases.twitch_zk import save_active_chat_history
 
@@ -33,40 +38,71 @@ def main() -> None:
     oauth_token = os.getenv("TTG_BOT_TOKEN")
     bot_name = os.getenv("BOT")
     broadcaster_name = os.getenv("BROADCASTER")
+    # Canales de partners a monitorear ademas del propio (separados por coma)
+    canales_extra = [canal.strip() for canal in os.getenv("IRC_CANALES", "").split(",") if canal.strip()]
+
+    # Watchdog opcional del bucle de eventos (--watchdog o LOOP_WATCHDOG=1)
+    watchdog = watchdog_desde_config()
 
     async def runner() -> None:
         # Crear un evento para señalar la terminacion del programa
         shutdown_event = asyncio.Event()
         
+        if watchdog is not None:
+            watchdog.start()
+        
+        # Indice de seguidores compartido entre EventSub e IRC
+        follower_index = FollowerIndex()
+        follower_index.cargar_ultimo_snapshot()
+        
+        # Historial del chat en SQLite (escrito por lotes en su propio hilo)
+        chat_store = ChatStore()
+        chat_store.iniciar()
+        
+        # Mensajes por minuto, chatters unicos y JOIN/PART del canal propio
+        analytics = ChatAnalytics()
+        
         async with asqlite.create_pool(db_path_twitch) as tdb:
             bot = Bot(
                 token_database=tdb,
                 userbots=userbots,
                 user_data_twitch=user_data_twitch,
                 msg_type=None,
-                message_callback=None
+                message_callback=None,
+                follower_index=follower_index,
+                chat_store=chat_store,
+                analytics=analytics
             )
             
             # Inicializar el bot y el websocket
             await bot.setup_database()
             
-            # Inicializar el cliente IRC
-            irc_client = TwitchIRCClient(
-                oauth_token,
-                bot_name,
-                broadcaster_name,
-                userbots,
-                user_data_twitch,
-                msg_type=None,
-                message_callback=None
-            )
+            # Inicializar el cliente IRC (pool de conexiones si hay canales extra)
+            if canales_extra:
+                irc_client = IRCConnectionPool(oauth_token, bot_name, userbots)
+                await irc_client.agregar_canal(broadcaster_name, user_data_twitch, follower_index, propio=True, analytics=analytics)
+                for canal in canales_extra:
+                    await irc_client.agregar_canal(canal)
+                connection_success = await irc_client.start()
+            else:
+                irc_client = TwitchIRCClient(
+                    oauth_token,
+                    bot_name,
+                    broadcaster_name,
+                    userbots,
+                    user_data_twitch,
+                    msg_type=None,
+                    message_callback=None,
+                    follower_index=follower_index,
+                    analytics=analytics
+                )
 
-            # Iniciar conexion IRC
-            connection_success = await irc_client.connect()
+                # Iniciar conexion IRC
+                connection_success = await irc_client.connect()
             
             # Crear las tareas
             tasks = []
-            tasks.append(asyncio.create_task(command_processor(shutdown_event, file_path_user_data_twitch, user_data_twitch)))
+            tasks.append(asyncio.create_task(command_processor(shutdown_event, file_path_user_data_twitch, user_data_twitch, chat_store, analytics)))
             tasks.append(asyncio.create_task(bot.start()))
             
             if connection_success:
@@ -78,6 +114,8 @@ def main() -> None:
             await shutdown_event.wait()
             
             # Cancelar todas las tareas que aún estén en ejecucion
+            if watchdog is not None:
+                watchdog.stop()
             for task in tasks:
                 task.cancel()
             # Esperar a que se completen todas las cancelaciones
@@ -85,6 +123,7 @@ def main() -> None:
                 await asyncio.gather(*tasks, return_exceptions=True)
             except asyncio.CancelledError:
                 pass
+        chat_store.detener()
     try:
         asyncio.run(runner())
     except KeyboardInterrupt:
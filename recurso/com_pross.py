@@ -3,11 +3,14 @@ import shlex
 import sys
 import os
 import threading
+from datetime import datetime
 from typing import Optional
 from dotenv import load_dotenv
 import recurso.twitch_zk.utils as utils
+import recurso.twitch_zk.metricas as metricas
 from clases.twitch_zk import save_active_chat_history
 from clases.twitch_zk import TwitchMarkerManager
+from clases.twitch_zk.transcript_class import sesiones, exportar
 
 load_dotenv()
 #* Configuracion del websocket usando "Twitch Token Generator"
@@ -133,7 +136,7 @@ def key_listener():
     pass
 
 # Funcion para procesar comandos asíncronamente
-async def command_processor(shutdown_event, file_path_user_data_twitch, user_data_twitch):
+async def command_processor(shutdown_event, file_path_user_data_twitch, user_data_twitch, chat_store=None, analytics=None):
     global key_listener_thread, key_listener_active, marker_manager_main
     
     print("\n=== Sistema de Administracion de Usuarios ===")
@@ -167,9 +170,13 @@ async def command_processor(shutdown_event, file_path_user_data_twitch, user_dat
                 print("\nComandos disponibles:")
                 print("  listar                       - Muestra todos los usuarios")
                 print("  buscar <termino>             - Busca usuarios por ID o nickname")
+                print("  chat buscar <texto>          - Busca mensajes en el historial del chat")
                 print("  info <usuario>               - Muestra informacion detallada de un usuario")
                 print("  nick <usuario> <nuevo>       - Cambia el nickname de un usuario")
                 print("  marcador [descripcion]       - Crea un marcador en el stream")
+                print("  metricas                     - Muestra las metricas de rendimiento")
+                print("  stats                        - Muestra la actividad del chat (1 min, 5 min, 1 h)")
+                print("  exportar [sesion]            - Exporta a JSON legible una charla de Gemi (por defecto la ultima)")
                 print("  guardar                      - Guarda los cambios inmediatamente")
                 print("  salir                        - Cierra el sistema de comandos")
                 print("  F6                           - Tecla rápida GLOBAL para crear marcador")
@@ -191,6 +198,30 @@ async def command_processor(shutdown_event, file_path_user_data_twitch, user_dat
                 except Exception as e:
                     print(f"Error al crear marcador: {e}")
                 
+            elif cmd == "metricas":
+                print("\n=== Metricas de rendimiento ===")
+                print(metricas.formatear())
+                
+            elif cmd == "stats":
+                if analytics is None:
+                    print("Las estadisticas del chat no estan activas.")
+                else:
+                    print("\n=== Actividad del chat ===")
+                    print(analytics.formatear())
+                
+            elif cmd == "exportar":
+                archivos = sesiones()
+                if len(args) > 1:
+                    archivos = [a for a in archivos if args[1] in os.path.basename(a)]
+                if not archivos:
+                    print("No hay charlas de Gemi guardadas." if len(args) == 1 else f"No existe la sesion '{args[1]}'.")
+                    continue
+                try:
+                    destino = await asyncio.to_thread(exportar, archivos[-1])
+                    print(f"Charla exportada en: {destino}")
+                except Exception as e:
+                    print(f"Error al exportar la charla: {e}")
+                
             elif cmd == "listar":
                 if user_data_twitch:
                     print("\n=== Lista de Usuarios ===")
@@ -201,6 +232,20 @@ async def command_processor(shutdown_event, file_path_user_data_twitch, user_dat
                 else:
                     print("No hay usuarios registrados.")
                     
+            elif cmd == "chat" and len(args) > 2 and args[1] == "buscar":
+                if chat_store is None:
+                    print("El historial del chat no esta activo.")
+                    continue
+                texto = " ".join(args[2:])
+                resultados = await asyncio.to_thread(chat_store.buscar, texto)
+                if resultados:
+                    print(f"\n=== Mensajes que contienen '{texto}' ===")
+                    for ts, canal, usuario, mensaje in reversed(resultados):
+                        print(f"  [{datetime.fromtimestamp(ts).strftime('%d-%m-%Y %H:%M')}] {usuario}: {mensaje}")
+                    print(f"\nTotal: {len(resultados)} mensajes (maximo 50, los mas recientes)")
+                else:
+                    print(f"No se encontraron mensajes que contengan '{texto}'.")
+
             elif cmd == "buscar" and len(args) > 1:
                 término = args[1].lower()
                 resultados = []
@@ -0,0 +1,43 @@
+"""Registro central de metricas de rendimiento.
+
+Cada componente registra una funcion que devuelve un diccionario con sus
+contadores; `command_processor` y la GUI consultan el resumen bajo demanda,
+asi que registrar una metrica no cuesta nada en el camino caliente.
+"""
+from typing import Callable, Dict, Any
+
+_proveedores: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def registrar(nombre: str, proveedor: Callable[[], Dict[str, Any]]) -> None:
+    """Registra (o reemplaza) un proveedor de metricas"""
+    _proveedores[nombre] = proveedor
+
+def eliminar(nombre: str) -> None:
+    """Quita un proveedor de metricas si existe"""
+    _proveedores.pop(nombre, None)
+
+def resumen() -> Dict[str, Dict[str, Any]]:
+    """Devuelve las metricas actuales de todos los proveedores"""
+    datos = {}
+    for nombre, proveedor in list(_proveedores.items()):
+        try:
+            datos[nombre] = proveedor()
+        except Exception as e:
+            datos[nombre] = {"error": str(e)}
+    return datos
+
+def _formatear_valor(valor) -> str:
+    if isinstance(valor, float):
+        return f"{valor:.2f}"
+    return str(valor)
+
+def formatear() -> str:
+    """Resumen de metricas en texto plano para la consola"""
+    datos = resumen()
+    if not datos:
+        return "No hay metricas registradas."
+    lineas = []
+    for nombre, valores in datos.items():
+        detalle = ", ".join(f"{clave}={_formatear_valor(valor)}" for clave, valor in valores.items())
+        lineas.append(f"  {nombre}: {detalle}")
+    return "\n".join(lineas)
@@ -0,0 +1,58 @@
+"""Benchmark de ChatStore: costo por mensaje en el camino caliente y busqueda FTS5.
+
+Simula un stream de N mensajes en una base temporal y mide:
+  - agregar:  tiempo por llamada visto desde el bucle de eventos (solo encola)
+  - escritura: lotes, tamaño medio y tiempo por lote del hilo escritor
+  - busqueda: latencia de buscar() sobre el historial completo
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.bench_chat_store [--mensajes 50000]
+"""
+import os
+import sys
+import time
+import random
+import string
+import tempfile
+from bd.db_chat import ChatStore
+
+FRASES = ["hola a todos", "GG", "alguien sabe cuando es el torneo", "que build usas", "jajaja",
+          "saludos desde Chile", "ese clip estuvo buenisimo", "cuando sale el video", "F en el chat"]
+
+def main(total):
+    rnd = random.Random(7)
+    usuarios = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 12))) for _ in range(500)]
+    mensajes = [(rnd.choice(usuarios), f"{rnd.choice(FRASES)} {rnd.randint(0, 999)}") for _ in range(total)]
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        store = ChatStore(os.path.join(carpeta, "chat.db"))
+        store.iniciar()
+
+        inicio = time.perf_counter()
+        peor = 0.0
+        for usuario, texto in mensajes:
+            antes = time.perf_counter()
+            store.agregar(usuario, texto, "kleisarc", user_id=1)
+            peor = max(peor, time.perf_counter() - antes)
+        encolado = time.perf_counter() - inicio
+        store.detener(timeout=60)
+        total_escritura = time.perf_counter() - inicio
+
+        stats = store.estadisticas()
+        print(f"Mensajes: {total}  agregar: {encolado / total * 1e6:.2f} us/msg (peor {peor * 1e6:.0f} us)")
+        print(f"Escritos: {stats['escritos']} en {stats['lotes']} lotes (medio {stats['lote_medio']:.0f}), "
+              f"{stats['escritura_ms_por_lote']:.2f} ms/lote, todo en disco en {total_escritura * 1000:.0f} ms")
+
+        for termino in ("torneo", "clip buenisimo", "chil", "inexistente"):
+            antes = time.perf_counter()
+            resultados = store.buscar(termino, limite=50)
+            print(f"  buscar '{termino}': {len(resultados)} resultados en {(time.perf_counter() - antes) * 1000:.2f} ms")
+
+        ok = stats["escritos"] == total and encolado / total < 0.001
+        print("OK" if ok else "FALLO")
+        return ok
+
+if __name__ == "__main__":
+    def _arg(nombre, defecto):
+        return type(defecto)(sys.argv[sys.argv.index(nombre) + 1]) if nombre in sys.argv else defecto
+    sys.exit(0 if main(_arg("--mensajes", 50000)) else 1)
@@ -0,0 +1,109 @@
+"""Benchmark de FloodDetector con oleadas de spam sinteticas.
+
+Genera un chat normal (frases variadas y reacciones cortas repetidas como
+'GG' o 'F', de cientos de usuarios) y le mezcla
+oleadas de bots: el mismo mensaje desde decenas de cuentas, exacto o con
+ruido (sufijos aleatorios, mayusculas, letras repetidas, emotes). Mide:
+  - costo por mensaje (us) y mensajes por segundo
+  - cuantos mensajes de cada oleada pasan antes de la alerta
+  - alertas falsas sobre el chat normal
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.bench_flood [--mensajes 50000] [--oleadas 20]
+"""
+import sys
+import time
+import random
+import string
+from clases.twitch_zk.flood_class import FloodDetector
+
+SPAM = [
+    "Compra seguidores reales y baratos en cheapviewers punto com",
+    "Best viewers on streamboo dot com",
+    "Quieres ser famoso? visita famoso123 punto net y gana followers",
+    "Hey nice stream! I can help you grow, add me on discord",
+]
+PALABRAS = ("hola chat que build usas alguien sabe cuando es el torneo jajaja malo saludos desde chile ese clip "
+            "estuvo buenisimo sale video vamos se puede juego este buenas noches no puede ser mira boss otra vez "
+            "casi lo logras tranqui pero mejor usa espada escudo arco magia subelo nivel jefe mapa ayer hoy").split()
+REACCIONES = ["GG", "LUL", "F", "jajaja", "Kappa", "xd", "PogChamp", "gg wp", "FFFFF"]
+
+def con_ruido(rnd, texto):
+    """Variante casi igual: sufijo aleatorio, mayusculas, letras repetidas o emote"""
+    r = rnd.random()
+    if r < 0.25:
+        return f"{texto} {''.join(rnd.choices(string.ascii_lowercase + string.digits, k=4))}"
+    if r < 0.5:
+        return texto.upper()
+    if r < 0.75:
+        return texto.replace("e", "eee", 1) + "!!!"
+    return f"{texto} {rnd.choice(['Kappa', 'PogChamp', 'LUL', ':)'])}"
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+def main(total, oleadas):
+    rnd = random.Random(5)
+    usuarios = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 12))) for _ in range(800)]
+    mensajes = []  # (segundos, usuario, texto, oleada o None)
+    inicio_oleadas = sorted(rnd.sample(range(total), oleadas))
+    for i in range(total):
+        # Chat normal: ~30 mensajes por segundo, frases variadas y reacciones cortas muy repetidas
+        if rnd.random() < 0.3:
+            texto = rnd.choice(REACCIONES)
+        else:
+            texto = " ".join(rnd.choices(PALABRAS, k=rnd.randint(3, 12)))
+        mensajes.append((i / 30, rnd.choice(usuarios), texto, None))
+    for n, posicion in enumerate(inicio_oleadas):
+        spam = SPAM[n % len(SPAM)]
+        exacta = n % 2 == 0
+        base = posicion / 30
+        for j in range(rnd.randint(20, 60)):
+            texto = spam if exacta else con_ruido(rnd, spam)
+            mensajes.append((base + j * 0.2, f"bot_{n}_{j}", texto, n))
+    mensajes.sort(key=lambda m: m[0])
+
+    reloj = Reloj()
+    detector = FloodDetector(reloj=reloj)
+    detectadas = {}
+    falsas = 0
+    vistos = {}
+
+    inicio = time.perf_counter()
+    for ahora, usuario, texto, oleada in mensajes:
+        reloj.ahora = ahora
+        if oleada is not None:
+            vistos[oleada] = vistos.get(oleada, 0) + 1
+        for alerta in detector.analizar(usuario, texto):
+            if alerta.tipo == "oleada" and oleada is not None and oleada not in detectadas:
+                detectadas[oleada] = vistos[oleada]
+            elif oleada is None:
+                falsas += 1
+                print(f"  Alerta sobre chat normal: {alerta}")
+    duracion = time.perf_counter() - inicio
+
+    stats = detector.estadisticas()
+    print(f"Mensajes: {len(mensajes)} ({oleadas} oleadas de spam)  {len(mensajes) / duracion:.0f} msg/s  "
+          f"{duracion / len(mensajes) * 1e6:.1f} us/msg")
+    print(f"Ruta rapida (hash exacto): {stats['exactos']}  Casi duplicados por SimHash: {stats['similares']}  "
+          f"Grupos en memoria: {stats['grupos']}")
+    exactas = [v for k, v in detectadas.items() if k % 2 == 0]
+    ruidosas = [v for k, v in detectadas.items() if k % 2 == 1]
+    print(f"Oleadas detectadas: {len(detectadas)}/{oleadas}  (exactas {len(exactas)}, con ruido {len(ruidosas)})")
+    if detectadas:
+        print(f"Mensajes de la oleada antes de la alerta: media {sum(detectadas.values()) / len(detectadas):.1f}, "
+              f"max {max(detectadas.values())}")
+    print(f"Alertas falsas sobre el chat normal: {falsas}")
+
+    ok = len(detectadas) == oleadas and falsas == 0
+    print("OK" if ok else "FALLO")
+    return ok
+
+if __name__ == "__main__":
+    def _arg(nombre, defecto):
+        return type(defecto)(sys.argv[sys.argv.index(nombre) + 1]) if nombre in sys.argv else defecto
+    sys.exit(0 if main(_arg("--mensajes", 50000), _arg("--oleadas", 20)) else 1)
@@ -0,0 +1,89 @@
+"""Micro-benchmark del separador de lineas IRC.
+
+Alimenta una captura de una tormenta de JOIN (raid) al IRCLineFramer en bloques
+del tamaño de lectura del socket y la compara con el metodo anterior basado en
+str.split. Sin argumentos genera una captura sintetica; tambien acepta un
+archivo con bytes crudos capturados del socket.
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.bench_framer [captura.bin] [--usuarios N]
+"""
+import sys
+import time
+import random
+import string
+from clases.twitch_zk.framer_class import IRCLineFramer
+
+CANAL = "kleisarc"
+TAM_LECTURA = 4096
+
+def generar_captura(usuarios=2000, semilla=7):
+    """Genera una rafaga de JOIN como la que envia Twitch durante un raid"""
+    rnd = random.Random(semilla)
+    lineas = []
+    for i in range(usuarios):
+        nombre = "".join(rnd.choices(string.ascii_lowercase + string.digits, k=rnd.randint(4, 20)))
+        lineas.append(f":{nombre}!{nombre}@{nombre}.tmi.twitch.tv JOIN #{CANAL}")
+        # Algunos mensajes con texto multibyte para forzar cortes a mitad de caracter
+        if i % 50 == 0:
+            lineas.append(f"@badge-info=;color=#FF0000;display-name={nombre} :{nombre}!{nombre}@{nombre}.tmi.twitch.tv PRIVMSG #{CANAL} :¡hola desde el raid! ñandú 🎉")
+    return ("\r\n".join(lineas) + "\r\n").encode("utf-8")
+
+def trocear(captura, tam=TAM_LECTURA):
+    return [captura[i:i + tam] for i in range(0, len(captura), tam)]
+
+def metodo_anterior(bloques):
+    """Replica del _read_line original (decode por bloque + split repetido)"""
+    buffer = ""
+    total = []
+    for data in bloques:
+        buffer += data.decode('utf-8', errors='ignore')
+        while '\r\n' in buffer:
+            line, buffer = buffer.split('\r\n', 1)
+            if line.strip():
+                total.append(line.strip())
+    return total
+
+def metodo_framer(bloques):
+    framer = IRCLineFramer()
+    total = []
+    for data in bloques:
+        total.extend(framer.feed(data))
+    return total
+
+def medir(nombre, funcion, bloques, repeticiones=5):
+    mejor = float("inf")
+    lineas = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        lineas = funcion(bloques)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    print(f"{nombre:<12} {len(lineas):>8} lineas  {mejor * 1000:>9.2f} ms  {len(lineas) / mejor:>12,.0f} lineas/s")
+    return lineas
+
+def main():
+    args = sys.argv[1:]
+    usuarios = 2000
+    if "--usuarios" in args:
+        idx = args.index("--usuarios")
+        usuarios = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    if args:
+        with open(args[0], "rb") as f:
+            captura = f.read()
+        print(f"Captura: {args[0]} ({len(captura)} bytes)")
+    else:
+        captura = generar_captura(usuarios)
+        print(f"Captura sintetica: {usuarios} JOIN ({len(captura)} bytes)")
+
+    for tam in (TAM_LECTURA, 65536, len(captura)):
+        bloques = trocear(captura, tam)
+        print(f"\n--- Bloques de {tam} bytes ({len(bloques)} lecturas) ---")
+        anterior = medir("anterior", metodo_anterior, bloques)
+        nuevo = medir("framer", metodo_framer, bloques)
+        corruptas = sum(1 for a, b in zip(anterior, nuevo) if a != b)
+        print(f"Lineas distintas entre metodos: {corruptas} (el metodo anterior pierde bytes UTF-8 partidos)")
+
+if __name__ == "__main__":
+    main()
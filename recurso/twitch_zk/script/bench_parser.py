@@ -0,0 +1,135 @@
+"""Benchmark del parser IRCv3 contra la clasificacion por subcadenas anterior.
+
+Genera una mezcla de lineas tipica de un stream (PRIVMSG con tags, JOIN, PART,
+CLEARCHAT, CLEARMSG y PING) y mide lineas por segundo de:
+  - anterior: cadena de `in` + _parse_tags + split repetidos (codigo original)
+  - parser:   parse_message filtrado por la tabla de despacho, leyendo tags
+              solo en los manejadores que los usan
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.bench_parser [--lineas N]
+"""
+import sys
+import time
+import random
+import string
+from clases.twitch_zk.parser_class import parse_message
+
+CANAL = "kleisarc"
+
+def generar_lineas(total=50000, semilla=11):
+    rnd = random.Random(semilla)
+    lineas = []
+    for _ in range(total):
+        nombre = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 15)))
+        prefijo = f":{nombre}!{nombre}@{nombre}.tmi.twitch.tv"
+        r = rnd.random()
+        if r < 0.55:
+            texto = rnd.choice(["hola a todos", "GG", "alguien sabe cuando es el JOIN del torneo?", "PART 2 cuando?", "jajaja"])
+            lineas.append(f"@badge-info=subscriber/8;badges=subscriber/6;color=#1E90FF;display-name={nombre};emotes=;first-msg=0;id=b34ccfc7-4977-403a-8a94-33c6bac34fb8;mod=0;room-id=1337;subscriber=1;tmi-sent-ts=1507246572675;turbo=0;user-id=1337;user-type= {prefijo} PRIVMSG #{CANAL} :{texto}")
+        elif r < 0.80:
+            lineas.append(f"{prefijo} JOIN #{CANAL}")
+        elif r < 0.95:
+            lineas.append(f"{prefijo} PART #{CANAL}")
+        elif r < 0.97:
+            lineas.append(f"@ban-duration=600;ban-reason=spam\\sde\\slinks;room-id=1337;target-user-id=42;tmi-sent-ts=1 :tmi.twitch.tv CLEARCHAT #{CANAL} :{nombre}")
+        elif r < 0.99:
+            lineas.append(f"@login={nombre};room-id=;target-msg-id=abc;tmi-sent-ts=1 :tmi.twitch.tv CLEARMSG #{CANAL} :mensaje borrado")
+        else:
+            lineas.append("PING :tmi.twitch.tv")
+    return lineas
+
+def _parse_tags_anterior(message):
+    tags_dict = {}
+    if message.startswith("@"):
+        tags_part, _ = message.split(" ", 1)
+        for tag in tags_part[1:].split(";"):
+            if "=" in tag:
+                key, value = tag.split("=", 1)
+                tags_dict[key] = value if value else None
+    return tags_dict
+
+def metodo_anterior(lineas):
+    """Clasificacion original de TwitchIRCClient._process_message (sin E/S)"""
+    cuenta = {"PING": 0, "CLEARCHAT": 0, "CLEARMSG": 0, "JOIN": 0, "PART": 0}
+    canal = f"#{CANAL}"
+    for message in lineas:
+        if message.startswith("PING"):
+            message.split(":", 1)
+            cuenta["PING"] += 1
+        elif "CLEARCHAT" in message:
+            if canal in message:
+                tags = _parse_tags_anterior(message)
+                message.split(f"{canal} :")[1].strip()
+                (tags.get("ban-reason") or "").replace("\\s", " ")
+                cuenta["CLEARCHAT"] += 1
+        elif "CLEARMSG" in message:
+            if canal in message:
+                _parse_tags_anterior(message).get("login", "desconocido")
+                cuenta["CLEARMSG"] += 1
+        elif " JOIN " in message:
+            if "!" in message and canal in message:
+                message.split("!")[0][1:]
+                cuenta["JOIN"] += 1
+        elif " PART " in message:
+            if "!" in message and canal in message:
+                message.split("!")[0][1:]
+                cuenta["PART"] += 1
+    return cuenta
+
+def metodo_parser(lineas):
+    """parse_message + tabla de despacho"""
+    cuenta = {"PING": 0, "CLEARCHAT": 0, "CLEARMSG": 0, "JOIN": 0, "PART": 0}
+
+    def ping(m):
+        cuenta["PING"] += 1
+
+    def clearchat(m):
+        if m.channel == CANAL:
+            m.trailing.strip()
+            m.tags.get("ban-reason", "")
+            cuenta["CLEARCHAT"] += 1
+
+    def clearmsg(m):
+        if m.channel == CANAL:
+            m.tags.get("login")
+            cuenta["CLEARMSG"] += 1
+
+    def join(m):
+        if m.channel == CANAL and m.nick:
+            cuenta["JOIN"] += 1
+
+    def part(m):
+        if m.channel == CANAL and m.nick:
+            cuenta["PART"] += 1
+
+    handlers = {"PING": ping, "CLEARCHAT": clearchat, "CLEARMSG": clearmsg, "JOIN": join, "PART": part}
+    for line in lineas:
+        m = parse_message(line, handlers)
+        if m is not None:
+            handlers[m.command](m)
+    return cuenta
+
+def medir(nombre, funcion, lineas, repeticiones=5):
+    mejor = float("inf")
+    cuenta = {}
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuenta = funcion(lineas)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    print(f"{nombre:<10} {mejor * 1000:>9.2f} ms  {len(lineas) / mejor:>12,.0f} lineas/s  {cuenta}")
+    return cuenta
+
+def main():
+    total = 50000
+    if "--lineas" in sys.argv:
+        total = int(sys.argv[sys.argv.index("--lineas") + 1])
+    lineas = generar_lineas(total)
+    print(f"{total} lineas de prueba\n")
+    anterior = medir("anterior", metodo_anterior, lineas)
+    nuevo = medir("parser", metodo_parser, lineas)
+    if anterior["JOIN"] != nuevo["JOIN"] or anterior["PART"] != nuevo["PART"]:
+        print("\nNota: el metodo anterior clasifica como JOIN/PART lineas PRIVMSG que contienen esas palabras en el texto.")
+
+if __name__ == "__main__":
+    main()
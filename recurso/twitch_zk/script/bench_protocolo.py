@@ -0,0 +1,71 @@
+"""Micro-benchmark del nucleo de protocolo TwitchChatProtocol, sin sockets.
+
+Pasa la misma captura (rafaga de JOIN con PRIVMSG intercalados) por las dos
+entradas del protocolo: bytes en bloques del tamaño de lectura del socket
+(TwitchIRCClient) y frames de texto (WebSocketClient). Usa el mismo filtro de
+comandos que los clientes, asi mide lo que cuesta pasar de datos crudos a
+eventos listos para despachar.
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.bench_protocolo [captura.bin] [--usuarios N]
+"""
+import sys
+import time
+from clases.twitch_zk.protocol_class import TwitchChatProtocol
+from recurso.twitch_zk.script.bench_framer import generar_captura, trocear, TAM_LECTURA
+
+# Mismos comandos que la tabla de manejadores de los clientes
+COMANDOS = {"PING", "CLEARCHAT", "CLEARMSG", "JOIN", "PART", "RECONNECT"}
+
+def por_bytes(bloques):
+    protocolo = TwitchChatProtocol(COMANDOS)
+    eventos = []
+    for data in bloques:
+        eventos.extend(protocolo.recibir_bytes(data))
+    return protocolo.lineas, eventos
+
+def por_texto(frames):
+    protocolo = TwitchChatProtocol(COMANDOS)
+    eventos = []
+    for frame in frames:
+        eventos.extend(protocolo.recibir_texto(frame))
+    return protocolo.lineas, eventos
+
+def medir(nombre, funcion, entrada, repeticiones=5):
+    mejor = float("inf")
+    lineas, eventos = 0, []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        lineas, eventos = funcion(entrada)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    print(f"{nombre:<22} {lineas:>8} lineas {len(eventos):>8} eventos  {mejor * 1000:>9.2f} ms  {lineas / mejor:>12,.0f} lineas/s")
+    return eventos
+
+def main():
+    args = sys.argv[1:]
+    usuarios = 20000
+    if "--usuarios" in args:
+        idx = args.index("--usuarios")
+        usuarios = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    if args:
+        with open(args[0], "rb") as f:
+            captura = f.read()
+        print(f"Captura: {args[0]} ({len(captura)} bytes)")
+    else:
+        captura = generar_captura(usuarios)
+        print(f"Captura sintetica: {usuarios} JOIN ({len(captura)} bytes)")
+
+    bloques = trocear(captura, TAM_LECTURA)
+    # Frames de WebSocket: Twitch agrupa varias lineas completas por frame
+    lineas = captura.decode("utf-8").split("\r\n")
+    frames = ["\r\n".join(lineas[i:i + 20]) + "\r\n" for i in range(0, len(lineas), 20)]
+
+    tcp = medir(f"bytes ({TAM_LECTURA} B)", por_bytes, bloques)
+    ws = medir(f"texto ({len(frames)} frames)", por_texto, frames)
+    iguales = [(type(a), a.channel, a.user) for a in tcp] == [(type(b), b.channel, b.user) for b in ws]
+    print(f"Eventos identicos por ambos transportes: {'si' if iguales else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Generador de carga para TwitchIRCClient y WebSocketClient.
+
+Levanta FakeIRCServer (TCP o TLS y WebSocket), conecta los clientes elegidos
+y ejecuta un escenario:
+
+    join   tormenta de JOIN de N usuarios (raid) y luego PART de todos
+    chat   inundacion de PRIVMSG a una tasa objetivo durante D segundos
+    mixto  chat + JOIN/CLEARCHAT/CLEARMSG intercalados
+
+Con --cortes K se fuerzan K desconexiones repartidas durante el escenario.
+Para cada cliente informa throughput y latencia por linea: en PRIVMSG se
+mide desde el tag tmi-sent-ts hasta que el manejador del cliente la procesa;
+en JOIN, desde el envio hasta que el usuario queda en joined_users. Tambien
+informa el RTT de PING/PONG medido por el servidor.
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.carga_irc [--clientes irc,ws] [--tls] [--escenario chat]
+        [--usuarios 2000] [--mps 1000] [--duracion 10] [--cortes 0]
+"""
+import sys
+import time
+import asyncio
+import logging
+from clases.twitch_zk.irc_class import TwitchIRCClient
+from clases.twitch_zk.wss_class import WebSocketClient
+from clases.twitch_zk.follower_class import FollowerIndex
+from recurso.twitch_zk.script.fake_irc import FakeIRCServer, esperar, crear_contexto_tls
+
+CANAL = "kleisarc"
+BOT = "bot_carga"
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+class Medidor:
+    """Cuenta lineas procesadas por un cliente y su latencia"""
+
+    def __init__(self, nombre, cliente):
+        self.nombre = nombre
+        self.cliente = cliente
+        self.latencias = []
+        self.primera = None
+        self.ultima = None
+        # PRIVMSG no tiene manejador en los clientes: se agrega uno que mide
+        cliente._handlers["PRIVMSG"] = self.on_privmsg
+
+    async def on_privmsg(self, message):
+        ahora = time.time() * 1000
+        self.latencias.append(ahora - int(message.tags.get("tmi-sent-ts", ahora)))
+        if self.primera is None:
+            self.primera = time.perf_counter()
+        self.ultima = time.perf_counter()
+
+    def reporte(self, enviadas):
+        recibidas = len(self.latencias)
+        duracion = (self.ultima - self.primera) if recibidas > 1 else 0.0
+        ordenadas = sorted(self.latencias)
+        return (f"  {self.nombre:<4} recibidas {recibidas}/{enviadas}  "
+                f"{(recibidas / duracion) if duracion else 0:.0f} msg/s  "
+                f"latencia p50 {_percentil(ordenadas, 0.5):.1f} ms  p95 {_percentil(ordenadas, 0.95):.1f} ms  "
+                f"p99 {_percentil(ordenadas, 0.99):.1f} ms  max {ordenadas[-1] if ordenadas else 0:.1f} ms")
+
+def crear_cliente(tipo, servidor, user_data, indice):
+    clase = TwitchIRCClient if tipo == "irc" else WebSocketClient
+    cliente = clase("x", BOT, CANAL, [BOT], user_data, None, follower_index=indice)
+    cliente.LOGGER.setLevel(logging.WARNING)  # Sin una linea de consola por cada JOIN
+    if tipo == "irc":
+        cliente.host, cliente.port = "127.0.0.1", servidor.puerto
+        cliente.use_ssl = servidor.ssl_context is not None
+        cliente.backoff_base, cliente.backoff_max = 0.05, 0.5
+    else:
+        cliente.uri = f"ws://127.0.0.1:{servidor.puerto_ws}"
+    return cliente
+
+async def cortes_programados(servidor, cortes, duracion):
+    """Corta todas las conexiones K veces repartidas en la duracion"""
+    for _ in range(cortes):
+        await asyncio.sleep(duracion / (cortes + 1))
+        servidor.soltar()
+
+async def inundar(servidor, mps, duracion, usuarios, mixto=False):
+    """Envia PRIVMSG a `mps` mensajes por segundo; devuelve cuantos se enviaron"""
+    inicio = time.perf_counter()
+    enviados = 0
+    while (transcurrido := time.perf_counter() - inicio) < duracion:
+        objetivo = int(transcurrido * mps)
+        while enviados < objetivo:
+            user = f"viewer_{enviados % usuarios}"
+            msg_id = servidor.privmsg(user, f"mensaje {enviados} de carga", user_id=enviados % usuarios)
+            if mixto and enviados % 100 == 0:
+                servidor.join(f"viewer_{enviados % usuarios}")
+                servidor.clearmsg(user, "borrado", msg_id=msg_id)
+            if mixto and enviados % 1000 == 0:
+                servidor.clearchat(user, 10)
+            enviados += 1
+        await asyncio.sleep(0.005)
+    return enviados
+
+async def tormenta_join(servidor, clientes, usuarios):
+    """JOIN de todos los usuarios de golpe y luego PART; mide hasta que cada cliente los registra"""
+    for fase, enviar, completo in (
+        ("JOIN", servidor.join, lambda c: len(c.joined_users) >= usuarios),
+        ("PART", servidor.part, lambda c: not c.joined_users),
+    ):
+        inicio = time.perf_counter()
+        for i in range(usuarios):
+            enviar(f"viewer_{i}")
+        for nombre, cliente in clientes.items():
+            listo = await esperar(lambda: completo(cliente), timeout=60)
+            duracion = time.perf_counter() - inicio
+            print(f"  {nombre:<4} {fase} de {usuarios} usuarios en {duracion * 1000:.0f} ms "
+                  f"({usuarios / duracion:.0f}/s){'' if listo else '  INCOMPLETO'}")
+
+async def main(tipos, tls, escenario, usuarios, mps, duracion, cortes):
+    servidor = FakeIRCServer(canal=CANAL, ssl_context=crear_contexto_tls() if tls else None)
+    await servidor.iniciar()
+    await servidor.iniciar_ws()
+
+    # Usuarios conocidos, ya confirmados sin follow en el indice: sin consultas a Helix
+    user_data = {f"viewer_{i}": {"id": str(i + 1), "follow_date": "Visita", "color": "", "nickname": ""} for i in range(usuarios)}
+    indice = FollowerIndex()
+    indice.cargado = True
+    for i in range(usuarios):
+        indice.sin_follow(i + 1)
+
+    clientes = {tipo: crear_cliente(tipo, servidor, {k: dict(v) for k, v in user_data.items()}, indice) for tipo in tipos}
+    tareas = []
+    for cliente in clientes.values():
+        if not await cliente.connect():
+            print("FALLO: no se pudo conectar")
+            return False
+        tareas.append(asyncio.create_task(cliente.listen()))
+    await esperar(lambda: servidor.miembros() == len(clientes))
+    print(f"Servidor en 127.0.0.1:{servidor.puerto} ({'TLS' if tls else 'TCP'}) y ws:{servidor.puerto_ws}; "
+          f"clientes: {', '.join(clientes)}; escenario: {escenario}")
+
+    servidor.ping()
+    medidores = {nombre: Medidor(nombre, cliente) for nombre, cliente in clientes.items()}
+    corte = asyncio.create_task(cortes_programados(servidor, cortes, duracion))
+
+    if escenario == "join":
+        await tormenta_join(servidor, clientes, usuarios)
+        enviadas = 0
+    else:
+        enviadas = await inundar(servidor, mps, duracion, usuarios, mixto=escenario == "mixto")
+        # Esperar a que los clientes terminen de procesar lo que quedo en vuelo
+        previo = -1
+        while previo != sum(len(m.latencias) for m in medidores.values()):
+            previo = sum(len(m.latencias) for m in medidores.values())
+            await asyncio.sleep(0.5)
+        print(f"Enviados {enviadas} PRIVMSG en {duracion:.0f} s (objetivo {mps}/s)")
+    await corte
+
+    for medidor in medidores.values():
+        if enviadas:
+            print(medidor.reporte(enviadas))
+    for sesion in servidor.clientes:
+        if sesion.rtt_pong:
+            print(f"  RTT PING/PONG ({sesion.tipo}): {sesion.rtt_pong[0] * 1000:.2f} ms")
+    if cortes:
+        print(f"Cortes forzados: {cortes}  Sesiones totales: {servidor.sesiones}  "
+              f"Clientes conectados al final: {len(servidor.clientes)}")
+
+    for cliente in clientes.values():
+        await cliente.disconnect()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    await servidor.detener()
+    return True
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    def _arg(nombre, defecto):
+        return type(defecto)(sys.argv[sys.argv.index(nombre) + 1]) if nombre in sys.argv else defecto
+    tipos = [t for t in _arg("--clientes", "irc,ws").split(",") if t in ("irc", "ws")]
+    sys.exit(0 if asyncio.run(main(
+        tipos,
+        "--tls" in sys.argv,
+        _arg("--escenario", "chat"),
+        _arg("--usuarios", 2000),
+        _arg("--mps", 1000),
+        _arg("--duracion", 10.0),
+        _arg("--cortes", 0)
+    )) else 1)
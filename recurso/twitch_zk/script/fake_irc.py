@@ -0,0 +1,375 @@
+"""Servidor IRC de imitacion de Twitch para pruebas y benchmarks locales.
+
+Habla el dialecto de Twitch que usan TwitchIRCClient y WebSocketClient:
+CAP ACK, bienvenida 001, JOIN/PART, PING/PONG, CLEARCHAT, CLEARMSG y PRIVMSG
+con tags (incluye tmi-sent-ts para medir latencia). Atiende por TCP (con TLS
+opcional) y por WebSocket, y se puede controlar para cortar conexiones,
+enviar RECONNECT o rechazar las proximas conexiones. Se usa como libreria
+desde las pruebas (tests/) y los scripts de carga, o de forma interactiva
+escribiendo por stdin:
+
+    drop                  corta todas las conexiones de golpe
+    reconnect             envia ":tmi.twitch.tv RECONNECT" a todos
+    rechazar N            cierra al instante las proximas N conexiones
+    authfail N            responde al login de las proximas N conexiones con un NOTICE de fallo
+    join USUARIO          JOIN de USUARIO al canal
+    part USUARIO          PART de USUARIO al canal
+    msg USUARIO TEXTO     PRIVMSG con tags de USUARIO al canal
+    ban USUARIO [SEG]     CLEARCHAT de USUARIO (timeout si se indican segundos)
+    clear                 CLEARCHAT del canal completo
+    borrar USUARIO TEXTO  CLEARMSG de un mensaje de USUARIO
+    ping                  PING del servidor
+    cualquier otra        se difunde como linea cruda
+
+Uso (desde la raiz del proyecto):
+    python -m recurso.twitch_zk.script.fake_irc [--puerto 6667] [--puerto-ws 8080] [--tls] [--cert C --key K] [--canal kleisarc]
+"""
+import os
+import sys
+import ssl
+import time
+import asyncio
+import tempfile
+import itertools
+import subprocess
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Optional, Set
+from clases.twitch_zk.framer_class import IRCLineFramer
+
+async def esperar(condicion, timeout=10.0) -> bool:
+    """Espera hasta que condicion() sea verdadera; False si se agota el tiempo"""
+    limite = asyncio.get_running_loop().time() + timeout
+    while not condicion():
+        if asyncio.get_running_loop().time() > limite:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+def crear_contexto_tls(cert=None, key=None) -> ssl.SSLContext:
+    """Contexto TLS de servidor; sin cert/key genera uno autofirmado con openssl"""
+    if cert is None or key is None:
+        carpeta = tempfile.mkdtemp(prefix="fake_irc_")
+        cert = os.path.join(carpeta, "cert.pem")
+        key = os.path.join(carpeta, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+            check=True, capture_output=True
+        )
+    contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    contexto.load_cert_chain(cert, key)
+    return contexto
+
+class _Sesion(ABC):
+    """Conexion de un cliente, sea TCP/TLS o WebSocket"""
+
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.nick = "justinfan"
+        self.canales: Set[str] = set()
+        self.pings = deque()            # Momento de cada PING enviado sin PONG
+        self.rtt_pong: List[float] = []  # Segundos entre PING y PONG
+
+    @abstractmethod
+    def enviar(self, line):
+        """Escribe una linea al cliente"""
+
+    @abstractmethod
+    def abortar(self):
+        """Corta la conexion de golpe"""
+
+class _SesionTCP(_Sesion):
+    def __init__(self, writer, tipo="tcp"):
+        super().__init__(tipo)
+        self.writer = writer
+
+    def enviar(self, line):
+        if not self.writer.is_closing():
+            self.writer.write(f"{line}\r\n".encode("utf-8"))
+
+    def abortar(self):
+        self.writer.transport.abort()
+
+class _SesionWS(_Sesion):
+    """Las lineas pendientes se envian juntas en un frame, como hace Twitch"""
+
+    def __init__(self, websocket):
+        super().__init__("ws")
+        self.websocket = websocket
+        self._pendientes: List[str] = []
+        self._hay_datos = asyncio.Event()
+        self._tarea = asyncio.create_task(self._emisor())
+
+    def enviar(self, line):
+        self._pendientes.append(line)
+        self._hay_datos.set()
+
+    async def _emisor(self):
+        try:
+            while True:
+                await self._hay_datos.wait()
+                self._hay_datos.clear()
+                lineas, self._pendientes = self._pendientes, []
+                await self.websocket.send("\r\n".join(lineas) + "\r\n")
+        except Exception:
+            pass
+
+    def abortar(self):
+        self._tarea.cancel()
+        self.websocket.transport.abort()
+
+class FakeIRCServer:
+    """Servidor IRC minimo de Twitch en localhost"""
+
+    def __init__(self, host="127.0.0.1", puerto=0, canal="kleisarc", ssl_context: Optional[ssl.SSLContext] = None):
+        self.host = host
+        self.puerto = puerto
+        self.puerto_ws: Optional[int] = None
+        self.canal = canal
+        self.ssl_context = ssl_context
+        self.server = None
+        self.server_ws = None
+        self.clientes: List[_Sesion] = []
+        self.recibidas: List[str] = []
+        self.sesiones = 0       # Conexiones aceptadas y atendidas
+        self.rechazadas = 0
+        self._rechazar = 0
+        self._fallar_auth = 0
+        self.auth_fallidas = 0
+        self._ids = itertools.count(1)
+
+    async def iniciar(self) -> int:
+        """Arranca el servidor TCP (TLS si hay ssl_context) y devuelve el puerto real"""
+        self.server = await asyncio.start_server(self._atender_tcp, self.host, self.puerto, ssl=self.ssl_context)
+        self.puerto = self.server.sockets[0].getsockname()[1]
+        return self.puerto
+
+    async def iniciar_ws(self, puerto=0) -> int:
+        """Arranca el servidor WebSocket (ws://) y devuelve el puerto real"""
+        from websockets.asyncio.server import serve
+        self.server_ws = await serve(self._atender_ws, self.host, puerto)
+        self.puerto_ws = list(self.server_ws.sockets)[0].getsockname()[1]
+        return self.puerto_ws
+
+    async def detener(self):
+        self.soltar()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.server_ws:
+            self.server_ws.close()
+            await self.server_ws.wait_closed()
+
+    def _aceptar(self, sesion) -> bool:
+        if self._rechazar > 0:
+            self._rechazar -= 1
+            self.rechazadas += 1
+            sesion.abortar()
+            return False
+        self.sesiones += 1
+        self.clientes.append(sesion)
+        return True
+
+    def _quitar(self, sesion):
+        if sesion in self.clientes:
+            self.clientes.remove(sesion)
+
+    async def _atender_tcp(self, reader, writer):
+        sesion = _SesionTCP(writer, "tls" if self.ssl_context else "tcp")
+        if not self._aceptar(sesion):
+            return
+        framer = IRCLineFramer()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for line in framer.feed(data):
+                    self._procesar(sesion, line)
+        except (ConnectionError, ssl.SSLError, asyncio.CancelledError):
+            pass
+        finally:
+            self._quitar(sesion)
+            writer.close()
+
+    async def _atender_ws(self, websocket):
+        sesion = _SesionWS(websocket)
+        if not self._aceptar(sesion):
+            return
+        try:
+            async for frame in websocket:
+                for line in str(frame).split("\r\n"):
+                    if line:
+                        self._procesar(sesion, line)
+        except Exception:
+            pass
+        finally:
+            self._quitar(sesion)
+            sesion._tarea.cancel()
+
+    def _procesar(self, sesion, line):
+        """Responde a una linea del cliente"""
+        self.recibidas.append(line)
+        comando, _, resto = line.partition(" ")
+        if comando == "NICK":
+            sesion.nick = resto
+            if self._fallar_auth > 0:
+                # Token rechazado: Twitch contesta con un NOTICE en lugar de la bienvenida
+                self._fallar_auth -= 1
+                self.auth_fallidas += 1
+                sesion.enviar(":tmi.twitch.tv NOTICE * :Login authentication failed")
+            else:
+                sesion.enviar(f":tmi.twitch.tv 001 {resto} :Welcome, GLHF!")
+        elif comando == "CAP":
+            sesion.enviar(f":tmi.twitch.tv CAP * ACK :{resto.partition(':')[2]}")
+        elif comando == "JOIN":
+            for canal in resto.split(","):
+                sesion.canales.add(canal.lstrip("#"))
+                sesion.enviar(f":{sesion.nick}!{sesion.nick}@{sesion.nick}.tmi.twitch.tv JOIN {canal}")
+        elif comando == "PART":
+            for canal in resto.split(","):
+                sesion.canales.discard(canal.lstrip("#"))
+                sesion.enviar(f":{sesion.nick}!{sesion.nick}@{sesion.nick}.tmi.twitch.tv PART {canal}")
+        elif comando == "PING":
+            sesion.enviar(f":tmi.twitch.tv PONG tmi.twitch.tv {resto}")
+        elif comando == "PONG":
+            if sesion.pings:
+                sesion.rtt_pong.append(time.perf_counter() - sesion.pings.popleft())
+
+    def difundir(self, line):
+        """Envia una linea a todos los clientes conectados"""
+        for sesion in list(self.clientes):
+            sesion.enviar(line)
+
+    def a_canal(self, canal, line):
+        """Envia una linea a los clientes que hicieron JOIN al canal"""
+        for sesion in self.clientes:
+            if canal in sesion.canales:
+                sesion.enviar(line)
+
+    def miembros(self, canal=None) -> int:
+        """Cantidad de clientes unidos al canal"""
+        canal = canal or self.canal
+        return sum(1 for sesion in self.clientes if canal in sesion.canales)
+
+    def soltar(self):
+        """Corta todas las conexiones sin despedida (como una caida de red)"""
+        for sesion in list(self.clientes):
+            sesion.abortar()
+        self.clientes.clear()
+
+    def reconnect(self):
+        """Avisa a los clientes que el servidor se va a reiniciar"""
+        self.difundir(":tmi.twitch.tv RECONNECT")
+
+    def rechazar(self, cantidad):
+        """Cierra al instante las proximas `cantidad` conexiones"""
+        self._rechazar = cantidad
+
+    def fallar_auth(self, cantidad):
+        """Rechaza el login de las proximas `cantidad` conexiones con un NOTICE"""
+        self._fallar_auth = cantidad
+
+    def recibidas_de(self, comando) -> List[str]:
+        return [line for line in self.recibidas if line.startswith(comando)]
+
+    # --- Eventos del dialecto de Twitch ---
+
+    def join(self, user, canal=None):
+        canal = canal or self.canal
+        self.a_canal(canal, f":{user}!{user}@{user}.tmi.twitch.tv JOIN #{canal}")
+
+    def part(self, user, canal=None):
+        canal = canal or self.canal
+        self.a_canal(canal, f":{user}!{user}@{user}.tmi.twitch.tv PART #{canal}")
+
+    def privmsg(self, user, texto, canal=None, user_id=None) -> str:
+        """PRIVMSG con los tags de Twitch; devuelve el id del mensaje"""
+        canal = canal or self.canal
+        msg_id = f"fake-{next(self._ids)}"
+        tags = (f"@badge-info=;badges=;color=#1E90FF;display-name={user};emotes=;first-msg=0;flags=;"
+                f"id={msg_id};mod=0;returning-chatter=0;room-id=1;subscriber=0;"
+                f"tmi-sent-ts={int(time.time() * 1000)};turbo=0;user-id={user_id or 0};user-type=")
+        self.a_canal(canal, f"{tags} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{canal} :{texto}")
+        return msg_id
+
+    def clearchat(self, user=None, duracion=None, canal=None, razon=""):
+        """Ban/timeout de un usuario, o limpieza del chat si no se indica usuario"""
+        canal = canal or self.canal
+        ts = int(time.time() * 1000)
+        if user is None:
+            self.a_canal(canal, f"@room-id=1;tmi-sent-ts={ts} :tmi.twitch.tv CLEARCHAT #{canal}")
+            return
+        duracion_tag = f"ban-duration={duracion};" if duracion else ""
+        razon_tag = f"ban-reason={razon.replace(' ', chr(92) + 's')};" if razon else ""
+        self.a_canal(canal, f"@{duracion_tag}{razon_tag}room-id=1;target-user-id=0;tmi-sent-ts={ts} :tmi.twitch.tv CLEARCHAT #{canal} :{user}")
+
+    def clearmsg(self, login, texto, canal=None, msg_id="fake-0"):
+        canal = canal or self.canal
+        self.a_canal(canal, f"@login={login};room-id=;target-msg-id={msg_id};tmi-sent-ts={int(time.time() * 1000)} :tmi.twitch.tv CLEARMSG #{canal} :{texto}")
+
+    def ping(self):
+        """PING del servidor; el RTT hasta el PONG queda en sesion.rtt_pong"""
+        ahora = time.perf_counter()
+        for sesion in self.clientes:
+            sesion.pings.append(ahora)
+            sesion.enviar("PING :tmi.twitch.tv")
+
+    def ejecutar(self, orden):
+        """Ejecuta un comando de control (mismo formato que por stdin)"""
+        accion, _, arg = orden.strip().partition(" ")
+        user, _, texto = arg.partition(" ")
+        if accion == "drop":
+            self.soltar()
+        elif accion == "reconnect":
+            self.reconnect()
+        elif accion == "rechazar":
+            self.rechazar(int(arg or 1))
+        elif accion == "authfail":
+            self.fallar_auth(int(arg or 1))
+        elif accion == "join" and user:
+            self.join(user)
+        elif accion == "part" and user:
+            self.part(user)
+        elif accion == "msg" and user:
+            self.privmsg(user, texto or "hola")
+        elif accion == "ban" and user:
+            self.clearchat(user, int(texto) if texto else None)
+        elif accion == "clear":
+            self.clearchat()
+        elif accion == "borrar" and user:
+            self.clearmsg(user, texto or "mensaje")
+        elif accion == "ping":
+            self.ping()
+        elif orden.strip():
+            self.difundir(orden.strip())
+
+async def main(puerto, puerto_ws, canal, tls, cert, key):
+    servidor = FakeIRCServer(puerto=puerto, canal=canal, ssl_context=crear_contexto_tls(cert, key) if tls else None)
+    await servidor.iniciar()
+    await servidor.iniciar_ws(puerto_ws)
+    print(f"Servidor IRC falso en 127.0.0.1:{servidor.puerto} ({'TLS' if tls else 'TCP'}) "
+          f"y ws://127.0.0.1:{servidor.puerto_ws} (#{canal})")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            orden = await loop.run_in_executor(None, sys.stdin.readline)
+            if not orden:
+                break
+            servidor.ejecutar(orden)
+            print(f"  sesiones={servidor.sesiones} clientes={len(servidor.clientes)} rechazadas={servidor.rechazadas}")
+    finally:
+        await servidor.detener()
+
+if __name__ == "__main__":
+    def _arg(nombre, defecto=None):
+        return sys.argv[sys.argv.index(nombre) + 1] if nombre in sys.argv else defecto
+    asyncio.run(main(
+        int(_arg("--puerto", 6667)),
+        int(_arg("--puerto-ws", 8080)),
+        _arg("--canal", "kleisarc"),
+        "--tls" in sys.argv,
+        _arg("--cert"),
+        _arg("--key")
+    ))
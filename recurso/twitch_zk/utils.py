@@ -95,8 +95,8 @@ def buscar_id_usuario(user):
         print(f"Error al obtener usuario {user}: {response.status_code} - {response.text}")
         return None
 
-def verificar_follow_fecha(user_id):
-    broadcaster_id = os.getenv("BROADCASTER_ID")
+def verificar_follow_fecha(user_id, broadcaster_id=None):
+    broadcaster_id = broadcaster_id or os.getenv("BROADCASTER_ID")
     headers = {
         'Client-ID': os.getenv("TTG_BOT_CLIENT_ID"),
         'Authorization': f'Bearer {os.getenv("TTG_BOT_TOKEN")}'
@@ -204,7 +204,7 @@ async def iniciar_gemi(canal):
         ]
     }]
     
-    broadcaster = canal.user.name
+    broadcaster = canal.broadcaster
     titulo = canal.title
     categoria = canal.game_name
 
@@ -0,0 +1,21 @@
+import os
+import sys
+import asyncio
+import inspect
+import tempfile
+import pytest
+
+# Las pruebas importan desde la raiz del proyecto (clases, recurso, bd)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Las transcripciones de Gemi de las pruebas no van a la carpeta del bot
+os.environ.setdefault("GEMI_TRANSCRIPT_DIR", tempfile.mkdtemp(prefix="prueba_gemi_"))
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Las pruebas `async def` corren cada una en su propio bucle de eventos"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    argumentos = {nombre: pyfuncitem.funcargs[nombre] for nombre in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**argumentos))
+    return True
@@ -0,0 +1,60 @@
+import random
+import tracemalloc
+from collections import deque
+from clases.twitch_zk.analytics_class import ChatAnalytics, VENTANAS
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+def test_ventanas_iguales_al_conteo_exacto_y_memoria_estable():
+    """Stream de 3 h con habituales, visitantes y rafagas de JOIN/PART; cada 30 min las
+    ventanas se comparan con un conteo por fuerza bruta y se mide la memoria del modulo"""
+    rnd = random.Random(3)
+    reloj = Reloj()
+    analytics = ChatAnalytics(reloj=reloj)
+    historial = deque()  # (segundo, tipo, user_id) solo para el conteo exacto
+    memoria = []
+
+    tracemalloc.start()
+    try:
+        for segundo in range(3 * 3600):
+            reloj.ahora = 1000.0 + segundo
+            # Chat con intensidad variable: mas actividad en rafagas
+            for _ in range(rnd.randint(0, 5 * (4 if segundo % 900 < 60 else 1))):
+                user_id = rnd.randint(1, 200) if rnd.random() < 0.8 else rnd.randint(1, 1_000_000)
+                analytics.mensaje(user_id)
+                historial.append((segundo, "mensajes", user_id))
+            if segundo % 600 == 0:
+                for _ in range(rnd.randint(50, 300)):
+                    analytics.join()
+                    historial.append((segundo, "joins", None))
+                for _ in range(rnd.randint(10, 100)):
+                    analytics.part()
+                    historial.append((segundo, "parts", None))
+            while historial and historial[0][0] <= segundo - 3600:
+                historial.popleft()
+
+            if segundo % 1800 == 1799:
+                resumen = analytics.resumen()
+                for ventana, largo in VENTANAS.items():
+                    recientes = [e for e in historial if e[0] > segundo - largo]
+                    esperado = {
+                        "mensajes_min": sum(1 for e in recientes if e[1] == "mensajes") * 60 / largo,
+                        "chatters": len({e[2] for e in recientes if e[1] == "mensajes"}),
+                        "joins_min": sum(1 for e in recientes if e[1] == "joins") * 60 / largo,
+                        "parts_min": sum(1 for e in recientes if e[1] == "parts") * 60 / largo,
+                    }
+                    for clave, valor in esperado.items():
+                        assert abs(resumen[ventana][clave] - valor) < 1e-9, (segundo, ventana, clave)
+                # Memoria del modulo (sin el historial de la prueba)
+                memoria.append(sum(stat.size for stat in tracemalloc.take_snapshot()
+                                   .filter_traces([tracemalloc.Filter(True, "*analytics_class.py")]).statistics("filename")))
+    finally:
+        tracemalloc.stop()
+
+    # Pasada la primera hora (ventana llena) la memoria no crece con la duracion
+    assert max(memoria[2:]) <= memoria[2] * 1.1
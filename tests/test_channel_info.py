@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+from clases.twitch_zk.channelinfo_class import ChannelInfoCache
+
+def consulta_simulada(llamadas, latencia=0.05):
+    async def consulta():
+        llamadas.append(1)
+        await asyncio.sleep(latencia)
+        return SimpleNamespace(user=SimpleNamespace(name="canal"), title="Titulo viejo", game_name="Dota 2", game_id="29595")
+    return consulta
+
+async def test_rafaga_de_lecturas_hace_una_sola_consulta():
+    llamadas = []
+    cache = ChannelInfoCache(consulta_simulada(llamadas), ttl=60)
+    primeras = await asyncio.gather(*(cache.obtener() for _ in range(500)))
+    await asyncio.gather(*(cache.obtener() for _ in range(500)))
+    assert len(llamadas) == 1
+    assert all(info.title == "Titulo viejo" for info in primeras)
+
+async def test_evento_actualiza_sin_consultar():
+    llamadas = []
+    cache = ChannelInfoCache(consulta_simulada(llamadas), ttl=60)
+    await cache.obtener()
+    version = cache.version
+    cache.actualizar("Titulo nuevo", "Just Chatting", "509658", "canal")
+    info = await cache.obtener()
+    assert info.title == "Titulo nuevo" and info.game_name == "Just Chatting"
+    assert cache.version == version + 1
+    assert len(llamadas) == 1
+
+async def test_evento_gana_a_la_consulta_en_vuelo():
+    llamadas = []
+    cache = ChannelInfoCache(consulta_simulada(llamadas), ttl=60)
+    await cache.obtener()
+    cache.invalidar()
+    en_vuelo = asyncio.create_task(cache.obtener())
+    await asyncio.sleep(0)
+    cache.actualizar(title="Titulo del evento")
+    await en_vuelo
+    assert (await cache.obtener()).title == "Titulo del evento"
+
+async def test_vencido_el_ttl_consulta_una_vez_mas():
+    llamadas = []
+    cache = ChannelInfoCache(consulta_simulada(llamadas), ttl=0.2)
+    await cache.obtener()
+    await asyncio.sleep(0.25)
+    await asyncio.gather(*(cache.obtener() for _ in range(100)))
+    assert len(llamadas) == 2
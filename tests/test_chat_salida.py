@@ -0,0 +1,78 @@
+import time
+import asyncio
+from clases.twitch_zk.scheduler_class import ChatScheduler, MODERACION, IA, INFO, LARGO_MAXIMO, SEPARADOR, partir
+
+TASA = 5  # Limite escalado: 5 mensajes por segundo en vez de 20 cada 30 s
+
+async def test_prioridades_limite_y_empaquetado():
+    """Una rafaga de informativos agota la ventana; mientras se espera lugar llegan IA y moderacion"""
+    enviados = []
+
+    async def enviar(texto):
+        enviados.append((time.monotonic(), texto))
+
+    salida = ChatScheduler(nombre="prueba_chat_tx")
+    salida.limite.configurar(TASA, 1)
+    salida.iniciar()
+
+    esperados = []
+    for i in range(80):
+        texto = f"info {i}: link de discord discord.gg/abc"
+        salida.enviar(enviar, texto, INFO, "canal")
+        esperados.append(texto)
+    await asyncio.sleep(0.05)
+    largo = " ".join(f"palabra{i}" for i in range(120))
+    for i in range(5):
+        texto = largo if i == 0 else f"ia {i}: respuesta de Gemi"
+        salida.enviar(enviar, texto, IA, "canal")
+        esperados.append(texto)
+    await asyncio.sleep(0)
+    for i in range(5):
+        texto = f"mod {i}: titulo cambiado"
+        salida.enviar(enviar, texto, MODERACION, "canal", empaquetar=False)
+        esperados.append(texto)
+
+    while salida.pendientes():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.05)
+    await salida.detener()
+
+    textos = [texto for _, texto in enviados]
+    assert all(len(texto) <= LARGO_MAXIMO for texto in textos)
+    # Nada se pierde: con las partes del largo juntadas, cada texto aparece completo
+    unido = SEPARADOR.join(textos)
+    assert all(texto in unido for texto in esperados if texto != largo)
+    assert "palabra119" in unido
+    assert salida.partidos == 1 and salida.empaquetados > 0
+
+    # Moderacion antes que IA y esta antes que los informativos pendientes
+    def primera(prefijo):
+        return next(i for i, texto in enumerate(textos) if prefijo in texto)
+    assert max(primera(f"mod {i}:") for i in range(5)) < primera("ia 1:") < primera("info 79:")
+
+    # Nunca mas de TASA envios en una ventana de 1 s, tampoco la rafaga inicial
+    momentos = [momento for momento, _ in enviados]
+    assert max(sum(1 for m in momentos if t <= m < t + 1) for t in momentos) <= TASA
+
+def test_partir_corta_en_espacios_y_en_seco():
+    largo = " ".join(f"palabra{i}" for i in range(120))
+    partes = partir(largo)
+    assert len(partes) == 3 and all(len(parte) <= LARGO_MAXIMO for parte in partes)
+    assert " ".join(partes) == largo
+    enlace = "x" * 1200
+    assert partir(enlace) == [enlace[:500], enlace[500:1000], enlace[1000:]]
+
+async def test_respuestas_iguales_salen_todas():
+    """La misma respuesta para dos usuarios distintos no se pierde al juntar"""
+    enviados = []
+
+    async def enviar(texto):
+        enviados.append(texto)
+
+    salida = ChatScheduler(nombre="prueba_chat_tx")
+    for _ in range(2):
+        salida.enviar(enviar, "clip: https://clips.twitch.tv/abc", INFO, "canal")
+    salida.enviar(enviar, "otro aviso", INFO, "canal")
+    salida.iniciar()
+    await salida.detener()
+    assert enviados == [SEPARADOR.join(["clip: https://clips.twitch.tv/abc"] * 2 + ["otro aviso"])]
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+from clases.twitch_zk.cooldown_class import compartido
+from clases.twitch_zk.component_class import MyComponent
+
+# Los cooldowns de twitchio son de la clase del comando: cada prueba usa sus propios usuarios y canales
+
+class Componente:
+    """?clip simulado: creacion del clip compartida por canal"""
+
+    def __init__(self, latencia=0.1):
+        self.latencia = latencia
+        self.creados = 0
+        self.fallar = False
+        self.respuestas = []
+
+    async def clip(self, ctx):
+        try:
+            url = await self._crear_clip(ctx.channel)
+        except RuntimeError:
+            return
+        self.respuestas.append((ctx.chatter.name, url))
+
+    @compartido(ventana=0.3, clave=lambda canal: canal.id)
+    async def _crear_clip(self, canal):
+        await asyncio.sleep(self.latencia)
+        if self.fallar:
+            raise RuntimeError("Helix no disponible")
+        self.creados += 1
+        return f"https://clips.twitch.tv/{canal.id}-{self.creados}/edit"
+
+def contexto(nombre, moderador=False, canal="canal"):
+    chatter = SimpleNamespace(id=nombre, name=nombre, moderator=moderador, broadcaster=False)
+    return SimpleNamespace(chatter=chatter, channel=SimpleNamespace(id=canal), broadcaster=SimpleNamespace(id=canal))
+
+async def test_rafaga_comparte_un_solo_clip():
+    comp = Componente()
+    await asyncio.gather(*(comp.clip(contexto(f"viewer{i}", canal="rafaga")) for i in range(5)))
+    assert comp.creados == 1
+    assert len(comp.respuestas) == 5
+    assert len({url for _, url in comp.respuestas}) == 1
+
+async def test_clip_nuevo_tras_la_ventana_y_error_no_guardado():
+    comp = Componente(latencia=0)
+    await comp.clip(contexto("primero", canal="ventana"))
+    await asyncio.sleep(0.35)
+    comp.fallar = True
+    await comp.clip(contexto("con_error", canal="ventana"))
+    comp.fallar = False
+    await comp.clip(contexto("segundo", canal="ventana"))
+    assert comp.creados == 2
+    assert comp.respuestas[-1] == ("segundo", "https://clips.twitch.tv/ventana-2/edit")
+
+async def test_cooldown_de_clip_por_usuario_y_moderador_exento():
+    # update devuelve None si el comando puede correr y los segundos que faltan si esta en cooldown
+    cooldown = MyComponent.clip._buckets[0]
+    assert await cooldown.update(contexto("repetido")) is None
+    assert await cooldown.update(contexto("repetido")) > 0
+    assert await cooldown.update(contexto("otro")) is None
+    for _ in range(3):
+        assert await cooldown.update(contexto("mod", moderador=True)) is None
+
+async def test_cooldown_de_games_por_canal_sin_exentos():
+    cooldown = MyComponent.games._buckets[0]
+    assert await cooldown.update(contexto("mod", moderador=True, canal="games_a")) is None
+    assert await cooldown.update(contexto("mod2", moderador=True, canal="games_a")) > 0
+    assert await cooldown.update(contexto("mod", moderador=True, canal="games_b")) is None
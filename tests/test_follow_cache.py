@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime
+from clases.twitch_zk.followcache_class import FollowCache
+
+FECHA = datetime(2024, 5, 1)
+
+def consulta_simulada(llamadas, latencia=0.05):
+    async def consulta(user_id):
+        llamadas.append(user_id)
+        await asyncio.sleep(latencia)
+        # Los IDs pares siguen al canal
+        return FECHA if user_id % 2 == 0 else None
+    return consulta
+
+async def test_una_consulta_por_usuario_en_rafagas_concurrentes():
+    llamadas = []
+    consulta = consulta_simulada(llamadas)
+    cache = FollowCache(ttl=60, ttl_negativo=60)
+    pedidos = [user_id for _ in range(50) for user_id in range(10)]
+    resultados = await asyncio.gather(*(cache.obtener(u, lambda u=u: consulta(u)) for u in pedidos))
+    assert all(r == (FECHA if u % 2 == 0 else None) for u, r in zip(pedidos, resultados))
+    assert sorted(llamadas) == list(range(10))
+
+    # Segunda rafaga: todo desde la cache, tambien los "no sigue"
+    await asyncio.gather(*(cache.obtener(u, lambda u=u: consulta(u)) for u in range(10)))
+    assert len(llamadas) == 10
+
+async def test_caducan_solo_los_negativos():
+    llamadas = []
+    consulta = consulta_simulada(llamadas, latencia=0)
+    cache = FollowCache(ttl=60, ttl_negativo=0.2)
+    await asyncio.gather(*(cache.obtener(u, lambda u=u: consulta(u)) for u in range(10)))
+    await asyncio.sleep(0.25)
+    llamadas.clear()
+    await asyncio.gather(*(cache.obtener(u, lambda u=u: consulta(u)) for u in range(10)))
+    assert sorted(llamadas) == [1, 3, 5, 7, 9]
+
+async def test_event_follow_gana_a_la_consulta_en_vuelo():
+    llamadas = []
+    consulta = consulta_simulada(llamadas)
+    cache = FollowCache(ttl=60, ttl_negativo=60)
+    en_vuelo = asyncio.create_task(cache.obtener(1, lambda: consulta(1)))
+    await asyncio.sleep(0)
+    cache.actualizar(1, FECHA)
+    await en_vuelo
+    assert await cache.obtener(1, lambda: consulta(1)) == FECHA
+    assert llamadas == [1]
@@ -0,0 +1,79 @@
+import logging
+from datetime import date
+import recurso.twitch_zk.utils as utils
+from clases.twitch_zk.irc_class import TwitchIRCClient
+from clases.twitch_zk.follower_class import FollowerIndex
+from clases.twitch_zk.chat_base_class import ChannelState
+
+CANAL = "kleisarc"
+
+class BuscadorFijo:
+    """Sustituto de HelixUserBatcher: todos los logins tienen ID 99"""
+
+    async def buscar_id(self, login):
+        return "99"
+
+def snapshot(tmp_path):
+    """Snapshot del 01-05-24 con un solo seguidor (ID 1, desde el 10-01-24)"""
+    carpeta = tmp_path / "2024"
+    carpeta.mkdir()
+    archivo = carpeta / "[24-05-01] Followers.csv"
+    archivo.write_text("#,User ID,Username,Followed At\n1,1,viejo,10/01/24\n", encoding="utf-8")
+    indice = FollowerIndex()
+    assert indice.cargar_ultimo_snapshot(str(tmp_path))
+    return indice
+
+def preparar(monkeypatch, indice, user_data, follows, consultar_follow=True):
+    """Cliente sin conectar con un canal; `follows` es lo que responde Helix por user_id"""
+    consultas = []
+
+    def verificar(user_id, broadcaster_id=None):
+        consultas.append(user_id)
+        return follows.get(user_id)
+    monkeypatch.setattr(utils, "verificar_follow_fecha", verificar)
+
+    client = TwitchIRCClient("x", "bot", None, ["bot"], {}, None, user_lookup=BuscadorFijo())
+    client.LOGGER.setLevel(logging.WARNING)
+    estado = ChannelState(CANAL, user_data, indice, consultar_follow=consultar_follow)
+    return client, estado, consultas
+
+def test_fecha_del_snapshot_sale_del_nombre(tmp_path):
+    indice = snapshot(tmp_path)
+    assert indice.fecha_snapshot == date(2024, 5, 1)
+    assert indice.fecha(1) == "10-01-2024"
+
+async def test_follow_posterior_al_snapshot_se_consulta_y_se_recuerda(tmp_path, monkeypatch):
+    indice = snapshot(tmp_path)
+    client, estado, consultas = preparar(monkeypatch, indice, {}, {"99": "20-06-2024"})
+    await client._process_user_join(estado, "nuevo")
+    assert estado.user_data_twitch["nuevo"]["follow_date"] == "20-06-2024"
+    # Lo que confirmo Helix queda en el indice: el PART ya no consulta
+    await client._process_user_part(estado, "nuevo")
+    assert consultas == ["99"]
+    assert estado.user_data_twitch["nuevo"]["follow_date"] == "20-06-2024"
+
+async def test_ausencia_con_indice_viejo_no_degrada(tmp_path, monkeypatch):
+    indice = snapshot(tmp_path)
+    # Siguio despues del snapshot: no figura, pero Helix dice que sigue
+    user_data = {"reciente": {"id": "99", "follow_date": "15-06-2024", "color": "", "nickname": ""}}
+    client, estado, consultas = preparar(monkeypatch, indice, user_data, {"99": "15-06-2024"})
+    await client._process_user_join(estado, "reciente")
+    assert user_data["reciente"]["follow_date"] == "15-06-2024"
+    assert consultas == ["99"]
+
+async def test_sin_poder_consultar_tampoco_degrada(tmp_path, monkeypatch):
+    indice = snapshot(tmp_path)
+    user_data = {"reciente": {"id": "99", "follow_date": "15-06-2024", "color": "", "nickname": ""}}
+    client, estado, consultas = preparar(monkeypatch, indice, user_data, {}, consultar_follow=False)
+    await client._process_user_part(estado, "reciente")
+    assert user_data["reciente"]["follow_date"] == "15-06-2024"
+    assert consultas == []
+
+async def test_follow_anterior_al_snapshot_y_ausente_es_renegado(tmp_path, monkeypatch):
+    indice = snapshot(tmp_path)
+    # Seguia desde antes del snapshot y no figura en el: dejo de seguir, sin preguntar a Helix
+    user_data = {"ido": {"id": "99", "follow_date": "01-02-2024", "color": "", "nickname": ""}}
+    client, estado, consultas = preparar(monkeypatch, indice, user_data, {})
+    await client._process_user_join(estado, "ido")
+    assert user_data["ido"]["follow_date"] == "Renegado"
+    assert consultas == []
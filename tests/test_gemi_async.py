@@ -0,0 +1,62 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi
+
+LATENCIA = 0.2
+
+class ModeloSimulado:
+    """Tarda LATENCIA por consulta (10 veces mas si la pregunta dice "lenta") y cuenta las que estan en vuelo"""
+
+    def __init__(self):
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    async def generate_content_async(self, contenido, request_options=None):
+        self.en_vuelo += 1
+        self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            pregunta = contenido[-1].parts[0].text
+            await asyncio.sleep(LATENCIA * (10 if "lenta" in pregunta else 1))
+        finally:
+            self.en_vuelo -= 1
+        parte = protos.Part(text=f"Respuesta a [{pregunta}]")
+        return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=[parte]))])
+
+async def medir_retraso(parar, retrasos):
+    """Un tick cada 10 ms; guarda cuanto se atraso cada uno"""
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.01)
+        retrasos.append(time.perf_counter() - inicio - 0.01)
+
+async def test_consultas_concurrentes_no_congelan_el_bucle():
+    modelo = ModeloSimulado()
+    gemi = Gemi(modelo, max_messages=100, timeout=LATENCIA * 3, max_en_vuelo=2)
+    parar, retrasos = asyncio.Event(), []
+    tick = asyncio.create_task(medir_retraso(parar, retrasos))
+
+    respuestas = await asyncio.gather(*(gemi.send_message_async(f"user{i}", f"pregunta {i}") for i in range(6)))
+    parar.set()
+    await tick
+
+    assert all(f"pregunta {i}" in respuesta for i, respuesta in enumerate(respuestas))
+    assert modelo.max_en_vuelo == 2
+    assert len(gemi.history) == 12
+    assert max(retrasos) < 0.05
+
+async def test_timeout_no_entra_al_historial_ni_al_limite():
+    gemi = Gemi(ModeloSimulado(), max_messages=100, timeout=LATENCIA * 3)
+    await gemi.send_message_async("user", "pregunta rapida")
+    lenta = await gemi.send_message_async("user_lento", "pregunta lenta")
+    assert "tardo demasiado" in lenta
+    assert len(gemi.history) == 2
+    assert gemi.get_message_count() == 1
+
+async def test_terminate_cancela_lo_que_sigue_en_vuelo():
+    gemi = Gemi(ModeloSimulado(), max_messages=100)
+    pendiente = asyncio.create_task(gemi.send_message_async("user", "hola"))
+    await asyncio.sleep(LATENCIA / 4)
+    gemi.terminate(False)
+    assert "desactivada" in await pendiente
@@ -0,0 +1,85 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi
+from clases.twitch_zk.responsecache_class import ResponseCache
+from clases.twitch_zk.channelinfo_class import ChannelInfoCache
+
+class ModeloSimulado:
+    """Se dirige a quien pregunta por su nombre; las preguntas con "titulo" piden change_title"""
+
+    def __init__(self, latencia=0.1):
+        self.latencia = latencia
+        self.llamadas = 0
+
+    async def generate_content_async(self, contenido, stream=False, tool_config=None, request_options=None):
+        self.llamadas += 1
+        await asyncio.sleep(self.latencia)
+        pregunta = contenido[-1].parts[0].text.split("\n")[0]  # Sin la nota de contexto del canal
+        if "titulo" in pregunta:
+            parte = protos.Part(function_call=protos.FunctionCall(name="change_title", args={"title": "Nuevo"}))
+        else:
+            usuario = pregunta.partition(":")[0]
+            parte = protos.Part(text=f"@{usuario} estamos jugando Dota 2, {usuario.upper()} (respuesta {self.llamadas})")
+        return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=[parte]))])
+
+def preparar():
+    async def sin_consulta():
+        raise RuntimeError("no deberia consultar")
+
+    canal = ChannelInfoCache(sin_consulta, ttl=3600)
+    canal.actualizar("Titulo 1", "Dota 2", "29595", "canal")
+    cache = ResponseCache(ttl=60)
+    modelo = ModeloSimulado()
+
+    async def modify_channel(title):
+        pass
+    ctx = SimpleNamespace(channel=SimpleNamespace(id="canal", modify_channel=modify_channel))
+    # Ventana de contexto amplia: se cuentan las llamadas al modelo y no debe haber resumenes
+    gemi = Gemi(modelo, max_messages=1000, channel_info=canal, streaming=False, cache=cache, turnos=1000, max_tokens=10**6)
+    return gemi, modelo, cache, canal, ctx
+
+async def test_variantes_de_la_pregunta_salen_de_la_cache_dirigidas_a_quien_pregunta():
+    gemi, modelo, _, _, ctx = preparar()
+    await gemi.send_message_async("ana", "¿Qué juego es este?", ctx)
+    variantes = ["que juego es este", "QUE JUEGO ES ESTE!!", "¿qué   juego es este?"]
+    inicio = time.perf_counter()
+    respuestas = [await gemi.send_message_async(f"user{i}", variantes[i % len(variantes)], ctx) for i in range(50)]
+    por_respuesta = (time.perf_counter() - inicio) / 50
+
+    assert modelo.llamadas == 1
+    assert gemi.get_message_count() == 1
+    assert respuestas == [f"@user{i} estamos jugando Dota 2, user{i} (respuesta 1)" for i in range(50)]
+    assert por_respuesta < 1e-3
+
+async def test_cambio_de_titulo_cambia_la_clave():
+    gemi, modelo, cache, canal, ctx = preparar()
+    await gemi.send_message_async("ana", "que juego es este", ctx)
+    canal.actualizar(title="Titulo 2")
+    await gemi.send_message_async("ana", "que juego es este", ctx)
+    assert modelo.llamadas == 2
+    assert len(cache) == 2
+
+async def test_respuestas_con_funciones_no_se_guardan():
+    gemi, modelo, cache, _, ctx = preparar()
+    await gemi.send_message_async("mod", "cambia el titulo a Nuevo", ctx)
+    await gemi.send_message_async("mod", "cambia el titulo a Nuevo", ctx)
+    assert modelo.llamadas == 2
+    assert len(cache) == 0
+
+def test_presupuesto_de_bytes_y_ttl():
+    ahora = [0.0]
+    cache = ResponseCache(ttl=10, max_bytes=100, reloj=lambda: ahora[0])
+    for i in range(5):
+        cache.guardar(cache.clave(f"pregunta numero {i}"), "x" * 30)
+    # Se desalojan las menos usadas hasta entrar en 100 bytes
+    assert len(cache) == 3 and cache.bytes <= 100
+    assert cache.obtener(cache.clave("pregunta numero 0")) is None
+    ahora[0] = 11
+    assert cache.obtener(cache.clave("pregunta numero 4")) is None
+
+def test_nombre_que_es_palabra_de_la_pregunta_no_se_guarda():
+    cache = ResponseCache(ttl=10)
+    cache.guardar(cache.clave("que es un juego"), "juego: un juego es...", usuario="juego")
+    assert cache.obtener(cache.clave("que es un juego"), "otro") is None
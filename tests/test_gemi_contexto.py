@@ -0,0 +1,53 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi
+
+class ModeloSimulado:
+    """Tarda mas cuanto mas largo es lo que recibe (como un modelo real)"""
+
+    def __init__(self):
+        self.llamadas = 0
+        self.resumenes = 0
+        self.resumen_con_herramientas = False
+
+    async def generate_content_async(self, contenido, stream=False, tool_config=None, request_options=None):
+        caracteres = sum(len(part.text) for c in contenido for part in c.parts)
+        # 1 ms por cada 100 caracteres recibidos, mas una base fija
+        await asyncio.sleep(0.02 + caracteres / 100_000)
+        if contenido[-1].parts[0].text.startswith("Resume"):
+            self.resumenes += 1
+            if tool_config is None:
+                self.resumen_con_herramientas = True
+            texto = f"Resumen {self.resumenes}: se hablo de Dota 2 y de varias preguntas del chat."
+        else:
+            self.llamadas += 1
+            texto = f"Respuesta {self.llamadas}: " + "bla " * 60
+        return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=[protos.Part(text=texto)]))])
+
+async def test_sesion_larga_con_contexto_acotado():
+    preguntas, max_tokens = 60, 400
+    modelo = ModeloSimulado()
+    gemi = Gemi(modelo, max_messages=preguntas + 1, streaming=False, turnos=4, max_tokens=max_tokens)
+
+    latencias, prompts = [], []
+    for i in range(preguntas):
+        inicio = time.perf_counter()
+        respuesta = await gemi.send_message_async(f"user{i % 7}", f"pregunta numero {i} sobre el stream " + "x" * 40)
+        latencias.append(time.perf_counter() - inicio)
+        prompts.append(gemi.contexto.ultimo_prompt)
+        assert respuesta.startswith("Respuesta")
+    await asyncio.sleep(0.3)  # Dejar terminar el ultimo resumen
+
+    # Tope: ventana + pendientes mientras se resume + resumen (~4 caracteres por token)
+    assert max(prompts) <= 2 * max_tokens + 400
+    # La latencia de los ultimos turnos no crece respecto de los primeros
+    primeras = sum(latencias[:10]) / 10
+    ultimas = sum(latencias[-10:]) / 10
+    assert ultimas < primeras * 1.5 + 0.005
+    # Resumenes sin herramientas; el historial conserva la conversacion completa
+    assert modelo.resumenes > 0 and not modelo.resumen_con_herramientas
+    assert gemi.contexto.resumen.startswith("Resumen")
+    assert len(gemi.history) == 2 * preguntas
+    assert gemi.get_message_count() == preguntas
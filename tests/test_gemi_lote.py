@@ -0,0 +1,49 @@
+import re
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi, repartir
+
+class ModeloSimulado:
+    """Responde a cada linea "Nombre: pregunta" en una sola linea, como pide el system prompt"""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    async def generate_content_async(self, contenido, stream=False, request_options=None):
+        self.llamadas += 1
+        await asyncio.sleep(0.1)
+        lineas = re.findall(r"^(\w+): (.+)$", contenido[-1].parts[0].text, re.MULTILINE)
+        texto = " ".join(f"{nombre}: respuesta a '{pregunta}'." for nombre, pregunta in lineas)
+        parte = protos.Part(text=texto)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=[parte]))])
+
+async def test_preguntas_de_la_ventana_viajan_en_un_turno():
+    modelo = ModeloSimulado()
+    gemi = Gemi(modelo, max_messages=100, streaming=False, agrupar=0.3, max_lote=5)
+
+    async def preguntar(i):
+        await asyncio.sleep(i * 0.02)
+        return await gemi.send_grouped_async(f"user{i}", f"pregunta {i}")
+
+    respuestas = await asyncio.gather(*(preguntar(i) for i in range(6)))
+    # 6 preguntas con max_lote 5: dos turnos, cada uno cuenta una vez para el limite
+    assert modelo.llamadas == 2
+    assert gemi.get_message_count() == 2
+    # Cada usuario recibe solo su parte (el sexto quedo solo en su turno: respuesta normal)
+    for i, respuesta in enumerate(respuestas):
+        assert respuesta.startswith(f"@user{i} ") if i < 5 else not respuesta.startswith("@")
+        assert f"pregunta {i}'" in respuesta
+        assert not any(f"pregunta {j}'" in respuesta for j in range(6) if j != i)
+
+async def test_pregunta_sola_va_como_normal():
+    gemi = Gemi(ModeloSimulado(), max_messages=100, streaming=False, agrupar=0.05)
+    sola = await gemi.send_grouped_async("solitario", "pregunta sola")
+    assert not sola.startswith("@")
+    assert "pregunta sola" in sola
+
+def test_repartir():
+    lineas = repartir("Ana: hola Ana.\nbeto: el juego es Dota 2.\nsigue la respuesta de beto", ["ana", "Beto"])
+    assert lineas == {"ana": "hola Ana.", "Beto": "el juego es Dota 2. sigue la respuesta de beto"}
+    assert repartir("@ana: si. @Beto: no.", ["ana", "Beto"]) == {"ana": "si.", "Beto": "no."}
+    assert repartir("Hola a todos!", ["ana", "Beto"]) == {}
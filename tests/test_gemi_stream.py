@@ -0,0 +1,60 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi, Frases
+
+FRAGMENTOS = 40
+
+def chunk(*partes):
+    return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=list(partes)))])
+
+class ModeloSimulado:
+    """Respuesta larga en fragmentos con una pausa entre cada uno; pide change_title a la mitad"""
+
+    async def generate_content_async(self, contenido, stream=False, request_options=None):
+        assert stream
+        async def generar():
+            for i in range(FRAGMENTOS):
+                await asyncio.sleep(0.02)
+                texto = f"Fragmento {i} de la explicacion con algo de texto" + (". " if i % 3 == 2 else ", ")
+                if i == FRAGMENTOS // 2:
+                    yield chunk(protos.Part(function_call=protos.FunctionCall(name="change_title", args={"title": "Titulo nuevo"})))
+                yield chunk(protos.Part(text=texto))
+        return generar()
+
+async def test_stream_por_frases_con_llamada_a_funcion():
+    cambios = []
+
+    async def modify_channel(title):
+        cambios.append(title)
+
+    ctx = SimpleNamespace(channel=SimpleNamespace(id="canal", modify_channel=modify_channel), send=None)
+    gemi = Gemi(ModeloSimulado(), max_messages=100, timeout=60, streaming=True)
+
+    inicio = time.perf_counter()
+    trozos, momentos = [], []
+    async for trozo in gemi.stream_message_async("user", "explica algo largo", ctx=ctx):
+        trozos.append(trozo)
+        momentos.append(time.perf_counter() - inicio)
+    total = time.perf_counter() - inicio
+
+    # El primer trozo llega mucho antes que el final
+    assert momentos[0] < total / 4
+    assert all(len(trozo) <= 500 for trozo in trozos)
+    # Los trozos de texto terminan en fin de frase (antes de la llamada se entrega lo pendiente)
+    assert all(trozo.endswith((".", ",")) for trozo in trozos if not trozo.startswith("He cambiado"))
+    # change_title se ejecuta una vez y su resultado sale en su lugar
+    funcion = [i for i, trozo in enumerate(trozos) if trozo.startswith("He cambiado")]
+    assert cambios == ["Titulo nuevo"]
+    assert len(funcion) == 1 and 0 < funcion[0] < len(trozos) - 1
+    # El historial guarda el turno completo
+    assert len(gemi.history) == 2
+    assert gemi.history[1].parts[0].text.count("Fragmento") == FRAGMENTOS
+    assert gemi.history[1].parts[1].function_call.name == "change_title"
+
+def test_frase_sin_fin_se_corta_en_un_espacio():
+    partido = Frases().agregar("palabra " * 100)
+    assert len(partido) == 1
+    assert len(partido[0]) <= 500
+    assert partido[0].endswith("palabra")
@@ -0,0 +1,81 @@
+import json
+import time
+import shutil
+import asyncio
+from types import SimpleNamespace
+from google.generativeai import protos
+from clases.twitch_zk.gemi_class import Gemi
+from clases.twitch_zk.transcript_class import TranscriptWriter, leer, sesiones, exportar
+
+PREGUNTAS = 30
+INTERVALO = 0.1
+
+class ModeloSimulado:
+    def __init__(self):
+        self.llamadas = 0
+
+    async def generate_content_async(self, contenido, stream=False, tool_config=None, request_options=None):
+        self.llamadas += 1
+        await asyncio.sleep(0.005)
+        parte = protos.Part(text=f"Respuesta {self.llamadas} con acentos: canción, añejo.")
+        return SimpleNamespace(candidates=[SimpleNamespace(content=protos.Content(role="model", parts=[parte]))])
+
+async def sesion(carpeta):
+    """Sesion de PREGUNTAS turnos; tras cada uno registra a mano un mensaje extra (3 registros por turno)"""
+    transcript = TranscriptWriter(str(carpeta), intervalo=INTERVALO)
+    gemi = Gemi(ModeloSimulado(), max_messages=PREGUNTAS + 1, streaming=False, transcript=transcript)
+    costo = 0.0
+    for i in range(PREGUNTAS):
+        await gemi.send_message_async(f"user{i % 4}", f"pregunta {i}")
+        inicio = time.perf_counter()
+        transcript.agregar(protos.Content(role="user", parts=[protos.Part(text="user0: medicion")]))
+        costo += time.perf_counter() - inicio
+    await asyncio.sleep(INTERVALO * 3)
+    return gemi, transcript, costo / PREGUNTAS
+
+async def test_turnos_en_disco_durante_la_sesion(tmp_path):
+    gemi, transcript, costo = await sesion(tmp_path)
+    en_disco = leer(transcript.ruta)
+    with open(transcript.ruta_indice, "r", encoding="utf-8") as f:
+        indice = json.load(f)
+    assert len(en_disco) == 3 * PREGUNTAS
+    assert indice["registros"] == len(en_disco) and not indice["cerrada"]
+    # Escrituras agrupadas (menos fsync que registros) y encolar no cuesta en el bucle
+    assert transcript.lotes < transcript.registros
+    assert costo < 1e-3
+    gemi.terminate(False)
+
+async def test_linea_cortada_al_final_se_ignora(tmp_path):
+    gemi, transcript, _ = await sesion(tmp_path)
+    gemi.terminate(False)
+    assert await asyncio.to_thread(transcript.esperar_cierre)
+    copia = tmp_path / "caida.jsonl"
+    shutil.copy(transcript.ruta, copia)
+    with open(copia, "a", encoding="utf-8") as f:
+        f.write('{"n": 999, "role": "user", "con')
+    assert len(leer(str(copia))) == len(leer(transcript.ruta))
+
+async def test_cierre_nombres_unicos_y_exportar(tmp_path):
+    gemi, transcript, _ = await sesion(tmp_path)
+    inicio = time.perf_counter()
+    gemi.terminate(False)
+    # En el bucle solo se avisa al hilo: el ultimo lote y su fsync no lo frenan
+    assert time.perf_counter() - inicio < 0.05
+    assert await asyncio.to_thread(transcript.esperar_cierre)
+    with open(transcript.ruta_indice, "r", encoding="utf-8") as f:
+        indice = json.load(f)
+    assert indice["cerrada"]
+    assert indice["mensajes"] == PREGUNTAS
+    assert sorted(indice["participantes"]) == [f"user{i}" for i in range(4)]
+
+    # Dos sesiones en el mismo segundo no comparten archivo
+    otra = TranscriptWriter(str(tmp_path))
+    assert otra.ruta != transcript.ruta
+    assert sesiones(str(tmp_path)) == [transcript.ruta]
+
+    with open(exportar(transcript.ruta), "r", encoding="utf-8") as f:
+        exportado = json.load(f)
+    assert exportado["message_count"] == PREGUNTAS
+    assert len(exportado["messages"]) == 3 * PREGUNTAS
+    assert exportado["messages"][0] == {"role": "user", "user_name": "user0", "content": "user0: pregunta 0"}
+    assert "canción" in exportado["messages"][1]["content"]
@@ -0,0 +1,39 @@
+import asyncio
+from aiohttp import web
+from clases.twitch_zk.helix_class import HelixUserBatcher
+
+def crear_servidor(registro, latencia=0.05):
+    """Helix de imitacion: GET /users con varios parametros login"""
+    async def users(request):
+        logins = request.query.getall("login", [])
+        registro.append(len(logins))
+        await asyncio.sleep(latencia)
+        # Los logins que empiezan con "fantasma" no existen en Twitch
+        data = [{"id": str(1000 + int(login.rsplit("_", 1)[1])), "login": login}
+                for login in logins if not login.startswith("fantasma")]
+        return web.json_response({"data": data})
+
+    app = web.Application()
+    app.router.add_get("/helix/users", users)
+    return app
+
+async def test_raid_se_resuelve_en_lotes_de_100():
+    registro = []
+    runner = web.AppRunner(crear_servidor(registro))
+    await runner.setup()
+    sitio = web.TCPSite(runner, "127.0.0.1", 0)
+    await sitio.start()
+    puerto = sitio._server.sockets[0].getsockname()[1]  # type: ignore
+    batcher = HelixUserBatcher(token="x", client_id="x", base_url=f"http://127.0.0.1:{puerto}/helix", ventana=0.05)
+    try:
+        logins = [f"viewer_{i}" for i in range(300)] + ["fantasma_1"]
+        resultados = await asyncio.gather(*(batcher.buscar_id(login) for login in logins))
+    finally:
+        await batcher.close()
+        await runner.cleanup()
+
+    # 301 busquedas concurrentes: ceil(301 / 100) peticiones
+    assert registro == [100, 100, 100, 1]
+    # Cada busqueda recibe el ID de su propio login; el inexistente, None
+    assert resultados[:-1] == [str(1000 + i) for i in range(300)]
+    assert resultados[-1] is None
@@ -0,0 +1,92 @@
+import gc
+import asyncio
+import logging
+import recurso.twitch_zk.utils as utils
+from clases.twitch_zk.irc_class import TwitchIRCClient
+from clases.twitch_zk.follower_class import FollowerIndex
+from clases.twitch_zk.workers_class import HandlerWorkers
+from recurso.twitch_zk.script.fake_irc import FakeIRCServer, esperar
+
+CANAL = "kleisarc"
+BOT = "bot_prueba"
+DEMORA = 5.0
+USUARIOS = 500
+
+class BuscadorLento:
+    """Sustituto de HelixUserBatcher que tarda `demora` segundos por busqueda (un Helix saturado)"""
+
+    def __init__(self, demora=DEMORA):
+        self.demora = demora
+
+    async def buscar_id(self, login):
+        await asyncio.sleep(self.demora)
+        return "1"
+
+    async def close(self):
+        pass
+
+async def test_enriquecimiento_lento_no_demora_el_pong():
+    logging.getLogger("IRC_WORKERS").setLevel(logging.ERROR)
+    servidor = FakeIRCServer(canal=CANAL)
+    await servidor.iniciar()
+    indice = FollowerIndex()
+    indice.cargado = True
+    client = TwitchIRCClient("x", BOT, CANAL, [BOT], {}, None, user_lookup=BuscadorLento(), follower_index=indice)
+    client.LOGGER.setLevel(logging.WARNING)
+    client.host, client.port, client.use_ssl = "127.0.0.1", servidor.puerto, False
+    # Pocas colas y chicas para forzar descartes
+    client.workers = HandlerWorkers(client._handlers, concurrencia={"membresia": 4}, max_cola=50)
+
+    await client.connect()
+    tarea = asyncio.create_task(client.listen())
+    try:
+        assert await esperar(lambda: servidor.miembros() == 1)
+        gc.collect()  # Una pausa del GC de todo el proceso (el resto de la suite) no es lo que se mide
+        for i in range(USUARIOS):
+            servidor.join(f"desconocido_{i}")
+        servidor.ping()
+        assert await esperar(lambda: any(s.rtt_pong for s in servidor.clientes), timeout=DEMORA / 2)
+        assert servidor.clientes[0].rtt_pong[0] < 0.1
+
+        # Cada JOIN quedo presente (con su busqueda esperando en una tarea propia) o encolado o descartado
+        stats = client.workers.estadisticas()
+        assert len(client._tareas_membresia) == len(client.joined_users)
+        assert len(client.joined_users) + stats["membresia_pendientes"] + stats["membresia_descartadas"] == USUARIOS
+    finally:
+        await client.disconnect()
+        await asyncio.gather(tarea, return_exceptions=True)
+        await servidor.detener()
+    # Al desconectar se cancelan las busquedas pendientes
+    assert not client._tareas_membresia
+
+async def test_part_sale_despues_del_join_del_mismo_usuario(monkeypatch):
+    monkeypatch.setattr(utils, "verificar_follow_fecha", lambda *args: None)
+    servidor = FakeIRCServer(canal=CANAL)
+    await servidor.iniciar()
+    indice = FollowerIndex()
+    indice.cargado = True
+    mostrados = []
+
+    def mostrar(texto, tipo):
+        if "fugaz" in texto:
+            mostrados.append(texto)
+
+    client = TwitchIRCClient("x", BOT, CANAL, [BOT], {}, None, message_callback=mostrar,
+                             user_lookup=BuscadorLento(0.2), follower_index=indice)
+    client.LOGGER.setLevel(logging.WARNING)
+    client.host, client.port, client.use_ssl = "127.0.0.1", servidor.puerto, False
+
+    await client.connect()
+    tarea = asyncio.create_task(client.listen())
+    try:
+        assert await esperar(lambda: servidor.miembros() == 1)
+        # Entra y sale mientras su JOIN todavia espera el ID: el PART no se adelanta ni se pierde
+        servidor.join("fugaz")
+        servidor.part("fugaz")
+        assert await esperar(lambda: len(mostrados) == 2)
+        assert "se uni" in mostrados[0] and "sali" in mostrados[1]
+        assert not client._pendientes_usuario
+    finally:
+        await client.disconnect()
+        await asyncio.gather(tarea, return_exceptions=True)
+        await servidor.detener()
@@ -0,0 +1,63 @@
+import time
+import asyncio
+import logging
+import recurso.twitch_zk.metricas as metricas
+from clases.twitch_zk.pipeline_class import EventPipeline
+
+EVENTOS = 2000
+USUARIOS = 50
+
+logging.getLogger("PIPELINE").setLevel(logging.ERROR)  # Sin un aviso cada 100 descartes
+
+async def correr(politica, max_cola=100):
+    """Rafaga de EVENTOS (usuario, numero) por enriquecer (tipo Helix) y mostrar (tipo GUI)"""
+    mostrados = []
+
+    async def enriquecer(evento):
+        await asyncio.sleep(0.002)  # Consulta de follow
+        return evento
+
+    def mostrar(evento):
+        time.sleep(0.0002)  # Insercion en la GUI (bloquea el bucle)
+        mostrados.append(evento)
+
+    pipeline = EventPipeline(f"prueba_{politica}")
+    pipeline.etapa("enriquecer", enriquecer, trabajadores=8, max_cola=max_cola, politica=politica,
+                   clave=lambda e: e[0], fusion=lambda e: e[0])
+    pipeline.etapa("mostrar", mostrar, max_cola=max_cola, politica="bloquear")
+    pipeline.iniciar()
+    espera_max = 0.0
+    for i in range(EVENTOS):
+        antes = time.perf_counter()
+        await pipeline.ingresar((i % USUARIOS, i))
+        espera_max = max(espera_max, time.perf_counter() - antes)
+    await pipeline.detener(timeout=30)
+    metricas.eliminar(pipeline.nombre)
+    return mostrados, pipeline.etapas[0], espera_max
+
+def en_orden_por_usuario(mostrados):
+    ultimos = {}
+    for usuario, numero in mostrados:
+        if numero < ultimos.get(usuario, -1):
+            return False
+        ultimos[usuario] = numero
+    return True
+
+async def test_bloquear_no_pierde_eventos():
+    mostrados, etapa, _ = await correr("bloquear")
+    assert len(mostrados) == EVENTOS
+    assert etapa.pendientes() == 0 and etapa.descartados == 0
+    assert en_orden_por_usuario(mostrados)
+
+async def test_descartar_nunca_espera_y_cuenta_descartes():
+    mostrados, etapa, espera_max = await correr("descartar")
+    assert etapa.descartados > 0
+    assert len(mostrados) + etapa.descartados == EVENTOS
+    assert en_orden_por_usuario(mostrados)
+    assert espera_max < 0.05
+
+async def test_colapsar_reemplaza_por_clave_de_fusion():
+    mostrados, etapa, _ = await correr("colapsar")
+    assert etapa.colapsados > 0
+    assert len(mostrados) + etapa.colapsados + etapa.descartados == EVENTOS
+    assert en_orden_por_usuario(mostrados)
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import recurso.twitch_zk.utils as utils
+from clases.twitch_zk.pool_class import IRCConnectionPool
+from clases.twitch_zk.follower_class import FollowerIndex
+from recurso.twitch_zk.script.fake_irc import FakeIRCServer, esperar
+
+BOT = "bot_prueba"
+CANALES = 300
+POR_CONEXION = 50
+
+class Pool:
+    """IRCConnectionPool con CANALES canales propios (indice vacio cargado) contra un FakeIRCServer"""
+
+    def __init__(self, extra=None):
+        self.extra = extra  # Corrutina opcional que agrega mas canales antes de arrancar
+
+    async def __aenter__(self):
+        logging.getLogger("IRC").setLevel(logging.WARNING)
+        self.servidor = FakeIRCServer()
+        puerto = await self.servidor.iniciar()
+        self.pool = IRCConnectionPool("x", BOT, [BOT], canales_por_conexion=POR_CONEXION)
+        self.pool.limites["JOIN"].configurar(100000, 1)  # Sin esperar el limite real de 20 JOIN / 10 s
+        self.pool.max_outage = 0.3
+        self.pool.host, self.pool.port, self.pool.use_ssl = "127.0.0.1", puerto, False
+
+        indice = FollowerIndex()
+        indice.cargado = True
+        for i in range(CANALES):
+            await self.pool.agregar_canal(f"canal_{i}", {"viewer": {"id": "7", "follow_date": "New", "color": "", "nickname": ""}},
+                                          indice, broadcaster_id="1")
+        if self.extra is not None:
+            await self.extra(self.pool)
+        for cliente in self.pool.conexiones:
+            cliente.backoff_base = cliente.backoff_max = 0.05
+
+        assert await self.pool.start()
+        self.tarea = asyncio.create_task(self.pool.listen())
+        assert await esperar(lambda: self.joins() == len(self.pool.estados))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pool.disconnect()
+        await asyncio.wait_for(self.tarea, 5)
+        await self.servidor.detener()
+
+    def joins(self):
+        return len(self.servidor.recibidas_de("JOIN"))
+
+async def test_reparte_canales_y_enruta_por_canal():
+    async with Pool() as p:
+        assert len(p.pool.conexiones) == CANALES // POR_CONEXION
+        assert all(len(c.channels) == POR_CONEXION for c in p.pool.conexiones)
+        p.servidor.difundir(":viewer!viewer@viewer.tmi.twitch.tv JOIN #canal_7")
+        assert await esperar(lambda: p.pool.get_connected_users("canal_7") == ["viewer"])
+        assert p.pool.get_connected_users("canal_8") == []
+
+async def test_conexion_caida_reparte_sus_canales():
+    async with Pool() as p:
+        caida = p.pool.asignacion["canal_0"]
+        movidos = len(caida.channels)
+        p.servidor.rechazar(1000)
+        caida.writer.transport.abort()
+        assert await esperar(lambda: p.pool.rebalanceos == 1)
+        p.servidor.rechazar(0)
+        assert await esperar(lambda: p.joins() == CANALES + movidos)
+        assert caida not in p.pool.conexiones
+        assert sum(len(c.channels) for c in p.pool.conexiones) == CANALES
+        assert all(len(c.channels) <= POR_CONEXION for c in p.pool.conexiones)
+
+async def test_canal_ajeno_sin_indice_no_consulta_helix(monkeypatch):
+    consultas_follow = []
+    monkeypatch.setattr(utils, "verificar_follow_fecha", lambda *args: consultas_follow.append(args))
+
+    async def agregar_socio(pool):
+        await pool.agregar_canal("socio", broadcaster_id="2")
+
+    async with Pool(agregar_socio) as p:
+        p.servidor.difundir(":nuevo!nuevo@nuevo.tmi.twitch.tv JOIN #socio")
+        socio = p.pool.estados["socio"]
+        assert await esperar(lambda: "nuevo" in socio.user_data_twitch)
+        # Ni busqueda del ID ni consulta de follow: queda como visita
+        assert socio.user_data_twitch["nuevo"]["follow_date"] == "Visita"
+        assert consultas_follow == []
+        assert p.pool.user_lookup.solicitudes == 0
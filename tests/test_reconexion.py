@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from clases.twitch_zk.irc_class import TwitchIRCClient
+from recurso.twitch_zk.script.fake_irc import FakeIRCServer, esperar
+
+CANAL = "kleisarc"
+BOT = "bot_prueba"
+
+class IndiceVacio:
+    """Indice de seguidores cargado y sin nadie (evita consultar Helix)"""
+    cargado = True
+
+    def fecha(self, user_id):
+        return None
+
+    def confiable(self, user_id, guardada=None):
+        return True
+
+class Conexion:
+    """TwitchIRCClient escuchando contra un FakeIRCServer, con backoff corto"""
+
+    async def __aenter__(self):
+        logging.getLogger("IRC").setLevel(logging.WARNING)
+        self.servidor = FakeIRCServer(canal=CANAL)
+        puerto = await self.servidor.iniciar()
+        usuarios = {user: {"id": str(i), "follow_date": "New", "color": "", "nickname": ""}
+                    for i, user in enumerate(("ana", "beto"))}
+        self.client = TwitchIRCClient("x", BOT, CANAL, [BOT], usuarios, "irc", follower_index=IndiceVacio())
+        self.client.host, self.client.port, self.client.use_ssl = "127.0.0.1", puerto, False
+        self.client.backoff_base, self.client.backoff_max = 0.05, 0.5
+        assert await self.client.connect()
+        self.tarea = asyncio.create_task(self.client.listen())
+        assert await esperar(lambda: self.joins() == 1)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.disconnect()
+        await asyncio.wait_for(self.tarea, 5)
+        await self.servidor.detener()
+
+    def joins(self):
+        return len(self.servidor.recibidas_de("JOIN"))
+
+async def test_corte_de_red_reconecta_y_vuelve_a_unirse():
+    async with Conexion() as c:
+        c.servidor.soltar()
+        assert await esperar(lambda: c.joins() == 2 and len(c.client.cortes) == 1)
+        # Sesion nueva completa: otra vez CAP REQ de las tres capacidades
+        assert len(c.servidor.recibidas_de("CAP REQ")) == 6
+        assert c.client.cortes[0]["motivo"] == "conexion perdida"
+        assert c.client.cortes[0]["intentos"] == 1
+
+async def test_conexiones_rechazadas_siguen_con_backoff():
+    async with Conexion() as c:
+        c.servidor.rechazar(3)
+        c.servidor.soltar()
+        assert await esperar(lambda: c.joins() == 2 and len(c.client.cortes) == 1)
+        assert c.servidor.rechazadas == 3
+        assert c.client.cortes[0]["intentos"] == 4
+
+async def test_reconnect_del_servidor_es_proactivo():
+    async with Conexion() as c:
+        c.servidor.reconnect()
+        assert await esperar(lambda: c.joins() == 2 and len(c.client.cortes) == 1)
+        assert c.client.cortes[0]["motivo"] == "RECONNECT del servidor"
+        assert c.client.cortes[0]["intentos"] == 1
+
+async def test_quien_se_fue_durante_el_corte_deja_de_figurar():
+    async with Conexion() as c:
+        c.servidor.join("ana")
+        c.servidor.join("beto")
+        assert await esperar(lambda: c.client.joined_users == {"ana", "beto"})
+        c.servidor.soltar()
+        assert await esperar(lambda: c.joins() == 2 and len(c.client.cortes) == 1)
+        # Twitch reenvia el JOIN de quien sigue en el canal; beto se fue
+        c.servidor.join("ana")
+        assert await esperar(lambda: "ana" in c.client.joined_users)
+        assert c.client.joined_users == {"ana"}
+
+async def test_login_rechazado_no_cuenta_como_reconexion():
+    async with Conexion() as c:
+        c.servidor.fallar_auth(2)
+        c.servidor.soltar()
+        assert await esperar(lambda: len(c.client.cortes) == 1)
+        assert c.servidor.auth_fallidas == 2
+        # Los dos intentos con NOTICE fallaron; vale el tercero, con bienvenida 001
+        assert c.client.cortes[0]["intentos"] == 3